@@ -5,12 +5,16 @@ import logging
 import os
 import sys
 import threading
+import time
 
 from time import sleep
 
 from processflow.lib.events import EventList
-from processflow.lib.finalize import finalize
-from processflow.lib.initialize import initialize
+from processflow.lib.initialize import initialize, parse_args
+from processflow.lib.metrics import metrics, start_server
+from processflow.lib.plan import write_plan
+from processflow.lib.project import Project
+from processflow.lib.simulate import run_simulation
 from processflow.lib.util import print_debug, print_line, print_message
 
 os.environ['UVCDAT_ANONYMOUS_LOG'] = 'no'
@@ -43,6 +47,13 @@ def main(cl_args=None):
                       "    command line: {}".format(cl_args,
                                                     ' '.join(sys.argv[:])))
 
+    pargs = parse_args(argv=cl_args)
+    if pargs.daemon is not None:
+        return run_daemon(
+            socket_path=pargs.daemon,
+            max_jobs=pargs.max_jobs,
+            serial=pargs.serial)
+
     config, runmanager = initialize(
         argv=cl_args,
         event_list=event_list)
@@ -51,46 +62,58 @@ def main(cl_args=None):
         print("Error in setup, exiting")
         return -1
     logging.info('Config setup complete')
+    if config['global'].get('simulate'):
+        run_simulation(
+            runmanager=runmanager,
+            config=config,
+            event_list=event_list)
+        return 0
+    if config['global'].get('plan'):
+        write_plan(
+            runmanager=runmanager,
+            config=config,
+            manifest_path=config['global']['plan'],
+            event_list=event_list,
+            write_scripts=config['global']['plan_scripts'])
+        return 0
     debug = True if config['global'].get('debug') else False
 
     # Main loop
     loop_delay = 10
-    state_path = os.path.join(
-        config['global']['project_path'],
-        'output',
-        'job_state.txt')
+
+    # serve the run metrics if a port was given, otherwise write them out each pass
+    metrics_path = None
+    metrics_port = config['global'].get('metrics_port')
+    if metrics_port:
+        try:
+            start_server(metrics_port)
+            msg = 'Serving metrics at http://127.0.0.1:{}/metrics'.format(metrics_port)
+        except OSError as e:
+            logging.error('unable to serve metrics on port {}: {}'.format(metrics_port, e))
+            metrics_port = None
+    if not metrics_port:
+        metrics_path = os.path.join(
+            config['global']['project_path'],
+            'output',
+            'metrics.prom')
+        msg = 'Writing metrics to {}'.format(metrics_path)
+    print_line(msg, event_list)
+
+    project = Project(config, runmanager, event_list)
     try:
         print("--------------------------")
         print(" Entering Main Loop ")
-        print(" Status file: {}".format(state_path))
+        print(" Status file: {}".format(project.state_path))
         print("--------------------------")
         while True:
-
-            if debug:
-                print_line(' -- checking data -- ', event_list)
-            runmanager.check_data_ready()
-
-            if debug:
-                print_line(' -- starting ready jobs --', event_list)
-            runmanager.start_ready_jobs()
-
-            if debug:
-                print_line(' -- monitoring running jobs --', event_list)
-            runmanager.monitor_running_jobs(debug=debug)
-
-            if debug:
-                print_line(' -- writing out state -- ', event_list)
-            runmanager.write_job_sets(state_path)
-
-            status = runmanager.is_all_done()
+            loop_start = time.time()
+            status = project.step()
+            metrics.observe('processflow_loop_seconds', time.time() - loop_start)
+            if metrics_path:
+                metrics.write(metrics_path)
+            else:
+                metrics.collect()
             if status >= 0:
-                msg = "Finishing up run"
-                print_line(msg, event_list)
-                finalize(
-                    config=config,
-                    event_list=event_list,
-                    status=status,
-                    runmanager=runmanager)
                 # SUCCESS EXIT
                 return 0
 
@@ -99,12 +122,37 @@ def main(cl_args=None):
             sleep(loop_delay)
     except KeyboardInterrupt as e:
         print_message('\n----- KEYBOARD INTERRUPT -----')
-        runmanager.write_job_sets(state_path)
+        project.write_state()
         print_message('-----  cleanup complete  -----', 'ok')
     except Exception as e:
         print_message('----- AN UNEXPECTED EXCEPTION OCCURED -----')
         print_debug(e)
-        runmanager.write_job_sets(state_path)
+        project.write_state()
+# -----------------------------------------------
+
+
+def run_daemon(socket_path=None, max_jobs=None, serial=False):
+    """
+    Host runs submitted through a unix socket until asked to shutdown
+
+    Parameters:
+        socket_path (str): where to listen, the default socket if not given
+        max_jobs (int): the most jobs to run at once between every hosted run
+        serial (bool): run jobs one at a time instead of through slurm
+    """
+    from processflow.lib.daemon import DEFAULT_SOCKET, Daemon
+    from processflow.lib.serial import Serial
+    daemon = Daemon(
+        socket_path=socket_path or DEFAULT_SOCKET,
+        max_jobs=max_jobs,
+        manager=Serial() if serial else None)
+    try:
+        daemon.run()
+    except Exception as e:
+        print_message('----- THE DAEMON STOPPED ON AN UNEXPECTED EXCEPTION -----')
+        print_debug(e)
+        return -1
+    return 0
 # -----------------------------------------------
 
 
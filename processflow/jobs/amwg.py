@@ -5,16 +5,20 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import logging
 import os
 import re
+import tarfile
 
-from subprocess import call
-from bs4 import BeautifulSoup
+from shutil import rmtree
 
 from processflow.jobs.diag import Diag
+from processflow.lib.archive import extract_tar, tar_member_counts, HOST_MODE_BITS
 from processflow.lib.jobstatus import JobStatus
-from processflow.lib.util import render, print_line
+from processflow.lib.linkcheck import check_links
+from processflow.lib.util import print_line
 
 
 class AMWG(Diag):
+    __slots__ = ('_tar_index',)
+
     def __init__(self, *args, **kwargs):
         """
         Parameters
@@ -27,6 +31,7 @@ class AMWG(Diag):
         self._job_type = 'amwg'
         self._requires = 'climo'
         self._data_required = ['climo_regrid']
+        self._tar_index = None
 
         config = kwargs.get('config')
         if config:
@@ -57,9 +62,8 @@ class AMWG(Diag):
             custom_output_path = config['diags'][self.job_type].get(
                 'custom_output_path')
             if custom_output_path:
-                self._replace_dict['COMPARISON'] = self._short_comp_name
                 self._output_path = self.setup_output_directory(
-                    custom_output_path)
+                    custom_output_path, comparison=self._short_comp_name)
             else:
                 self._output_path = os.path.join(
                     config['global']['project_path'],
@@ -71,8 +75,7 @@ class AMWG(Diag):
                         start=self.start_year,
                         end=self.end_year,
                         comp=self._short_comp_name))
-            if not os.path.exists(self._output_path):
-                os.makedirs(self._output_path)
+            self.create_output_directory(self._output_path)
         else:
             self._host_path = ''
             self._output_path = ''
@@ -201,10 +204,7 @@ class AMWG(Diag):
         # get environment path to use as NCARG_ROOT
         variables['NCARG_ROOT'] = os.environ['NCARG_ROOT']
 
-        # remove previous amwg script if it exists
-        if os.path.exists(csh_template_out):
-            os.remove(csh_template_out)
-        render(
+        self.render_template(
             variables=variables,
             input_path=template_input_path,
             output_path=csh_template_out)
@@ -259,25 +259,16 @@ class AMWG(Diag):
         if not os.path.exists(img_source):
             if os.path.exists(img_source_tar):
                 return self._check_tar(
-                    img_source_tar, 
-                    img_source, 
-                    event_list, 
-                    config, 
+                    img_source_tar,
+                    img_source,
+                    event_list,
+                    config,
                     expected_files) == 0
             else:
                 return False
 
-        sets = []
-        if 'all' in config['diags']['amwg']['sets']:
-            sets = [str(x) for x in range(1, 16)] + ['4a']
-        else:
-            sets = config['diags']['amwg']['sets']
-
         # check that there have been enough plots created to call this a successful run
-        for item in sets:
-            if item == 'all':
-                continue
-            setname = 'set5_6' if item == '6' or item == '5' else 'set' + item
+        for setname in self._set_names(config):
             setpath = os.path.join(
                 img_source,
                 setname)
@@ -356,88 +347,62 @@ class AMWG(Diag):
 
         if not os.path.exists(img_source):
             if os.path.exists(img_source + '.tar'):
-                call(['tar', '-xf', img_source + '.tar',
-                      '--directory', self._output_path])
+                self._host_from_tar(
+                    always_copy=config['global']['always_copy'],
+                    img_source=img_source,
+                    event_list=event_list)
             else:
                 msg = '{prefix}: Unable to find output directory or tar archive'.format(
                     prefix=self.msg_prefix())
                 print_line(msg, event_list)
                 self.status = JobStatus.FAILED
                 logging.info(msg)
-                return
+            return
 
         self.setup_hosting(
             always_copy=config['global']['always_copy'],
             img_source=img_source,
             host_path=self._host_path,
-            event_list=event_list)
+            event_list=event_list,
+            checksum=config['img_hosting'].get('sync_checksum', False))
 
     # -----------------------------------------------
 
     def _check_links(self, config, img_source):
         """
-        Checks output page for all links, as well as first level subpages
+        Checks output page for all links, as well as first level subpages.
+        Links to missing pages or plots are removed from the page that held them,
+        and the original page is kept with a .bak extension
 
         Parameters:
             config,
             img_source
         Returns:
-            True if all links are found, False otherwise
+            True if the output page was found, False otherwise
         """
-
-        missing_links = list()
         page_path = os.path.join(
             img_source,
             'index.html')
-        page_tail, page_head = os.path.split(page_path)
-        if not os.path.exists(page_path):
+        report = check_links(
+            index_path=page_path,
+            link_filter=['htm'],
+            follow=['htm'],
+            sublink_filter=['png'])
+        if not report.index_found:
             msg = '{prefix}: No output page found'.format(
                 prefix=self.msg_prefix())
             logging.error(msg)
             return False
 
-        # read in the base output page and parse it
-        with open(page_path, 'r') as page_pointer:
-            output_page = BeautifulSoup(page_pointer, 'lxml')
-            output_links = output_page.findAll('a')
-
-        # iterate over all the links on the page
-        missing_subpage_links = None
-        for link in output_links:
-            link_path = link.attrs['href']
-            if link_path[-3:] == 'htm':
-                subpage_path = os.path.join(page_tail, link.attrs['href'])
-                subpage_tail, subpage_head = os.path.split(subpage_path)
-                missing_subpage_links = list()
-                if not os.path.exists(subpage_path):
-                    link.replace_with_children()
-                    msg = '{prefix}: web page missing {page}'.format(
-                        prefix=self.msg_prefix(),
-                        page=subpage_head)
-                    logging.error(msg)
-                    missing_links.append(subpage_path)
-                    continue
-                with open(subpage_path, 'r') as subpage_pointer:
-                    subpage = BeautifulSoup(subpage_pointer, 'lxml')
-                    subpage_links = subpage.findAll('a')
-                for sublink in subpage_links:
-                    sublink_href = sublink.attrs['href']
-                    if sublink_href[-3:] != 'png':
-                        continue
-                    sublink_path = os.path.join(subpage_tail, sublink_href)
-                    if not os.path.exists(sublink_path):
-                        sublink.replace_with_children()
-                        missing_subpage_links.append(sublink_path)
-                if missing_subpage_links:
-                    os.rename(subpage_path, subpage_path + '.bak')
-                    with open(subpage_path, 'w') as outfile:
-                        outfile.write(str(subpage))
-            if missing_subpage_links:
-                missing_links.extend(missing_subpage_links)
-        if missing_links:
-            os.rename(page_path, page_path + '.bak')
-            with open(page_path, 'w') as outfile:
-                outfile.write(str(output_page))
+        if report.missing:
+            for page, missing in report.missing.items():
+                if page == page_path:
+                    for _, link_path in missing:
+                        msg = '{prefix}: web page missing {page}'.format(
+                            prefix=self.msg_prefix(),
+                            page=os.path.basename(link_path))
+                        logging.error(msg)
+                self._remove_links(page, report.missing_hrefs(page))
         else:
             msg = '{prefix}: all links found'.format(
                 prefix=self.msg_prefix())
@@ -445,12 +410,29 @@ class AMWG(Diag):
         return True
     # -----------------------------------------------
 
+    def _remove_links(self, page_path, hrefs):
+        """
+        Unwraps the <a> tags pointing at any of the given hrefs, keeping
+        their text, the original page is moved to page_path.bak
+        """
+        from bs4 import BeautifulSoup
+
+        with open(page_path, 'r') as page_pointer:
+            page = BeautifulSoup(page_pointer, 'lxml')
+        for link in page.findAll('a'):
+            if link.attrs.get('href') in hrefs:
+                link.replace_with_children()
+        os.rename(page_path, page_path + '.bak')
+        with open(page_path, 'w') as outfile:
+            outfile.write(str(page))
+    # -----------------------------------------------
+
     def _change_input_file_names(self):
         """
         change case_01_000101_000201_climo.nc to
                case_01_climo.nc
         """
-        if self._dryrun:
+        if self._dryrun or self._plan_only:
             return
 
         # get a reference to the input directory
@@ -475,31 +457,69 @@ class AMWG(Diag):
             os.rename(input_file, new_name)
     # -----------------------------------------------
 
-    def _check_tar(self, img_source_tar, img_source, event_list, config, expected_files):
-        number_missing = 0
-        msg = '{prefix}: extracting images from tar archive'.format(
-            prefix=self.msg_prefix())
-        print_line(msg, event_list)
-        call(['tar', '-xf', img_source_tar,
-              '--directory', self._output_path])
-        passed = True
-        for item in config['diags']['amwg']['sets']:
+    def _set_names(self, config):
+        """
+        Returns the names of the output directories for the configured plot sets
+        """
+        if 'all' in config['diags']['amwg']['sets']:
+            sets = [str(x) for x in range(1, 16)] + ['4a']
+        else:
+            sets = config['diags']['amwg']['sets']
+        setnames = list()
+        for item in sets:
             if item == 'all':
                 continue
             setname = 'set5_6' if item == '6' or item == '5' else 'set' + item
-            setpath = os.path.join(
-                img_source,
-                setname)
-            if not os.path.exists(setpath):
+            if setname not in setnames:
+                setnames.append(setname)
+        return setnames
+    # -----------------------------------------------
+
+    def _tar_counts(self, img_source_tar, img_source):
+        """
+        Returns the number of files in each set directory of the image archive,
+        the index is only re-read if the archive has changed since the last call
+        """
+        info = os.stat(img_source_tar)
+        signature = (img_source_tar, info.st_size, info.st_mtime)
+        if self._tar_index is None or self._tar_index[0] != signature:
+            counts = tar_member_counts(
+                img_source_tar,
+                prefix=os.path.basename(img_source))
+            self._tar_index = (signature, counts)
+        return self._tar_index[1]
+    # -----------------------------------------------
+
+    def _check_tar(self, img_source_tar, img_source, event_list, config, expected_files):
+        """
+        Counts the plots for each set from the archive index, without extracting it
+
+        Returns:
+            the number of sets that are missing or have too few plots
+        """
+        number_missing = 0
+        try:
+            counts = self._tar_counts(img_source_tar, img_source)
+        except (IOError, OSError, tarfile.TarError) as e:
+            msg = '{prefix}: unable to read tar archive {tar}: {err}'.format(
+                prefix=self.msg_prefix(),
+                tar=img_source_tar,
+                err=e)
+            logging.error(msg)
+            print_line(msg, event_list)
+            return len(self._set_names(config))
+
+        for setname in self._set_names(config):
+            if setname not in counts:
                 number_missing += 1
                 if self._has_been_executed:
-                    msg = '{prefix}: could not find output directory after inflating tar archive: {dir}'.format(
+                    msg = '{prefix}: could not find output directory in tar archive: {dir}'.format(
                         prefix=self.msg_prefix(),
-                        dir=setpath)
+                        dir=os.path.join(img_source, setname))
                     logging.error(msg)
                     print_line(msg, event_list)
             else:
-                count = len(os.listdir(setpath))
+                count = counts[setname]
                 if count < expected_files[setname]:
                     msg = '{prefix}: set {set} only produced {numProduced} when at least {numExpected} were expected'.format(
                         prefix=self.msg_prefix(),
@@ -510,3 +530,44 @@ class AMWG(Diag):
                     print_line(msg, event_list)
                     number_missing += 1
         return number_missing
+    # -----------------------------------------------
+
+    def _host_from_tar(self, always_copy, img_source, event_list):
+        """
+        Extracts the image archive straight into the web hosting directory
+
+        Parameters
+        ----------
+            always_copy (bool): if previous output exists in the target location, should the new output overwrite
+            img_source (str): the path the images would have been extracted to
+            event_list (EventList): an eventlist to push user notifications into
+        """
+        host_path = self._host_path
+        if os.path.exists(host_path):
+            if not always_copy:
+                msg = '{prefix}: Files already present at host location, skipping'.format(
+                    prefix=self.msg_prefix())
+                print_line(msg, event_list)
+                return
+            msg = '{prefix}: Removing previous output from host location'.format(
+                prefix=self.msg_prefix())
+            print_line(msg, event_list)
+            rmtree(host_path)
+
+        msg = '{prefix}: Extracting images from tar archive for web hosting'.format(
+            prefix=self.msg_prefix())
+        print_line(msg, event_list)
+        num_files = extract_tar(
+            img_source + '.tar',
+            host_path,
+            prefix=os.path.basename(img_source))
+        tail, _ = os.path.split(host_path)
+        for _ in range(2):
+            os.chmod(tail, os.stat(tail).st_mode | HOST_MODE_BITS)
+            tail, _ = os.path.split(tail)
+        msg = '{prefix}: {num} files extracted to {path}'.format(
+            prefix=self.msg_prefix(),
+            num=num_files,
+            path=host_path)
+        logging.info(msg)
+    # -----------------------------------------------
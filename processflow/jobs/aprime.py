@@ -3,14 +3,16 @@ import logging
 import os
 
 from shutil import move
-from bs4 import BeautifulSoup
 
 from processflow.jobs.diag import Diag
 from processflow.lib.jobstatus import JobStatus
-from processflow.lib.util import render, print_line
+from processflow.lib.linkcheck import check_links
+from processflow.lib.util import print_line
 
 
 class Aprime(Diag):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         """
         Parameters
@@ -49,8 +51,8 @@ class Aprime(Diag):
             custom_output_path = config['diags'][self.job_type].get(
                 'custom_output_path')
             if custom_output_path:
-                self._replace_dict['COMPARISON'] = self._short_comp_name
-                self._output_path = self.setup_output_directory(custom_output_path)
+                self._output_path = self.setup_output_directory(
+                    custom_output_path, comparison=self._short_comp_name)
             else:
                 self._output_path = os.path.join(
                     kwargs['config']['global']['project_path'],
@@ -62,8 +64,7 @@ class Aprime(Diag):
                         start=self.start_year,
                         end=self.end_year,
                         comp=self._short_comp_name))
-            if not os.path.exists(self._output_path):
-                os.makedirs(self._output_path)
+            self.create_output_directory(self._output_path)
         else:
             self._host_path = ''
             self._output_path = ''
@@ -114,10 +115,7 @@ class Aprime(Diag):
             config['global']['resource_path'],
             'aprime_template_vs_obs.bash')
 
-        # remove previous run script if it exists
-        if os.path.exists(template_out):
-            os.remove(template_out)
-        render(
+        self.render_template(
             variables=variables,
             input_path=template_input_path,
             output_path=template_out)
@@ -187,7 +185,8 @@ class Aprime(Diag):
             always_copy=config['global']['always_copy'],
             img_source=self._output_path,
             host_path=self._host_path,
-            event_list=event_list)
+            event_list=event_list,
+            checksum=config['img_hosting'].get('sync_checksum', False))
 
         self._host_url = 'https://{server}/{prefix}/{short_name}/aprime/{start:04d}_{end:04d}_vs_{comp}/{case}_years{start}-{end}_vs_{comp}/index.html'.format(
             server=config['img_hosting']['img_host_server'],
@@ -229,14 +228,9 @@ class Aprime(Diag):
                 outpath=page_path)
             logging.info(msg)
 
-        missing_pages = list()
-        with open(page_path, 'r') as fp:
-            page = BeautifulSoup(fp, 'lxml')
-            links = page.findAll('a')
-            for link in links:
-                link_path = os.path.join(web_dir, link.attrs['href'])
-                if not os.path.exists(link_path):
-                    missing_pages.append(link.attrs['href'])
+        report = check_links(index_path=page_path)
+        missing_pages = [href for links in report.missing.values()
+                         for href, _ in links]
 
         if missing_pages:
             msg = '{prefix}: missing some output images'.format(
@@ -260,6 +254,12 @@ class Aprime(Diag):
         fixed_input_path = os.path.join(
             tail, self.case, 'run')
 
+        if self._plan_only:
+            self._input_file_paths = [
+                os.path.join(fixed_input_path, os.path.split(x)[1])
+                for x in self._input_file_paths]
+            return
+
         if not os.path.exists(fixed_input_path):
             os.makedirs(fixed_input_path)
 
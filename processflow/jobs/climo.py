@@ -7,11 +7,14 @@ import os
 
 from processflow.jobs.job import Job
 from processflow.lib.jobstatus import JobStatus
+from processflow.lib.ncheader import check_files
 from processflow.lib.util import get_climo_output_files, print_line
 from processflow.lib.filemanager import FileStatus
 
 
 class Climo(Job):
+    __slots__ = ('_regrid_path',)
+
     def __init__(self, *args, **kwargs):
         super(Climo, self).__init__(*args, **kwargs)
         self._job_type = 'climo'
@@ -48,8 +51,7 @@ class Climo(Job):
                 self._short_name,
                 '{length}yr'.format(length=self.end_year - self.start_year + 1))
         for path in [self._output_path, self._regrid_path]:
-            if not os.path.exists(path):
-                os.makedirs(path)
+            self.create_output_directory(path)
     # -----------------------------------------------
 
     def setup_dependencies(self, *args, **kwargs):
@@ -97,10 +99,40 @@ class Climo(Job):
                 logging.error(msg)
             return False
 
+        # make sure none of the climos were cut short
+        errors = check_files(self.output_files(config))
+        if errors:
+            if self._has_been_executed:
+                for error in errors.values():
+                    logging.error('{prefix}: {error}'.format(
+                        prefix=self.msg_prefix(), error=error))
+            return False
+
         # nothing's gone wrong, so we must be done
         return True
     # -----------------------------------------------
 
+    def output_dirs(self):
+        if self._regrid_path and self._regrid_path != self._output_path:
+            return [self._output_path, self._regrid_path]
+        return [self._output_path]
+    # -----------------------------------------------
+
+    def output_files(self, config):
+        """
+        Returns the native and regridded climos for this jobs years, the climo
+        directories are shared by every job of the same length
+        """
+        paths = list()
+        for output_dir in self.output_dirs():
+            file_list = get_climo_output_files(
+                input_path=output_dir,
+                start_year=self.start_year,
+                end_year=self.end_year)
+            paths.extend(os.path.join(output_dir, x) for x in file_list or [])
+        return paths
+    # -----------------------------------------------
+
     def execute(self, config, event_list, dryrun=False):
         """
         Generates and submits a run script for ncremap to regrid model output
@@ -11,6 +11,7 @@ class Cmor(Job):
     """
     CMORize e3sm model output
     """
+    __slots__ = ('_log_path', '_requires')
 
     def __init__(self, *args, **kwargs):
         """
@@ -44,8 +45,63 @@ class Cmor(Job):
                 '{start:04d}_{end:04d}'.format(
                     start=self.start_year,
                     end=self.end_year))
-        if not os.path.exists(self._output_path):
-            os.makedirs(self._output_path)
+        self.create_output_directory(self._output_path)
+        self._log_path = os.path.join(self._output_path, 'logs')
+    # -----------------------------------------------
+
+    def _variable_groups(self, variables, group_size):
+        """
+        Split the variables into groups of at most group_size, each group
+        is converted by its own e3sm_to_cmip process
+
+        Parameters
+        ----------
+            variables (list): the E3SM variable names to convert
+            group_size (int): the maximum number of variables per group
+        Returns
+        -------
+            a list of (name, variables) tuples
+        """
+        group_size = max(int(group_size), 1)
+        groups = list()
+        for idx in range(0, len(variables), group_size):
+            group = variables[idx: idx + group_size]
+            groups.append(('-'.join(group), group))
+        return groups
+    # -----------------------------------------------
+
+    def _completed_variables(self, config):
+        """
+        Returns the set of variables that a previous run finished converting,
+        read from the markers each successful variable group leaves in the log directory
+        """
+        variable_list = config['post-processing']['cmor']['variable_list']
+        completed = set()
+        if not os.path.exists(self._log_path):
+            # output from before the per variable groups has no markers,
+            # fall back to counting the files
+            found = 0
+            for _, _, files in os.walk(self._output_path):
+                found += len([x for x in files if x.endswith('.nc')])
+            expected_file_number = 20 if 'all' in variable_list else len(variable_list)
+            if found and found >= expected_file_number:
+                completed.update(variable_list)
+            return completed
+        for name in os.listdir(self._log_path):
+            if not name.endswith('.done'):
+                continue
+            with open(os.path.join(self._log_path, name), 'r') as infile:
+                completed.update(infile.read().split())
+        return completed
+    # -----------------------------------------------
+
+    def _missing_variables(self, config):
+        """
+        Returns the variables from the variable_list that have not been converted
+        """
+        completed = self._completed_variables(config)
+        return [x for x in config['post-processing']['cmor']['variable_list']
+                if x not in completed]
     # -----------------------------------------------
 
     def _dep_filter(self, job):
@@ -70,20 +126,22 @@ class Cmor(Job):
             True if the job completed successfully
             False otherwise
         """
-        found = list()
+        found = False
         for _, _, files in os.walk(self._output_path):
-            if files is not None:
-                for file in files:
-                    if file.endswith('nc'):
-                        found.append(file)
-        if 'all' in config['post-processing']['cmor']['variable_list']:
-            expected_file_number = 20
-        else:
-            expected_file_number = len(config['post-processing']['cmor']['variable_list'])
-        if len(found) >= expected_file_number:
-            return True
-        else:
+            if any(x.endswith('.nc') for x in files):
+                found = True
+                break
+        if not found:
             return False
+
+        missing = self._missing_variables(config)
+        if missing:
+            msg = '{prefix}: missing cmorized output for {vars}'.format(
+                prefix=self.msg_prefix(),
+                vars=', '.join(missing))
+            logging.info(msg)
+            return False
+        return True
     # -----------------------------------------------
 
     def setup_dependencies(self, *args, **kwargs):
@@ -120,22 +178,42 @@ class Cmor(Job):
         """
         self._dryrun = dryrun
 
+        # only convert the variables that havent already been done
+        # by a previous run
+        variables = self._missing_variables(config)
+        if not variables:
+            self._has_been_executed = True
+            return 0
+
+        cmor_config = config['post-processing']['cmor']
         input_path, _ = os.path.split(self._input_file_paths[0])
-        cmd = [
-            'e3sm_to_cmip',
-            '--input', input_path,
-            '--output', self._output_path,
-            '--var-list', ' '.join(config['post-processing']
-                                   ['cmor']['variable_list']),
-            '--user-input', config['post-processing']['cmor'][self.case]['user_input_json_path'],
-            '--tables', config['post-processing']['cmor']['cmor_tables_path'],
-            '--num-proc', '24'
-        ]
-        custom_handlers = config['post-processing']['cmor'].get(
-            'custom_handlers_path')
-        if custom_handlers is not None:
-            cmd.extend(['--handlers', custom_handlers])
+        template_out = os.path.join(
+            config['global']['run_scripts_path'],
+            'cmor_{start:04d}_{end:04d}_{case}.bash'.format(
+                start=self.start_year,
+                end=self.end_year,
+                case=self.short_name))
+        template_input_path = os.path.join(
+            config['global']['resource_path'],
+            'cmor_template.bash')
+        render_vars = {
+            'groups': self._variable_groups(
+                variables, cmor_config.get('variable_group_size', 1)),
+            'max_parallel': cmor_config.get('max_parallel'),
+            'input_path': input_path,
+            'output_path': self._output_path,
+            'log_path': self._log_path,
+            'user_input': cmor_config[self.case]['user_input_json_path'],
+            'tables_path': cmor_config['cmor_tables_path'],
+            'handlers_path': cmor_config.get('custom_handlers_path')
+        }
+
+        self.render_template(
+            variables=render_vars,
+            input_path=template_input_path,
+            output_path=template_out)
 
+        cmd = ['bash', template_out]
         self._has_been_executed = True
         return self._submit_cmd_to_manager(config, cmd, event_list)
     # -----------------------------------------------
@@ -157,16 +235,19 @@ class Cmor(Job):
         try:
             new_files = list()
             for root, dirs, files in os.walk(self._output_path):
-                if files is not None:
-                    for file in files:
-                        new_files.append({
-                            'name': file,
-                            'local_path': os.path.abspath(file),
-                            'case': self.case,
-                            'year': self.start_year,
-                            'month': self.end_year,  # use the month to hold the end year field
-                            'local_status': FileStatus.PRESENT.value
-                        })
+                if root == self._output_path and 'logs' in dirs:
+                    dirs.remove('logs')
+                for file in files:
+                    if not file.endswith('.nc'):
+                        continue
+                    new_files.append({
+                        'name': file,
+                        'local_path': os.path.join(root, file),
+                        'case': self.case,
+                        'year': self.start_year,
+                        'month': self.end_year,  # use the month to hold the end year field
+                        'local_status': FileStatus.PRESENT.value
+                    })
             filemanager.add_files(
                 data_type='cmorized',
                 file_list=new_files,
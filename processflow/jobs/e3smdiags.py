@@ -5,14 +5,15 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import logging
 import os
 
-from bs4 import BeautifulSoup
-
 from processflow.jobs.diag import Diag
 from processflow.lib.jobstatus import JobStatus
-from processflow.lib.util import render, print_line
+from processflow.lib.linkcheck import check_links
+from processflow.lib.util import print_line
 
 
 class E3SMDiags(Diag):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super(E3SMDiags, self).__init__(*args, **kwargs)
         self._job_type = 'e3sm_diags'
@@ -40,8 +41,8 @@ class E3SMDiags(Diag):
         custom_output_path = kwargs['config']['diags'][self.job_type].get(
             'custom_output_path')
         if custom_output_path:
-            self._replace_dict['COMPARISON'] = self._short_comp_name
-            self._output_path = self.setup_output_directory(custom_output_path)
+            self._output_path = self.setup_output_directory(
+                custom_output_path, comparison=self._short_comp_name)
         else:
             self._output_path = os.path.join(
                 kwargs['config']['global']['project_path'],
@@ -53,8 +54,7 @@ class E3SMDiags(Diag):
                     start=self.start_year,
                     end=self.end_year,
                     comp=self._short_comp_name))
-        if not os.path.exists(self._output_path):
-            os.makedirs(self._output_path)
+        self.create_output_directory(self._output_path)
     # -----------------------------------------------
 
     def _dep_filter(self, job):
@@ -106,6 +106,12 @@ class E3SMDiags(Diag):
             self.depends_on.append(self_climo.id)
     # -----------------------------------------------
 
+    def workers(self, config):
+        if self._workers is not None:
+            return self._workers
+        return int(config['diags']['e3sm_diags'].get('num_workers', 24))
+    # -----------------------------------------------
+
     def execute(self, config, event_list, slurm_args=None, dryrun=False):
         """
         Generates and submits a run script for e3sm_diags
@@ -138,7 +144,7 @@ class E3SMDiags(Diag):
         variables['test_name'] = self.case
         variables['backend'] = config['diags']['e3sm_diags']['backend']
         variables['results_dir'] = self._output_path
-        variables['num_workers'] = config['diags']['e3sm_diags'].get('num_workers', 24)
+        variables['num_workers'] = self.workers(config)
 
         if self.comparison == 'obs':
             template_input_path = os.path.join(
@@ -153,10 +159,7 @@ class E3SMDiags(Diag):
             variables['reference_data_path'] = input_path
             variables['ref_name'] = self.comparison
             variables['reference_name'] = config['simulations'][self.comparison]['short_name']
-        # remove previous run script if it exists
-        if os.path.exists(param_template_out):
-            os.remove(param_template_out)
-        render(
+        self.render_template(
             variables=variables,
             input_path=template_input_path,
             output_path=param_template_out)
@@ -209,7 +212,8 @@ class E3SMDiags(Diag):
             always_copy=config['global'].get('always_copy', False),
             img_source=self._output_path,
             host_path=self._host_path,
-            event_list=event_list)
+            event_list=event_list,
+            checksum=config['img_hosting'].get('sync_checksum', False))
 
         self._host_url = 'https://{server}/{prefix}/{case}/e3sm_diags/{start:04d}_{end:04d}_vs_{comp}/viewer/index.html'.format(
             server=config['img_hosting']['img_host_server'],
@@ -221,48 +225,36 @@ class E3SMDiags(Diag):
     # -----------------------------------------------
 
     def _check_links(self, config):
+        """
+        Checks the viewer index for missing pages, and every viewer page
+        for missing preview images
 
+        Parameters:
+            config (dict): the global config object
+        Returns:
+            True if all links are found, False otherwise
+        """
         viewer_path = os.path.join(self._output_path, 'viewer', 'index.html')
-        if not os.path.exists(viewer_path):
+        report = check_links(
+            index_path=viewer_path,
+            follow=['html'],
+            sublink_attrs=('data-preview',))
+        if not report.index_found:
             msg = '{}: could not find page index at {}'.format(
                 self.msg_prefix(), viewer_path)
             logging.error(msg)
             return False
-        viewer_head = os.path.join(self._output_path, 'viewer')
-        if not os.path.exists(viewer_head):
-            msg = '{}: could not find output viewer at {}'.format(
-                self.msg_prefix(), viewer_head)
+        if report.errors:
+            msg = '{prefix}: unable to read viewer pages'.format(
+                prefix=self.msg_prefix())
             logging.error(msg)
+            logging.error(report.errors)
             return False
-        missing_links = list()
-        with open(viewer_path, 'r') as viewer_pointer:
-            viewer_page = BeautifulSoup(viewer_pointer, 'lxml')
-            viewer_links = viewer_page.findAll('a')
-            for link in viewer_links:
-                link_path = os.path.join(viewer_head, link.attrs['href'])
-                if not os.path.exists(link_path):
-                    missing_links.append(link_path)
-                    continue
-                if link_path[-4:] == 'html':
-                    link_tail, _ = os.path.split(link_path)
-                    with open(link_path, 'r') as link_pointer:
-                        link_page = BeautifulSoup(link_pointer, 'lxml')
-                        link_links = link_page.findAll('a')
-                        for sublink in link_links:
-                            try:
-                                sublink_preview = sublink.attrs['data-preview']
-                            except:
-                                continue
-                            else:
-                                sublink_path = os.path.join(
-                                    link_tail, sublink_preview)
-                                if not os.path.exists(sublink_path):
-                                    missing_links.append(sublink_path)
-        if missing_links:
+        if report.missing:
             msg = '{prefix}: missing the following links'.format(
                 prefix=self.msg_prefix())
             logging.error(msg)
-            logging.error(missing_links)
+            logging.error(report.missing_paths())
             return False
         else:
             msg = '{prefix}: all links found'.format(
@@ -2,23 +2,43 @@
 A module for the base Job class that all jobs descend from
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
+import hashlib
 import json
 import logging
 import os
 import sys
+import time
 
-from uuid import uuid4
+from collections import OrderedDict
 
 from processflow.lib.jobstatus import JobStatus
 from processflow.lib.serial import Serial
-from processflow.lib.slurm import Slurm
-from processflow.lib.util import render, create_symlink_dir, print_message
+from processflow.lib.util import atomic_write, render, render_template, create_symlink_dir, print_message
+
+# the resource manager arguments every job starts with, jobs share this
+# until custom args are set, and jobs with the same custom args share the result
+DEFAULT_MANAGER_ARGS = {
+    'slurm': ('-t 0-01:00', '-N 1'),
+}
+_custom_manager_args = dict()
+
+# directory mtimes this close to when a manifest was written arent trusted to
+# show later changes, filesystem timestamps are only so fine grained
+MANIFEST_RACY_NS = 1000000000
 
 
 class Job(object):
     """
     A base job class for all post-processing and diagnostic jobs
     """
+    # campaigns can have tens of thousands of jobs, so there's no per job __dict__
+    __slots__ = ('_start_year', '_end_year', '_data_required', '_data_ready',
+                 '_depends_on', '_id', '_job_id', '_has_been_executed', '_status',
+                 '_case', '_short_name', '_run_type', '_job_type', '_input_file_paths',
+                 '_input_base_path', '_console_output_path', '_output_path', '_dryrun',
+                 '_manager', '_manager_args', '_plan_only', '_planned_files',
+                 '_planned_inputs', '_planned_cmd', '_case_paths', '_msg_prefix',
+                 '_workers')
 
     def __init__(self, start, end, case, short_name, data_required=None, dryrun=False, manager=None, **kwargs):
         self._start_year = start
@@ -26,7 +46,9 @@ class Job(object):
         self._data_required = data_required
         self._data_ready = False
         self._depends_on = list()
-        self._id = uuid4().hex[:10]
+        # derived from the jobs identity the first time its asked for, so the same
+        # job gets the same id every time the processflow is run on the same config
+        self._id = None
         self._job_id = 0
         self._has_been_executed = False
         self._status = JobStatus.VALID
@@ -45,29 +67,62 @@ class Job(object):
         else:
             self._manager = Serial()
 
-        self._manager_args = {
-            'slurm': ['-t 0-01:00', '-N 1'],
-        }
+        self._manager_args = DEFAULT_MANAGER_ARGS
+        # set when a retry runs the job with fewer workers than its config asks for
+        self._workers = None
         config = kwargs['config']
-        # setup the default replacement dict
-        self._replace_dict = {
-            'PROJECT_PATH': config['global']['project_path'],
-            'CASEID': case,
-            'REST_YR': '{:04d}'.format(self.start_year + 1),
-            'START_YR': '{:04d}'.format(self.start_year),
-            'END_YR': '{:04d}'.format(self.end_year),
-            'LOCAL_PATH': config['simulations'][case].get('local_path', ''),
-        }
+        # when only planning or simulating the run, nothing is written to disk
+        self._plan_only = True if config['global'].get('plan_only') else False
+        # what the job would have written and run, only kept while planning
+        if self._plan_only:
+            self._planned_files = OrderedDict()
+            self._planned_inputs = OrderedDict()
+        else:
+            self._planned_files = None
+            self._planned_inputs = None
+        self._planned_cmd = None
+        self._case_paths = (
+            config['global']['project_path'],
+            config['simulations'][case].get('local_path', ''))
+        self._msg_prefix = None
     # -----------------------------------------------
 
-    def setup_output_directory(self, custom_output_string):
-        for string, val in list(self._replace_dict.items()):
+    def setup_output_directory(self, custom_output_string, comparison=None):
+        """
+        Replaces the keywords in a custom output path
+
+        Parameters
+        ----------
+            custom_output_string (str): the path from the config
+            comparison (str): the short name of the comparison for diagnostic jobs
+        """
+        project_path, local_path = self._case_paths
+        replace = [
+            ('PROJECT_PATH', project_path),
+            ('CASEID', self._case),
+            ('REST_YR', '{:04d}'.format(self.start_year + 1)),
+            ('START_YR', '{:04d}'.format(self.start_year)),
+            ('END_YR', '{:04d}'.format(self.end_year)),
+            ('LOCAL_PATH', local_path)]
+        if comparison is not None:
+            replace.append(('COMPARISON', comparison))
+        for string, val in replace:
             if string in custom_output_string:
                 custom_output_string = custom_output_string.replace(
                     string, val)
         return custom_output_string
     # -----------------------------------------------
 
+    def create_output_directory(self, path):
+        """
+        Create the directory at path if it doesnt already exist,
+        unless the run is only being planned
+        """
+        if self._plan_only or os.path.exists(path):
+            return
+        os.makedirs(path)
+    # -----------------------------------------------
+
     def setup_dependencies(self, *args, **kwargs):
         msg = '{} has not implemented the setup_dependencies method'.format(
             self.job_type)
@@ -91,6 +146,144 @@ class Job(object):
         raise Exception(msg)
     # -----------------------------------------------
 
+    def validate(self, config, event_list=None):
+        """
+        Check the jobs output, trusting the manifest from an earlier run if the
+        output hasnt changed since it was written, and running the full
+        postvalidate otherwise. A job that ran in this process is always fully
+        validated, and gets a new manifest if its output is valid
+
+        Parameters:
+            config (dict): the global configuration object
+            event_list (EventList): the global event list
+        Returns:
+            True if all output exists as expected, False otherwise
+        """
+        if self._dryrun or self._plan_only:
+            return self.postvalidate(config, event_list=event_list)
+        if not self._has_been_executed and self._check_manifest(config):
+            return True
+        valid = self.postvalidate(config, event_list=event_list)
+        manifest_path = self.manifest_path()
+        try:
+            if valid:
+                self._write_manifest(config)
+            elif os.path.exists(manifest_path):
+                os.remove(manifest_path)
+        except (OSError, ValueError) as e:
+            logging.error('{}: unable to update manifest {}: {}'.format(
+                self.msg_prefix(), manifest_path, repr(e)))
+        return valid
+    # -----------------------------------------------
+
+    def required_variables(self, config):
+        """
+        Returns a dict mapping each data type the job reads to the variables
+        it needs from those files, most jobs read whatever is there
+        """
+        return dict()
+    # -----------------------------------------------
+
+    def output_dirs(self):
+        """
+        Returns the directories the job writes its output to
+        """
+        return [self._output_path] if self._output_path else []
+    # -----------------------------------------------
+
+    def output_files(self, config):
+        """
+        Returns the paths to every output file the job wrote, jobs that share their
+        output directories with other jobs should only return their own files
+        """
+        paths = list()
+        for output_dir in self.output_dirs():
+            for root, _, files in os.walk(output_dir):
+                paths.extend(os.path.join(root, name) for name in files)
+        return paths
+    # -----------------------------------------------
+
+    def manifest_path(self):
+        return os.path.join(
+            self._case_paths[0], 'output', 'manifests', '{}.json'.format(self.id))
+    # -----------------------------------------------
+
+    def config_signature(self, config):
+        """
+        Returns a hash of the settings for the jobs type, a manifest written
+        under different settings doesnt vouch for the output
+        """
+        section = config.get('post-processing', {}).get(self._job_type)
+        if section is None:
+            section = config.get('diags', {}).get(self._job_type, {})
+        key = json.dumps(section, sort_keys=True, default=str)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+    # -----------------------------------------------
+
+    def _write_manifest(self, config, files=None, signature=None):
+        """
+        Write out the size and mtime of every output file, along with the
+        mtime of every directory holding them and the config they were made with
+        """
+        if files is None:
+            files = dict()
+            for path in self.output_files(config):
+                info = os.stat(path)
+                files[path] = [info.st_size, info.st_mtime_ns]
+        dirs = set(self.output_dirs())
+        dirs.update(os.path.dirname(x) for x in files)
+        manifest = {
+            'id': self.id,
+            'identity': self.identity(),
+            'config': signature or self.config_signature(config),
+            'written': time.time_ns(),
+            'dirs': {x: os.stat(x).st_mtime_ns for x in sorted(dirs)},
+            'files': files
+        }
+        manifest_path = self.manifest_path()
+        if not os.path.exists(os.path.dirname(manifest_path)):
+            os.makedirs(os.path.dirname(manifest_path))
+        atomic_write(manifest_path, json.dumps(manifest, sort_keys=True))
+    # -----------------------------------------------
+
+    def _check_manifest(self, config):
+        """
+        Returns True if the manifest matches the output on disk and the current
+        settings for the job type. Only directories
+        are stat'd unless one has changed, which happens when a job sharing the
+        directory writes to it, then the files listed in it are checked instead
+        """
+        manifest_path = self.manifest_path()
+        if not os.path.exists(manifest_path):
+            return False
+        try:
+            with open(manifest_path, 'r') as infile:
+                manifest = json.load(infile)
+            if manifest['identity'] != list(self.identity()):
+                return False
+            if manifest['config'] != self.config_signature(config):
+                return False
+            # a directory changed within a second of the manifest being written
+            # could have changed again without its mtime moving, so its not trusted
+            racy = manifest['written'] - MANIFEST_RACY_NS
+            changed = [path for path, mtime in manifest['dirs'].items()
+                       if mtime >= racy or os.stat(path).st_mtime_ns != mtime]
+            if not changed:
+                return True
+            for path, (size, mtime) in manifest['files'].items():
+                if os.path.dirname(path) not in changed:
+                    continue
+                info = os.stat(path)
+                if info.st_size != size or info.st_mtime_ns != mtime:
+                    return False
+            # the jobs own files are untouched, so refresh the directory signatures
+            self._write_manifest(
+                config, files=manifest['files'], signature=manifest['config'])
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+    # -----------------------------------------------
+
     def get_output_path(self):
         if self.status == JobStatus.COMPLETED:
             return self._output_path
@@ -108,17 +301,63 @@ class Job(object):
         ----------
             custom_args (dict): a mapping of args to the arg values
         """
-        for arg, val in list(custom_args.items()):
-            new_arg = '{} {}'.format(arg, val)
-            for _, manager_args in list(self._manager_args.items()):
-                found = False
-                for idx, marg in enumerate(manager_args):
-                    if arg in marg:
-                        manager_args[idx] = new_arg
-                        found = True
-                        break
-                if not found:
-                    manager_args.append(new_arg)
+        new_args = tuple(
+            (arg, '{} {}'.format(arg, val)) for arg, val in list(custom_args.items()))
+        key = (tuple(sorted(self._manager_args.items())), new_args)
+        merged = _custom_manager_args.get(key)
+        if merged is None:
+            merged = dict()
+            for manager, manager_args in list(self._manager_args.items()):
+                manager_args = list(manager_args)
+                for arg, new_arg in new_args:
+                    found = False
+                    for idx, marg in enumerate(manager_args):
+                        if arg in marg:
+                            manager_args[idx] = new_arg
+                            found = True
+                            break
+                    if not found:
+                        manager_args.append(new_arg)
+                merged[manager] = tuple(manager_args)
+            _custom_manager_args[key] = merged
+        self._manager_args = merged
+    # -----------------------------------------------
+
+    def get_manager_arg(self, arg, manager='slurm'):
+        """
+        Returns the value the jobs resource manager arguments give arg, or None if its not set
+
+        Parameters
+        ----------
+            arg (str): the argument, for example -t
+            manager (str): which resource managers arguments to look in
+        """
+        for marg in self._manager_args.get(manager, ()):
+            name, _, value = marg.partition(' ')
+            if name == arg:
+                return value.strip()
+        return None
+    # -----------------------------------------------
+
+    def workers(self, config):
+        """
+        Returns how many worker processes the job runs, or None for jobs
+        that dont run a pool of workers
+        """
+        return None
+    # -----------------------------------------------
+
+    def set_workers(self, workers):
+        self._workers = workers
+    # -----------------------------------------------
+
+    def prepare_retry(self):
+        """
+        Forget what the failed run set up, so the job can be setup and submitted again
+        """
+        self._input_file_paths = list()
+        self._console_output_path = None
+        self._job_id = 0
     # -----------------------------------------------
 
     def get_report_string(self):
@@ -137,6 +376,9 @@ class Job(object):
         """
         symlinks all data_types sepecified in the jobs _data_required field,
         and puts a copy of the path for the links into the _input_file_paths field
+
+        When planning nothing is linked, the input paths are filled in with
+        every expected file whether its present or not
         """
 
         # create the path to where we should place our temp symlinks
@@ -150,6 +392,10 @@ class Job(object):
 
             # this should never be hit if the config validator did its job
             if not datainfo:
+                if self._plan_only:
+                    # derived types are only added once the job producing them runs
+                    self._plan_derived_input(datatype)
+                    continue
                 print("ERROR: Unable to find config information for {}".format(
                     datatype))
                 sys.exit(1)
@@ -163,12 +409,17 @@ class Job(object):
                     datatype=datatype,
                     case=case,
                     start_year=self._start_year,
-                    end_year=self._end_year)
+                    end_year=self._end_year,
+                    present_only=not self._plan_only)
             else:
                 files = filemanager.get_file_paths_by_year(
                     datatype=datatype,
-                    case=case)
+                    case=case,
+                    present_only=not self._plan_only)
             if not files or len(files) == 0:
+                if self._plan_only:
+                    self._plan_derived_input(datatype)
+                    continue
                 msg = '{prefix}: filemanager cant find input files for datatype {datatype}'.format(
                     prefix=self.msg_prefix(),
                     datatype=datatype)
@@ -185,6 +436,10 @@ class Job(object):
             self._input_file_paths.extend(
                 [os.path.join(self._input_base_path, x) for x in filesnames])
 
+            if self._plan_only:
+                self._planned_inputs.setdefault(datatype, list()).extend(files)
+                continue
+
             # create the symlinks
             create_symlink_dir(
                 src_dir=tail,
@@ -193,6 +448,16 @@ class Job(object):
 
     # -----------------------------------------------
 
+    def _plan_derived_input(self, datatype):
+        """
+        Record a data type that will be produced by one of this jobs dependencies,
+        the input path points to where it would be linked so the command can be planned
+        """
+        self._planned_inputs.setdefault(datatype, None)
+        self._input_file_paths.append(
+            os.path.join(self._input_base_path, datatype))
+    # -----------------------------------------------
+
     def setup_temp_path(self, config, *args, **kwards):
         """
         creates the default input path structure
@@ -210,8 +475,7 @@ class Job(object):
                 'output', 'temp', self._short_name, self._job_type,
                 '{:04d}_{:04d}'.format(self._start_year, self._end_year))
 
-        if not os.path.exists(temp_path):
-            os.makedirs(temp_path)
+        self.create_output_directory(temp_path)
         return temp_path
 
     # -----------------------------------------------
@@ -253,6 +517,15 @@ class Job(object):
     # -----------------------------------------------
 
     def msg_prefix(self):
+        """
+        The name used to refer to the job in messages, built the first time its asked for
+        """
+        if self._msg_prefix is None:
+            self._msg_prefix = self._format_msg_prefix()
+        return self._msg_prefix
+    # -----------------------------------------------
+
+    def _format_msg_prefix(self):
         if self._run_type:
             return '{type}-{run_type}-{start:04d}-{end:04d}-{case}'.format(
                 type=self.job_type,
@@ -284,6 +557,28 @@ class Job(object):
                 case=self.short_name)
     # -----------------------------------------------
 
+    def render_template(self, variables, input_path, output_path):
+        """
+        Render a template into output_path, replacing any previous copy.
+        When planning the rendered text is kept in memory instead
+
+        Parameters
+        ----------
+            variables (dict): the template variables
+            input_path (str): the path to the jinja2 template
+            output_path (str): where the rendered file goes
+        """
+        if self._plan_only:
+            self._planned_files[output_path] = render_template(
+                variables=variables,
+                input_path=input_path)
+            return
+        render(
+            variables=variables,
+            input_path=input_path,
+            output_path=output_path)
+    # -----------------------------------------------
+
     def _submit_cmd_to_manager(self, config, cmd, event_list):
         """
         Takes the jobs main cmd, generates a batch script and submits the script
@@ -304,14 +599,12 @@ class Job(object):
 
         run_script = os.path.join(scripts_path, run_name)
         self._console_output_path = '{}.out'.format(run_script)
-        if os.path.exists(run_script):
-            os.remove(run_script)
 
         # generate the run script using the manager arguments and command
         command = ' '.join(cmd)
         script_prefix = ''
-        if isinstance(self._manager, Slurm):
-            margs = self._manager_args['slurm']
+        if not isinstance(self._manager, Serial):
+            margs = list(self._manager_args['slurm'])
             margs.append(
                 '-o {}'.format(self._console_output_path))
             manager_prefix = '#SBATCH'
@@ -320,22 +613,28 @@ class Job(object):
                     prefix=manager_prefix,
                     value=item)
 
-        with open(run_script, 'w') as batchfile:
-            batchfile.write('#!/bin/bash\n')
-            batchfile.write(script_prefix)
-
         template_input_path = os.path.join(
             config['global']['resource_path'],
             'env_loader_lite.bash')
 
         variables = {
-            'user_env_path': os.environ['CONDA_PREFIX'],
+            'user_env_path': os.environ.get('CONDA_PREFIX', ''),
             'cmd': command
         }
+
+        # when planning, keep the script and command and stop here
+        if self._plan_only:
+            self._planned_cmd = command
+            self._planned_files[run_script] = '#!/bin/bash\n' + script_prefix + render_template(
+                variables=variables,
+                input_path=template_input_path)
+            return False
+
         render(
             variables=variables,
             input_path=template_input_path,
-            output_path=run_script)
+            output_path=run_script,
+            prefix='#!/bin/bash\n' + script_prefix)
 
         # if this is a dry run, set the status and exit
         if self._dryrun:
@@ -356,6 +655,53 @@ class Job(object):
         return self._job_id
     # -----------------------------------------------
 
+    def plan(self):
+        """
+        Returns a description of the job as it would be run: its dependencies,
+        inputs, command and the files it would write
+        """
+        if self._planned_files:
+            run_script = list(self._planned_files.keys())[-1]
+        else:
+            run_script = None
+        return OrderedDict([
+            ('id', self.id),
+            ('job_type', self.job_type),
+            ('case', self.case),
+            ('short_name', self.short_name),
+            ('run_type', self.run_type),
+            ('comparison', self.comparison),
+            ('start_year', self.start_year),
+            ('end_year', self.end_year),
+            ('depends_on', self.depends_on),
+            ('output_path', self._output_path),
+            ('inputs', OrderedDict(
+                (datatype, files if files is not None else 'from dependencies')
+                for datatype, files in self._planned_inputs.items())),
+            ('command', self._planned_cmd),
+            ('run_script', run_script),
+            ('files', list(self._planned_files.keys())),
+        ])
+    # -----------------------------------------------
+
+    def write_planned_files(self):
+        """
+        Write out the scripts that were rendered while planning
+
+        Returns
+        -------
+            the list of paths written
+        """
+        written = list()
+        for path, text in self._planned_files.items():
+            head, _ = os.path.split(path)
+            if head and not os.path.exists(head):
+                os.makedirs(head)
+            atomic_write(path, text)
+            written.append(path)
+        return written
+    # -----------------------------------------------
+
     def prevalidate(self, *args, **kwargs):
         if not self.data_ready:
             msg = '{prefix}: data not ready'.format(prefix=self.msg_prefix())
@@ -374,6 +720,11 @@ class Job(object):
         return self._short_name
     # -----------------------------------------------
 
+    @property
+    def console_output_path(self):
+        return self._console_output_path
+    # -----------------------------------------------
+
     @property
     def comparison(self):
         return 'obs'
@@ -404,8 +755,20 @@ class Job(object):
         return self._depends_on
     # -----------------------------------------------
 
+    def identity(self):
+        """
+        Returns what makes the job unique within a run: its type, case,
+        years, run type and comparison
+        """
+        return (self._job_type, self._case, self._start_year, self._end_year,
+                self._run_type, self.comparison)
+    # -----------------------------------------------
+
     @property
     def id(self):
+        if self._id is None:
+            key = '|'.join(str(x) for x in self.identity())
+            self._id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
         return self._id
     # -----------------------------------------------
 
@@ -459,6 +822,20 @@ class Job(object):
         self._job_id = new_id
     # -----------------------------------------------
 
+    def reattach(self, manager_id, status):
+        """
+        Pick the job back up from a previous run of the processflow, where
+        it was submitted as manager_id
+
+        Parameters:
+            manager_id (int): the id the resource manager gave the job
+            status (JobStatus): the state to monitor the job from, never a finished state
+        """
+        self._job_id = manager_id
+        self._has_been_executed = True
+        self._status = status
+    # -----------------------------------------------
+
     def __str__(self):
         return json.dumps({
             'type': self._job_type,
@@ -467,7 +844,7 @@ class Job(object):
             'data_required': self._data_required,
             'data_ready': self._data_ready,
             'depends_on': self._depends_on,
-            'id': self._id,
+            'id': self.id,
             'job_id': self._job_id,
             'status': self._status.name,
             'case': self._case,
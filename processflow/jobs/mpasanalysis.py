@@ -1,14 +1,15 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
+import logging
 import os
 
-from subprocess import Popen, PIPE
-
 from processflow.jobs.diag import Diag
 from processflow.lib.jobstatus import JobStatus
-from processflow.lib.util import render
+from processflow.lib.logscan import LogScanner
 
 
 class MPASAnalysis(Diag):
+    __slots__ = ('_log_scanner', 'case_start_year')
+
     def __init__(self, *args, **kwargs):
         """
         Parameters
@@ -21,6 +22,7 @@ class MPASAnalysis(Diag):
         self._job_type = 'mpas_analysis'
         self._requires = ''
         self._host_url = ''
+        self._log_scanner = LogScanner(pattern='Error', suffix='.log')
         self.case_start_year = kwargs['config']['simulations']['start_year']
         self._data_required = ['cice', 'ocn',
                                'ocn_restart', 'cice_restart',
@@ -50,8 +52,8 @@ class MPASAnalysis(Diag):
         custom_output_path = kwargs['config']['diags'][self.job_type].get(
             'custom_output_path')
         if custom_output_path:
-            self._replace_dict['COMPARISON'] = self._short_comp_name
-            self._output_path = self.setup_output_directory(custom_output_path)
+            self._output_path = self.setup_output_directory(
+                custom_output_path, comparison=self._short_comp_name)
         else:
             self._output_path = os.path.join(
                 kwargs['config']['global']['project_path'],
@@ -63,8 +65,7 @@ class MPASAnalysis(Diag):
                     start=self.start_year,
                     end=self.end_year,
                     comp=self._short_comp_name))
-        if not os.path.exists(self._output_path):
-            os.makedirs(self._output_path)
+        self.create_output_directory(self._output_path)
 
     # -----------------------------------------------
 
@@ -75,6 +76,12 @@ class MPASAnalysis(Diag):
         return
     # -----------------------------------------------
 
+    def workers(self, config):
+        if self._workers is not None:
+            return self._workers
+        return int(config['diags']['mpas_analysis'].get('num_workers', 8))
+    # -----------------------------------------------
+
     def execute(self, config, event_list, dryrun=False):
         """
         Generates and submits a run script for mpas_analysis
@@ -115,7 +122,7 @@ class MPASAnalysis(Diag):
 
         variables = {
             'case': self.case,
-            'numWorkers': mpas_config.get('num_workers', 8),
+            'numWorkers': self.workers(config),
             'baseInputPath': self._input_base_path,
             'restartSubPath': self._input_base_path,
             'ocnHistSubPath': self._input_base_path,
@@ -140,10 +147,7 @@ class MPASAnalysis(Diag):
             'runMOC': mpas_config.get('run_MOC', ''),
             'htmlSubdirectory': self._host_path
         }
-        # remove previous run script if it exists
-        if os.path.exists(template_out):
-            os.remove(template_out)
-        render(
+        self.render_template(
             variables=variables,
             input_path=template_input_path,
             output_path=template_out)
@@ -175,14 +179,17 @@ class MPASAnalysis(Diag):
             log_path = os.path.join(self._output_path, 'logs')
             if os.path.exists(log_path):
                 # Check that there are actually files inside the log directory
-                if len(os.listdir(log_path)) < 50:
+                if self._log_scanner.count_files(log_path) < 50:
                     return False
-                # grep the logs directory for any errors, if the logs directory exists, and
+                # scan the logs directory for any errors, if the logs directory exists, and
                 # doesnt contain any errors, then the job was probably run previously and finished successfully
-                cmd = 'grep Error {}/*.log'.format(log_path)
-                out, err = Popen(cmd, stdout=PIPE, stderr=PIPE,
-                                 shell=True).communicate()
-                if out or err:
+                error = self._log_scanner.find_error(log_path)
+                if error is not None:
+                    msg = '{prefix}: found error in {log}: {line}'.format(
+                        prefix=self.msg_prefix(),
+                        log=error[0],
+                        line=error[1])
+                    logging.error(msg)
                     return False
                 else:
                     return True
@@ -5,6 +5,7 @@ import re
 
 from processflow.jobs.job import Job
 from processflow.lib.jobstatus import JobStatus
+from processflow.lib.ncheader import check_files
 from processflow.lib.util import print_line, get_data_output_files
 from processflow.lib.filemanager import FileStatus
 
@@ -13,6 +14,7 @@ class Regrid(Job):
     """
     Perform regridding with no climatology or timeseries generation on atm, lnd, and orn data
     """
+    __slots__ = ()
 
     def __init__(self, *args, **kwargs):
         """
@@ -42,8 +44,7 @@ class Regrid(Job):
                 'regrid_' + kwargs['config']['post-processing']['regrid'][self.run_type]['destination_grid_name'],
                 self._short_name,
                 self.run_type)
-        if not os.path.exists(self._output_path):
-            os.makedirs(self._output_path)
+        self.create_output_directory(self._output_path)
     # -----------------------------------------------
 
     def setup_dependencies(self, *args, **kwargs):
@@ -97,9 +98,10 @@ class Regrid(Job):
         # input_path, _ = os.path.split(self._input_file_paths[0])
 
         # clean up the input directory to make sure there's only nc files
-        for item in os.listdir(input_path):
-            if not item[-3:] == '.nc':
-                os.remove(os.path.join(input_path, item))
+        if not self._plan_only:
+            for item in os.listdir(input_path):
+                if not item[-3:] == '.nc':
+                    os.remove(os.path.join(input_path, item))
 
         cmd.extend([
             '-O', self._output_path,
@@ -129,9 +131,30 @@ class Regrid(Job):
                             mon=month)
                         logging.error(msg)
                     return False
+
+        # make sure none of the regridded files were cut short
+        errors = check_files(
+            [x for x in self.output_files(config) if x.endswith('.nc')])
+        if errors:
+            if self._has_been_executed:
+                for error in errors.values():
+                    logging.error('{prefix}: {error}'.format(
+                        prefix=self.msg_prefix(), error=error))
+            return False
         return True
     # -----------------------------------------------
 
+    def output_files(self, config):
+        """
+        Returns the regridded files for this jobs years, the regrid
+        directory is shared by every regrid job of the same data type
+        """
+        pattern = re.compile('|'.join(
+            r'%04d-\d\d' % year for year in range(self.start_year, self.end_year + 1)))
+        return [os.path.join(self._output_path, x)
+                for x in os.listdir(self._output_path) if pattern.search(x)]
+    # -----------------------------------------------
+
     def handle_completion(self, filemanager, event_list, config, *args, **kwargs):
         if self.status != JobStatus.COMPLETED:
             msg = '{prefix}: Job failed, not running completion handler'.format(
@@ -4,6 +4,7 @@ import os
 
 from processflow.jobs.job import Job
 from processflow.lib.jobstatus import JobStatus
+from processflow.lib.ncheader import check_files
 from processflow.lib.util import get_ts_output_files, print_line
 from processflow.lib.filemanager import FileStatus
 
@@ -12,6 +13,7 @@ class Timeseries(Job):
     """
     A Job subclass for managing time series variable extraction
     """
+    __slots__ = ('_regrid', '_regrid_path')
 
     def __init__(self, *args, **kwargs):
         super(Timeseries, self).__init__(*args, **kwargs)
@@ -40,8 +42,7 @@ class Timeseries(Job):
                 self._short_name,
                 config['simulations'][self.case]['native_grid_name'],
                 '{length}yr'.format(length=self.end_year - self.start_year + 1))
-        if not os.path.exists(self._output_path):
-            os.makedirs(self._output_path)
+        self.create_output_directory(self._output_path)
 
         regrid_map_path = config['post-processing']['timeseries'].get(
             'regrid_map_path')
@@ -112,10 +113,62 @@ class Timeseries(Job):
                         logging.error(msg)
                     return False
 
+        # check each file has its variable and every month, and wasnt cut short
+        variables = dict()
+        for output_dir in self.output_dirs():
+            for var in config['post-processing']['timeseries'][self._run_type]:
+                file_name = "{var}_{start:04d}01_{end:04d}12.nc".format(
+                    var=var,
+                    start=self.start_year,
+                    end=self.end_year)
+                variables[os.path.join(output_dir, file_name)] = [var]
+        errors = check_files(
+            list(variables.keys()),
+            variables=variables,
+            time_length=(self.end_year - self.start_year + 1) * 12)
+        if errors:
+            if self._has_been_executed:
+                for error in errors.values():
+                    logging.error('{prefix}: {error}'.format(
+                        prefix=self.msg_prefix(), error=error))
+            return False
+
         # if nothing was missing then we must be done
         return True
     # -----------------------------------------------
 
+    def required_variables(self, config):
+        variables = config['post-processing']['timeseries'][self._run_type]
+        if not isinstance(variables, list):
+            variables = [variables]
+        return {self._run_type: variables}
+    # -----------------------------------------------
+
+    def output_dirs(self):
+        if self._regrid:
+            return [self._output_path, self._regrid_path]
+        return [self._output_path]
+    # -----------------------------------------------
+
+    def output_files(self, config):
+        """
+        Returns the variable files for this jobs years, the timeseries
+        directories are shared by every job of the same length
+        """
+        paths = list()
+        for output_dir in self.output_dirs():
+            for var in config['post-processing']['timeseries'][self._run_type]:
+                file_path = os.path.join(
+                    output_dir,
+                    "{var}_{start:04d}01_{end:04d}12.nc".format(
+                        var=var,
+                        start=self.start_year,
+                        end=self.end_year))
+                if os.path.exists(file_path):
+                    paths.append(file_path)
+        return paths
+    # -----------------------------------------------
+
     def execute(self, config, event_list, dryrun=False):
         """
         Generates and submits a run script for e3sm_diags
@@ -0,0 +1,102 @@
+"""
+Helpers for inspecting and unpacking diagnostic output archives without
+a round trip through the job output directory
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import logging
+import os
+import stat
+import tarfile
+
+from shutil import copyfileobj
+
+# the permission bits apache needs on hosted output, equivalent to chmod go+rx
+HOST_MODE_BITS = stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH
+
+
+def _split_member(name, prefix):
+    """
+    Returns the member path relative to prefix as a list of components,
+    or None if the member isnt below prefix or would escape it
+    """
+    parts = [x for x in name.split('/') if x and x != '.']
+    if prefix:
+        if not parts or parts[0] != prefix:
+            return None
+        parts = parts[1:]
+    if '..' in parts or name.startswith('/'):
+        return None
+    return parts
+# -----------------------------------------------
+
+
+def tar_member_counts(tar_path, prefix=''):
+    """
+    Count the entries directly inside each first level directory of the archive,
+    files and directories alike as os.listdir would, reading only the member headers
+
+    Parameters:
+        tar_path (str): path to the tar archive
+        prefix (str): the top level directory the counts are relative to,
+            members outside of it are ignored
+    Returns:
+        counts (dict): a mapping of directory name to number of entries
+    """
+    children = dict()
+    with tarfile.open(tar_path, 'r') as archive:
+        for member in archive:
+            parts = _split_member(member.name, prefix)
+            if not parts:
+                continue
+            if len(parts) == 1:
+                if member.isdir():
+                    children.setdefault(parts[0], set())
+                continue
+            # deeper members only count toward the entry their set directory holds
+            children.setdefault(parts[0], set()).add(parts[1])
+    return {key: len(val) for key, val in children.items()}
+# -----------------------------------------------
+
+
+def extract_tar(tar_path, dst, prefix='', mode_bits=HOST_MODE_BITS):
+    """
+    Stream the members of an archive into dst, stripping the leading prefix
+    directory and setting permissions on each file as its written
+
+    Parameters:
+        tar_path (str): path to the tar archive
+        dst (str): the directory to extract into
+        prefix (str): the top level directory to strip from member names
+        mode_bits (int): permission bits to add to every extracted file and directory
+    Returns:
+        the number of files written
+    """
+    written = 0
+    if not os.path.exists(dst):
+        os.makedirs(dst)
+    os.chmod(dst, os.stat(dst).st_mode | mode_bits)
+    with tarfile.open(tar_path, 'r') as archive:
+        for member in archive:
+            parts = _split_member(member.name, prefix)
+            if not parts:
+                continue
+            target = os.path.join(dst, *parts)
+            if member.isdir():
+                if not os.path.exists(target):
+                    os.makedirs(target)
+                os.chmod(target, (member.mode & 0o7777) | 0o700 | mode_bits)
+                continue
+            if not member.isfile():
+                logging.info('skipping non-regular archive member %s', member.name)
+                continue
+            parent = os.path.dirname(target)
+            if not os.path.exists(parent):
+                os.makedirs(parent)
+                os.chmod(parent, os.stat(parent).st_mode | mode_bits)
+            source = archive.extractfile(member)
+            with open(target, 'wb') as outfile:
+                copyfileobj(source, outfile)
+            os.chmod(target, (member.mode & 0o7777) | 0o600 | mode_bits)
+            written += 1
+    return written
+# -----------------------------------------------
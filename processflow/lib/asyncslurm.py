@@ -0,0 +1,237 @@
+"""
+An asyncio implementation of the slurm interface, so that submissions, status
+lookups and cancellations can run side by side instead of one at a time
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import asyncio
+import logging
+import os
+import time
+
+from processflow.lib.metrics import metrics
+from processflow.lib.slurm import Slurm
+
+# the most slurm commands that are allowed to run at the same time
+MAX_CONCURRENT_CALLS = 8
+# seconds a single slurm command is given before its killed and retried
+CALL_TIMEOUT = 60
+# the number of times a command is tried before giving up
+MAX_TRIES = 10
+# the first retry waits this many seconds, doubling on each retry after that
+BACKOFF = 1.0
+MAX_BACKOFF = 30.0
+
+
+class SlurmCallError(Exception):
+    """
+    Raised when a slurm command fails on every try
+    """
+    pass
+
+
+class AsyncSlurm(Slurm):
+    """
+    A Slurm manager that runs its commands as asyncio subprocesses, bounded
+    by a semaphore, with a timeout on every call and exponential backoff between
+    retries. The blocking methods from Slurm are kept for callers that dont
+    run an event loop, they drive a private loop until their call is done.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT_CALLS, timeout=CALL_TIMEOUT,
+                 tries=MAX_TRIES, backoff=BACKOFF):
+        """
+        Parameters:
+            max_concurrent (int): the most slurm commands to run at once
+            timeout (float): seconds to wait on a single command
+            tries (int): the number of times to try each command
+            backoff (float): seconds to wait before the first retry
+        """
+        super(AsyncSlurm, self).__init__()
+        self._timeout = timeout
+        self._tries = tries
+        self._backoff = backoff
+        self._loop = asyncio.new_event_loop()
+        self._max_concurrent = max_concurrent
+        # made on the first call, from inside the loop its used on, before python 3.10
+        # a semaphore made here would belong to whatever loop was current at the time
+        self._semaphore = None
+    # -----------------------------------------------
+
+    def close(self):
+        if not self._loop.is_closed():
+            self._loop.close()
+    # -----------------------------------------------
+
+    def _run_sync(self, coro):
+        return self._loop.run_until_complete(coro)
+    # -----------------------------------------------
+
+    async def _call(self, cmd, check=None):
+        """
+        Run a slurm command, retrying it if it times out or writes to stderr
+
+        Parameters:
+            cmd (list): the command and its arguments
+            check (coroutine function): optional, awaited after a failed try, if it
+                returns anything other than None that value is returned in place of the
+                command output, used to find submissions that went through despite an error
+        Returns:
+            the stdout of the command (bytes)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        err = b''
+        for attempt in range(self._tries):
+            if attempt:
+                delay = min(self._backoff * 2 ** (attempt - 1), MAX_BACKOFF)
+                await asyncio.sleep(delay)
+            async with self._semaphore:
+                start = time.time()
+                try:
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd,
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE)
+                except OSError as e:
+                    err = str(e).encode('utf-8')
+                    logging.error('unable to start %s: %s', cmd[0], e)
+                    metrics.inc('processflow_manager_call_errors_total', command=cmd[0])
+                    continue
+                try:
+                    out, err = await asyncio.wait_for(
+                        proc.communicate(), timeout=self._timeout)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+                    err = 'timed out after {} seconds'.format(
+                        self._timeout).encode('utf-8')
+                metrics.observe(
+                    'processflow_manager_call_seconds', time.time() - start, command=cmd[0])
+            if not err:
+                return out
+            logging.error('%s failed on try %d: %s', ' '.join(cmd), attempt + 1, err)
+            metrics.inc('processflow_manager_call_errors_total', command=cmd[0])
+            if check is not None:
+                found = await check()
+                if found is not None:
+                    return found
+        raise SlurmCallError('SLURM ERROR: {cmd}: {err}'.format(
+            cmd=' '.join(cmd),
+            err=err.decode('utf-8', 'replace').strip()))
+    # -----------------------------------------------
+
+    async def batch_async(self, cmd, sargs=None):
+        """
+        Submit a run script to the batch queue
+
+        Parameters:
+            cmd (str): The path to the run script that should be submitted
+            sargs (str): The additional arguments to pass to slurm
+        Returns:
+            job id of the new job (int), or 0 if the submission failed
+        """
+        command = ['sbatch', cmd, sargs] if sargs is not None else ['sbatch', cmd]
+
+        async def already_submitted():
+            # sbatch can report an error after the job has actually been queued
+            try:
+                queue = await self.queue_async()
+            except SlurmCallError:
+                return None
+            for job in queue:
+                if job.get('COMMAND') == cmd.encode('utf-8'):
+                    return 'Submitted batch job {}'.format(
+                        job['JOBID'].decode('utf-8')).encode('utf-8')
+            return None
+
+        try:
+            out = await self._call(command, check=already_submitted)
+        except SlurmCallError as e:
+            logging.error('Batch job submission failed: %s', e)
+            return 0
+        out = out.split()
+        if b'error' in out:
+            return 0
+        try:
+            return int(out[-1])
+        except (IndexError, ValueError):
+            logging.error('error submitting job to slurm %s', out)
+            return 0
+    # -----------------------------------------------
+
+    async def showjob_async(self, jobid):
+        """
+        Returns a JobInfo for the job with the given id
+        """
+        out = await self._call(['scontrol', 'show', 'job', str(jobid)])
+        return self._parse_showjob(out)
+    # -----------------------------------------------
+
+    async def showjobs_async(self, jobids):
+        """
+        Look up a group of jobs at the same time
+
+        Parameters:
+            jobids (list): the ids of the jobs to look up
+        Returns:
+            a dict mapping each id to its JobInfo, or to the exception
+            raised while looking it up
+        """
+        jobids = list(jobids)
+        results = await asyncio.gather(
+            *[self.showjob_async(x) for x in jobids],
+            return_exceptions=True)
+        return dict(zip(jobids, results))
+    # -----------------------------------------------
+
+    async def queue_async(self):
+        """
+        Returns the list of jobs in the queue for this user
+        """
+        out = await self._call(
+            ['squeue', '-u', os.environ['USER'], '-o', '%i|%j|%o|%t'])
+        return self._parse_queue(out)
+    # -----------------------------------------------
+
+    async def cancel_async(self, job_id):
+        """
+        Cancel a job, returns True if scancel succeeded
+        """
+        try:
+            await self._call(['scancel', str(job_id)])
+        except SlurmCallError as e:
+            logging.error(str(e))
+            return False
+        return True
+    # -----------------------------------------------
+
+    async def cancel_jobs_async(self, job_ids):
+        job_ids = list(job_ids)
+        results = await asyncio.gather(
+            *[self.cancel_async(x) for x in job_ids])
+        return dict(zip(job_ids, results))
+    # -----------------------------------------------
+
+    def batch(self, cmd, sargs=None):
+        return self._run_sync(self.batch_async(cmd, sargs))
+    # -----------------------------------------------
+
+    def showjob(self, jobid):
+        return self._run_sync(self.showjob_async(jobid))
+    # -----------------------------------------------
+
+    def showjobs(self, jobids):
+        return self._run_sync(self.showjobs_async(jobids))
+    # -----------------------------------------------
+
+    def queue(self):
+        return self._run_sync(self.queue_async())
+    # -----------------------------------------------
+
+    def cancel(self, job_id):
+        return self._run_sync(self.cancel_async(job_id))
+    # -----------------------------------------------
+
+    def cancel_jobs(self, job_ids):
+        return self._run_sync(self.cancel_jobs_async(job_ids))
+    # -----------------------------------------------
@@ -0,0 +1,558 @@
+"""
+Hosts many processflow runs in one long running process. The runs share one
+resource manager, whose jobs are looked up in a single bulk call on each pass,
+one set of directory listings for the input directories they have in common,
+and one budget for how many jobs can be running at once.
+
+Runs are submitted and removed at runtime through a unix socket, with one json
+request per line and one json reply per line:
+
+    {"command": "submit", "config": "/path/to/run.cfg", "args": ["--live"]}
+    {"command": "remove", "project": "/path/to/project", "cancel": false}
+    {"command": "list"}
+    {"command": "shutdown"}
+
+Every reply has "ok", and "error" when ok is false. From the shell:
+
+    python -m processflow.lib.daemon submit /path/to/run.cfg -- --live
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from collections import OrderedDict
+
+from configobj import ConfigObj
+
+from processflow.lib.events import EventList
+from processflow.lib.logpipe import start_logging, stop_logging
+from processflow.lib.metrics import metrics
+from processflow.lib.project import Project
+from processflow.lib.util import print_debug, print_line
+
+DEFAULT_SOCKET = os.path.join(os.path.expanduser('~'), '.processflow', 'daemon.sock')
+# seconds between passes over the hosted runs, requests are answered as they come in
+LOOP_DELAY = 10
+# seconds a client waits on the daemon to answer a request
+REQUEST_TIMEOUT = 300
+# a directory modified this close to when it was listed may have changed again unseen
+RACY_NS = 1000000000
+# flags for runs that never reach the main loop
+UNHOSTED_ARGS = ['--plan', '--simulate', '--daemon', '-v', '--version']
+
+
+class JobBudget(object):
+    """
+    The most jobs the hosted runs can have running at once, between all of them
+
+    Parameters:
+        limit (int): the number of jobs
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._runmanagers = list()
+    # -----------------------------------------------
+
+    def register(self, runmanager):
+        self._runmanagers.append(runmanager)
+    # -----------------------------------------------
+
+    def unregister(self, runmanager):
+        if runmanager in self._runmanagers:
+            self._runmanagers.remove(runmanager)
+    # -----------------------------------------------
+
+    def running(self):
+        return sum(len(x.running_jobs) for x in self._runmanagers)
+    # -----------------------------------------------
+
+    def available(self):
+        return self.limit - self.running()
+    # -----------------------------------------------
+
+
+class DirectoryListings(object):
+    """
+    The names in each input directory, shared by every hosted run. A directory
+    is listed again only once its mtime changes, and its mtime is only checked
+    once per pass, so runs reading the same case data dont each check every file
+    """
+
+    def __init__(self):
+        # directory -> (mtime_ns, listed_ns, frozenset of names)
+        self._listings = dict()
+        self._checked = set()
+    # -----------------------------------------------
+
+    def refresh(self):
+        """
+        Start a new pass, every directory is checked for changes again
+        """
+        self._checked = set()
+    # -----------------------------------------------
+
+    def names(self, directory):
+        """
+        Returns the names in the directory, empty if it doesnt exist
+        """
+        cached = self._listings.get(directory)
+        if cached is not None and directory in self._checked:
+            return cached[2]
+        self._checked.add(directory)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._listings.pop(directory, None)
+            return frozenset()
+        if cached is None or cached[0] != mtime or cached[1] - mtime < RACY_NS:
+            try:
+                names = frozenset(os.listdir(directory))
+            except OSError:
+                return frozenset()
+            self._listings[directory] = (mtime, time.time_ns(), names)
+            return names
+        return cached[2]
+    # -----------------------------------------------
+
+    def exists(self, path):
+        directory, name = os.path.split(path)
+        return name in self.names(directory)
+    # -----------------------------------------------
+
+
+class SharedManager(object):
+    """
+    Wraps the one resource manager every hosted run submits through. The state
+    of every hosted job is looked up in one bulk call at the start of each pass,
+    and each run's lookups are answered from it
+
+    Parameters:
+        manager (Slurm, AsyncSlurm, Serial): the resource manager
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self._states = dict()
+    # -----------------------------------------------
+
+    def __getattr__(self, name):
+        return getattr(self.manager, name)
+    # -----------------------------------------------
+
+    def _lookup(self, manager_ids):
+        if not manager_ids:
+            return dict()
+        if hasattr(self.manager, 'showjobs'):
+            return self.manager.showjobs(manager_ids)
+        states = dict()
+        for manager_id in manager_ids:
+            try:
+                states[manager_id] = self.manager.showjob(manager_id)
+            except Exception as e:
+                states[manager_id] = e
+        return states
+    # -----------------------------------------------
+
+    def poll(self, manager_ids):
+        """
+        Look up every job at once, replacing the states from the last pass
+        """
+        self._states = dict(self._lookup(list(set(manager_ids))))
+    # -----------------------------------------------
+
+    def showjobs(self, manager_ids):
+        missing = [x for x in manager_ids if x not in self._states]
+        if missing:
+            self._states.update(self._lookup(missing))
+        return {x: self._states[x] for x in manager_ids}
+    # -----------------------------------------------
+
+    def showjob(self, manager_id):
+        job_info = self.showjobs([manager_id])[manager_id]
+        if isinstance(job_info, Exception):
+            raise job_info
+        return job_info
+    # -----------------------------------------------
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.decode('utf-8'))
+                if not isinstance(request, dict):
+                    raise ValueError
+            except ValueError:
+                reply = {'ok': False, 'error': 'each request must be a json object on its own line'}
+            else:
+                reply = self.server.host.call(request)
+            self.wfile.write((json.dumps(reply, default=str) + '\n').encode('utf-8'))
+            self.wfile.flush()
+    # -----------------------------------------------
+
+
+class Daemon(object):
+    """
+    Parameters:
+        socket_path (str): where to listen for requests
+        max_jobs (int): the most jobs to have running at once between every run,
+            defaults to the number of nodes the resource manager reports
+        manager (object): the resource manager to share, slurm by default
+        log_path (str): the log every hosted run writes to, next to the socket by default
+        loop_delay (float): seconds between passes over the hosted runs
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, max_jobs=None, manager=None,
+                 log_path=None, loop_delay=LOOP_DELAY):
+        if manager is None:
+            from processflow.lib.asyncslurm import AsyncSlurm
+            manager = AsyncSlurm()
+        self.socket_path = os.path.abspath(socket_path)
+        self.log_path = log_path or os.path.join(
+            os.path.dirname(self.socket_path), 'daemon.log')
+        self.loop_delay = loop_delay
+        self.manager = SharedManager(manager)
+        self.budget = JobBudget(max_jobs or manager.get_node_number())
+        self.listings = DirectoryListings()
+        # project_path -> Project
+        self.projects = OrderedDict()
+        self.event_list = EventList()
+        self._requests = queue.Queue()
+        self._server = None
+        self._running = False
+    # -----------------------------------------------
+
+    def start(self):
+        """
+        Start the log and start listening on the socket
+        """
+        directory = os.path.dirname(self.socket_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        if os.path.exists(self.socket_path):
+            try:
+                send_request({'command': 'list'}, self.socket_path, timeout=5)
+            except (OSError, ValueError):
+                # left behind by a daemon that didnt shut down cleanly
+                os.remove(self.socket_path)
+            else:
+                raise Exception('a daemon is already listening on {}'.format(self.socket_path))
+        start_logging(log_path=self.log_path)
+
+        self._server = socketserver.ThreadingUnixStreamServer(
+            self.socket_path, _RequestHandler)
+        self._server.daemon_threads = True
+        self._server.host = self
+        thread = threading.Thread(
+            target=self._server.serve_forever, name='processflow-daemon')
+        thread.daemon = True
+        thread.start()
+        self._running = True
+        msg = 'Daemon listening on {}, running at most {} jobs'.format(
+            self.socket_path, self.budget.limit)
+        print_line(msg, self.event_list)
+    # -----------------------------------------------
+
+    def run(self):
+        """
+        Host runs until asked to shutdown
+        """
+        self.start()
+        try:
+            while self._running:
+                self.step()
+                self._wait(self.loop_delay)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+    # -----------------------------------------------
+
+    def _wait(self, timeout):
+        """
+        Answer requests as they come in until its time for the next pass
+        """
+        deadline = time.time() + timeout
+        while self._running:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            try:
+                request, reply = self._requests.get(timeout=remaining)
+            except queue.Empty:
+                return
+            reply.put(self.handle(request))
+    # -----------------------------------------------
+
+    def step(self):
+        """
+        Run one pass over every hosted run that hasnt finished
+        """
+        self.listings.refresh()
+        active = [x for x in self.projects.values() if x.status is None]
+        self.manager.poll([
+            item['manager_id']
+            for project in active
+            for item in project.runmanager.running_jobs
+            if item['manager_id'] != 0])
+        for project in active:
+            try:
+                project.step()
+            except Exception as e:
+                msg = '{}: unexpected error, the run has been stopped: {}'.format(
+                    project.project_path, repr(e))
+                logging.error(msg)
+                print_debug(e)
+                print_line(msg, self.event_list)
+                project.write_state()
+                self._drop(project)
+                project.status = 0
+        metrics.collect()
+    # -----------------------------------------------
+
+    def call(self, request):
+        """
+        Hand a request to the main loop and wait for its reply, called from
+        the socket server's threads
+        """
+        reply = queue.Queue(maxsize=1)
+        self._requests.put((request, reply))
+        try:
+            return reply.get(timeout=REQUEST_TIMEOUT)
+        except queue.Empty:
+            return {'ok': False, 'error': 'the daemon didnt answer in time'}
+    # -----------------------------------------------
+
+    def handle(self, request):
+        """
+        Carry out a request, returning the reply
+        """
+        commands = {
+            'submit': self.submit,
+            'remove': self.remove,
+            'list': self.list_projects,
+            'shutdown': self.shutdown,
+        }
+        command = commands.get(request.get('command'))
+        if command is None:
+            return {'ok': False, 'error': 'unknown command {}, expected one of {}'.format(
+                request.get('command'), ', '.join(sorted(commands)))}
+        try:
+            return command(request)
+        except Exception as e:
+            print_debug(e)
+            return {'ok': False, 'error': repr(e)}
+    # -----------------------------------------------
+
+    def submit(self, request):
+        """
+        Setup a run from its config and start hosting it
+        """
+        config_path = request.get('config')
+        args = [str(x) for x in request.get('args', list())]
+        if not config_path or not os.path.isfile(config_path):
+            return {'ok': False, 'error': 'no config file at {}'.format(config_path)}
+        unhosted = [x for x in args if x in UNHOSTED_ARGS]
+        if unhosted:
+            return {'ok': False, 'error': '{} cant be used with a hosted run'.format(
+                ', '.join(unhosted))}
+        # a second run in the same project would replace the first ones file database
+        project_path = ConfigObj(config_path).get('global', {}).get('project_path')
+        if project_path and os.path.abspath(project_path) in self.projects:
+            return {'ok': False, 'error': '{} is already hosted'.format(project_path)}
+
+        from processflow.lib.initialize import initialize
+        event_list = EventList()
+        try:
+            result = initialize(
+                argv=[os.path.abspath(config_path)] + args,
+                event_list=event_list,
+                host=self)
+        except SystemExit:
+            result = (False, False)
+        config, runmanager = result[0], result[1]
+        if not config:
+            return {'ok': False, 'error': 'unable to setup {}, see {}'.format(
+                config_path, self.log_path)}
+
+        project = Project(config, runmanager, event_list)
+        project_path = os.path.abspath(project.project_path)
+        self.budget.register(runmanager)
+        self.projects[project_path] = project
+        msg = 'Hosting {}'.format(project_path)
+        print_line(msg, self.event_list)
+        return {
+            'ok': True,
+            'project': project_path,
+            'jobs': sum(len(case['jobs']) for case in runmanager.cases),
+        }
+    # -----------------------------------------------
+
+    def _drop(self, project):
+        project.close()
+        self.budget.unregister(project.runmanager)
+        project.runmanager.unregister_metrics()
+        project.filemanager.unregister_metrics()
+        if project.runmanager.journal is not None:
+            project.runmanager.journal.close()
+        if project.event_list is not None:
+            project.event_list.close()
+    # -----------------------------------------------
+
+    def remove(self, request):
+        """
+        Stop hosting a run, its jobs are left running unless cancel is set, a
+        run submitted again later picks them back up from its journal
+        """
+        project_path = os.path.abspath(request.get('project') or '')
+        project = self.projects.get(project_path)
+        if project is None:
+            return {'ok': False, 'error': '{} is not hosted'.format(project_path)}
+        cancelled = list()
+        if request.get('cancel'):
+            for item in project.runmanager.running_jobs:
+                if item['manager_id'] != 0:
+                    self.manager.cancel(item['manager_id'])
+                    cancelled.append(item['manager_id'])
+            project.runmanager.running_jobs = list()
+        if project.status is None:
+            project.write_state()
+            self._drop(project)
+        del self.projects[project_path]
+        msg = 'Stopped hosting {}'.format(project_path)
+        print_line(msg, self.event_list)
+        return {'ok': True, 'project': project_path, 'cancelled': cancelled}
+    # -----------------------------------------------
+
+    def list_projects(self, request=None):
+        """
+        Report on every hosted run
+        """
+        projects = list()
+        for project_path, project in self.projects.items():
+            counts = dict()
+            for case in project.runmanager.cases:
+                for job in case['jobs']:
+                    counts[job.status.name] = counts.get(job.status.name, 0) + 1
+            if project.status is None:
+                state = 'running'
+            else:
+                state = 'complete' if project.status == 1 else 'failed'
+            projects.append({
+                'project': project_path,
+                'state': state,
+                'end_year': int(project.config['simulations']['end_year']),
+                'running': len(project.runmanager.running_jobs),
+                'jobs': counts,
+            })
+        return {
+            'ok': True,
+            'projects': projects,
+            'budget': {'limit': self.budget.limit, 'running': self.budget.running()},
+        }
+    # -----------------------------------------------
+
+    def shutdown(self, request=None):
+        """
+        Stop the daemon once the current request is answered, the hosted runs
+        jobs are left running
+        """
+        self._running = False
+        return {'ok': True}
+    # -----------------------------------------------
+
+    def stop(self):
+        self._running = False
+        for project in self.projects.values():
+            if project.status is None:
+                project.write_state()
+                self._drop(project)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        if hasattr(self.manager.manager, 'close'):
+            self.manager.manager.close()
+        stop_logging()
+    # -----------------------------------------------
+
+
+def send_request(request, socket_path=DEFAULT_SOCKET, timeout=REQUEST_TIMEOUT):
+    """
+    Send a request to a running daemon
+
+    Parameters:
+        request (dict): the request
+        socket_path (str): the daemon's socket
+        timeout (float): seconds to wait for the reply
+    Returns:
+        the reply, as a dict
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            reply += chunk
+    finally:
+        sock.close()
+    return json.loads(reply.decode('utf-8'))
+# -----------------------------------------------
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m processflow.lib.daemon',
+        description='Talk to a running processflow daemon')
+    parser.add_argument(
+        '--socket',
+        default=DEFAULT_SOCKET,
+        help='The daemons socket, defaults to {}'.format(DEFAULT_SOCKET))
+    subparsers = parser.add_subparsers(dest='command')
+    submit = subparsers.add_parser('submit', help='Start hosting a run')
+    submit.add_argument('config', help='Path to the run configuration file')
+    submit.add_argument('args', nargs='*', help='Arguments for the run, after --')
+    remove = subparsers.add_parser('remove', help='Stop hosting a run')
+    remove.add_argument('project', help='The project_path of the run')
+    remove.add_argument('--cancel', action='store_true', help='Cancel the runs jobs')
+    subparsers.add_parser('list', help='List the hosted runs')
+    subparsers.add_parser('shutdown', help='Stop the daemon')
+    pargs = parser.parse_args(argv)
+    if not pargs.command:
+        parser.print_help()
+        return 1
+
+    request = {'command': pargs.command}
+    if pargs.command == 'submit':
+        request['config'] = os.path.abspath(pargs.config)
+        request['args'] = pargs.args
+    elif pargs.command == 'remove':
+        request['project'] = os.path.abspath(pargs.project)
+        request['cancel'] = pargs.cancel
+    reply = send_request(request, pargs.socket)
+    print(json.dumps(reply, indent=4, sort_keys=True))
+    return 0 if reply.get('ok') else 1
+# -----------------------------------------------
+
+
+if __name__ == '__main__':
+    sys.exit(main())
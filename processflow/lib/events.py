@@ -1,5 +1,23 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
+import io
+import json
+import logging
+
+from collections import deque
 from datetime import datetime
+from enum import IntEnum
+
+# how many events are kept in memory, older events are dropped
+DEFAULT_MAX_EVENTS = 1000
+
+
+class EventType(IntEnum):
+    MESSAGE = 0
+    JOB_STATE = 1
+    FILE_ARRIVAL = 2
+    SUBMISSION = 3
+    VALIDATION = 4
+# -----------------------------------------------
 
 
 class Event(object):
@@ -10,12 +28,15 @@ class Event(object):
         time (datetime): The time the event took place
         message (str): The message the event should display
         data (job, optional): The job that spawned the message
+        event_type (EventType, optional): what kind of event this is, defaults to a plain message
     """
+    __slots__ = ('_time', '_message', '_data', '_event_type')
 
     def __init__(self, **kwargs):
         self._time = kwargs.get('time')
         self._message = kwargs.get('message')
         self._data = kwargs.get('data')
+        self._event_type = kwargs.get('event_type', EventType.MESSAGE)
     # -----------------------------------------------
 
     @property
@@ -50,33 +71,113 @@ class Event(object):
         self._data = ndata
     # -----------------------------------------------
 
+    @property
+    def event_type(self):
+        return self._event_type
+    # -----------------------------------------------
+
+    def to_json(self):
+        """
+        Returns the event as a single line of json, jobs are recorded by their id
+        """
+        data = self._data
+        if hasattr(data, 'msg_prefix'):
+            data = {
+                'id': data.id,
+                'job': data.msg_prefix(),
+                'status': data.status.name
+            }
+        return json.dumps({
+            'time': self._time.isoformat(),
+            'type': self._event_type.name,
+            'message': self._message,
+            'data': data
+        }, default=str)
+    # -----------------------------------------------
+
 
 class EventList(object):
     """
-    A list for holding global events
+    A bounded list of global events that components can subscribe to
+
+    Only the most recent maxlen events are kept in memory, if a spill file is set
+    every event is also appended to it as a line of json
 
     Parameters:
-        event_list (list): list of events
+        maxlen (int): how many events to keep in memory
+        spill_path (str): a file to append every event to, optional
     """
 
-    def __init__(self):
-        self._list = []
+    def __init__(self, maxlen=DEFAULT_MAX_EVENTS, spill_path=None):
+        self._list = deque(maxlen=maxlen)
+        self._subscribers = list()
+        self._spill = None
+        if spill_path:
+            self.spill(spill_path)
     # -----------------------------------------------
 
-    def push(self, message, **kwargs):
+    def push(self, message, event_type=EventType.MESSAGE, **kwargs):
         """
-        Push an event into the event_list
+        Push an event into the event_list, and hand it to every subscriber
+        listening for its type
 
         Args:
             message (str): The string the event will holding
+            event_type (EventType): what kind of event this is
             data (job: optional): The job that spawned the event
         """
         data = kwargs.get('data')
         event = Event(
             time=datetime.now(),
             message=message,
-            data=data)
+            data=data,
+            event_type=event_type)
         self._list.append(event)
+        if self._spill is not None:
+            self._spill.write(event.to_json() + '\n')
+        for callback, event_types in self._subscribers:
+            if event_types is not None and event_type not in event_types:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error('event subscriber {} failed: {}'.format(
+                    getattr(callback, '__name__', callback), repr(e)))
+    # -----------------------------------------------
+
+    def subscribe(self, callback, event_types=None):
+        """
+        Call callback with every new event of the given types
+
+        Args:
+            callback (function): called with the Event
+            event_types (list): the EventTypes to listen for, all types if None
+        """
+        if event_types is not None:
+            event_types = frozenset(event_types)
+        self._subscribers.append((callback, event_types))
+    # -----------------------------------------------
+
+    def unsubscribe(self, callback):
+        self._subscribers = [
+            x for x in self._subscribers if x[0] != callback]
+    # -----------------------------------------------
+
+    def spill(self, path):
+        """
+        Start appending every event to the file at path, one json object per line
+        """
+        self.close()
+        self._spill = io.open(path, 'a', buffering=1, encoding='utf-8')
+    # -----------------------------------------------
+
+    def close(self):
+        """
+        Close the spill file if there is one
+        """
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
     # -----------------------------------------------
 
     @property
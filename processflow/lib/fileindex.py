@@ -0,0 +1,158 @@
+"""
+An in memory, column oriented index over the DataFile table, used to answer
+the readiness and lookup queries without building a model object per row
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class FileColumns(object):
+    """
+    The files for one case and data type, stored as parallel columns kept
+    sorted by year so a range of years is a single contiguous slice
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.years = array('l')
+        self.months = array('l')
+        self.status = array('b')
+        self.sizes = array('q')
+        self.paths = list()
+    # -----------------------------------------------
+
+    def __len__(self):
+        return len(self.ids)
+    # -----------------------------------------------
+
+    def add(self, row_id, year, month, status, size, path):
+        """
+        Add a file, keeping the columns sorted by year and files
+        of the same year in the order they were added
+        """
+        if not self.years or year >= self.years[-1]:
+            self.ids.append(row_id)
+            self.years.append(year)
+            self.months.append(month)
+            self.status.append(status)
+            self.sizes.append(size)
+            self.paths.append(path)
+            return
+        idx = bisect_right(self.years, year)
+        self.ids.insert(idx, row_id)
+        self.years.insert(idx, year)
+        self.months.insert(idx, month)
+        self.status.insert(idx, status)
+        self.sizes.insert(idx, size)
+        self.paths.insert(idx, path)
+    # -----------------------------------------------
+
+    def span(self, start_year=None, end_year=None):
+        """
+        Returns the (lo, hi) slice bounds of the files from start_year to end_year
+        inclusive, or of every file if either year isnt given
+        """
+        if start_year is None or end_year is None:
+            return 0, len(self.ids)
+        return (bisect_left(self.years, start_year),
+                bisect_right(self.years, end_year))
+    # -----------------------------------------------
+
+    def all_status(self, status, lo, hi):
+        """
+        Returns True if every file in the slice has the given status
+        """
+        return self.status[lo:hi].count(status) == hi - lo
+    # -----------------------------------------------
+
+
+class FileIndex(object):
+    """
+    Holds a FileColumns for every (case, data type) pair, the case and type
+    names are interned to small integer ids so each pair is a single dict lookup.
+    The index hands out the row ids, so the index and the database always agree
+    on which row is which
+    """
+
+    def __init__(self):
+        self._case_ids = dict()
+        self._type_ids = dict()
+        self._columns = dict()
+        self._status_counts = dict()
+        self._next_id = 1
+    # -----------------------------------------------
+
+    def __len__(self):
+        return self._next_id - 1
+    # -----------------------------------------------
+
+    def _intern(self, table, name):
+        name_id = table.get(name)
+        if name_id is None:
+            name_id = len(table)
+            table[name] = name_id
+        return name_id
+    # -----------------------------------------------
+
+    def add(self, case, datatype, year, month, status, size, path):
+        """
+        Add a file to the index
+
+        Parameters:
+            case (str): the case the file belongs to
+            datatype (str): the data type of the file
+            year (int): the year of the file, 0 for one-off files
+            month (int): the month of the file, or the end year for derived files
+            status (int): the FileStatus value of the file
+            size (int): the size of the file in bytes
+            path (str): the local path to the file
+        Returns:
+            the row id for the file
+        """
+        key = (self._intern(self._case_ids, case),
+               self._intern(self._type_ids, datatype))
+        columns = self._columns.get(key)
+        if columns is None:
+            columns = FileColumns()
+            self._columns[key] = columns
+        row_id = self._next_id
+        self._next_id += 1
+        columns.add(row_id, year, month, status, size, path)
+        self._status_counts[status] = self._status_counts.get(status, 0) + 1
+        return row_id
+    # -----------------------------------------------
+
+    def columns(self, case, datatype):
+        """
+        Returns the FileColumns for the case and data type, or None if there are no files
+        """
+        case_id = self._case_ids.get(case)
+        type_id = self._type_ids.get(datatype)
+        if case_id is None or type_id is None:
+            return None
+        return self._columns.get((case_id, type_id))
+    # -----------------------------------------------
+
+    def __iter__(self):
+        return iter(self._columns.values())
+    # -----------------------------------------------
+
+    def count(self, status):
+        """
+        Returns the number of files with the given status
+        """
+        return self._status_counts.get(status, 0)
+    # -----------------------------------------------
+
+    def set_status(self, columns, idx, status):
+        """
+        Set the status of the file at position idx in the columns
+        """
+        old = columns.status[idx]
+        if old == status:
+            return
+        columns.status[idx] = status
+        self._status_counts[old] -= 1
+        self._status_counts[status] = self._status_counts.get(status, 0) + 1
+    # -----------------------------------------------
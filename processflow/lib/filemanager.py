@@ -1,13 +1,34 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 import logging
 import os
+import re
 import threading
 
+from itertools import chain
 from threading import Thread
 from enum import IntEnum
 
+from peewee import SqliteDatabase
+
 from .models import DataFile
+from processflow.lib.events import EventType
+from processflow.lib.fileindex import FileIndex
+from processflow.lib.metrics import metrics
 from processflow.lib.util import print_debug, print_line, print_message
+from processflow.lib.watcher import settled
+
+# the column order of the row tuples given to _insert_rows
+INSERT_FIELDS = [
+    DataFile.name,
+    DataFile.local_path,
+    DataFile.local_status,
+    DataFile.case,
+    DataFile.year,
+    DataFile.month,
+    DataFile.datatype,
+    DataFile.super_type,
+    DataFile.local_size]
+MONTHS = [(month, '{:02d}'.format(month)) for month in range(1, 13)]
 
 
 class FileStatus(IntEnum):
@@ -31,17 +52,52 @@ class FileManager(object):
         self._event_list = event_list
         self._db_path = database
         self._config = config
+        # the database is the persistent record, the hot queries go to the index
+        self._index = FileIndex()
+        # a shared DirectoryListings, used in place of checking for each file on its own
+        self.listings = None
+        project_path = config['global']['project_path']
+        self._metrics_labels = {'project': project_path} if config['global'].get('hosted') else {}
+        self._metrics_key = ('files', project_path)
+        metrics.register_collector(self._metrics_key, self._collect_metrics)
 
         if os.path.exists(database):
             os.remove(database)
 
-        DataFile._meta.database.init(database)
+        self._database = SqliteDatabase(database)
+        self.activate()
         if DataFile.table_exists():
             DataFile.drop_table()
 
         DataFile.create_table()
     # -----------------------------------------------
 
+    def activate(self):
+        """
+        Point the DataFile model at this file manager's database, a process
+        hosting more than one run activates each run's file manager in turn
+        """
+        DataFile.bind(self._database)
+    # -----------------------------------------------
+
+    def _collect_metrics(self, registry):
+        """
+        Fill in how many input files are expected and how many are present
+        """
+        registry.set('processflow_files_expected', len(self._index), **self._metrics_labels)
+        registry.set('processflow_files_present',
+                     self._index.count(FileStatus.PRESENT.value), **self._metrics_labels)
+    # -----------------------------------------------
+
+    def unregister_metrics(self):
+        """
+        Stop reporting this run's file counts, once its no longer being hosted
+        """
+        metrics.unregister_collector(self._metrics_key)
+        metrics.clear('processflow_files_expected', **self._metrics_labels)
+        metrics.clear('processflow_files_present', **self._metrics_labels)
+    # -----------------------------------------------
+
     def __str__(self):
         # TODO: make this better
         return str({
@@ -102,69 +158,266 @@ class FileManager(object):
             for datatype in data_required:
                 if not self._config['data_types'].get(datatype):
                     return False
+                columns = self._index.columns(case, datatype)
+                if columns is None:
+                    return False
                 monthly = self._config['data_types'][datatype].get('monthly')
                 if start_year and end_year and monthly:
-                    q = (DataFile
-                         .select()
-                         .where(
-                                (DataFile.year >= start_year) &
-                                (DataFile.year <= end_year) &
-                                (DataFile.case == case) &
-                                (DataFile.datatype == datatype)))
+                    lo, hi = columns.span(start_year, end_year)
                 else:
-                    q = (DataFile
-                         .select()
-                         .where(
-                                (DataFile.case == case) &
-                                (DataFile.datatype == datatype)))
-                datafiles = q.execute()
-                if not datafiles:
+                    lo, hi = columns.span()
+                if lo == hi:
+                    return False
+                if not columns.all_status(FileStatus.PRESENT.value, lo, hi):
                     return False
-                for df in datafiles:
-                    if df.local_status != FileStatus.PRESENT.value:
-                        return False
             return True
         except Exception as e:
             print_debug(e)
     # -----------------------------------------------
 
-    def render_file_string(self, data_type, data_type_option, case, year=None, month=None):
+    def _case_keywords(self, case):
         """
-        Takes strings from the data_types dict and replaces the keywords with the appropriate values
+        Returns the keywords that are the same for every file in the case
+        and the values they're replaced with, in the order they're applied
         """
-        # setup the replacement dict
         start_year = int(self._config['simulations']['start_year'])
         end_year = int(self._config['simulations']['end_year'])
-        replace = {
-            'PROJECT_PATH': self._config['global']['project_path'],
-            'CASEID': case,
-            'REST_YR': '{:04d}'.format(start_year + 1),
-            'START_YR': '{:04d}'.format(start_year),
-            'END_YR': '{:04d}'.format(end_year),
-            'LOCAL_PATH': self._config['simulations'][case].get('local_path', '')
-        }
-        if year is not None:
-            replace['YEAR'] = '{:04d}'.format(year)
-        if month is not None:
-            replace['MONTH'] = '{:02d}'.format(month)
-
-        if self._config['data_types'][data_type].get(case):
-            if self._config['data_types'][data_type][case].get(data_type_option):
-                instring = self._config['data_types'][data_type][case][data_type_option]
+        return [
+            ('PROJECT_PATH', self._config['global']['project_path']),
+            ('CASEID', case),
+            ('REST_YR', '{:04d}'.format(start_year + 1)),
+            ('START_YR', '{:04d}'.format(start_year)),
+            ('END_YR', '{:04d}'.format(end_year)),
+            ('LOCAL_PATH', self._config['simulations'][case].get('local_path', ''))
+        ]
+    # -----------------------------------------------
+
+    def compile_file_string(self, data_type, data_type_option, case):
+        """
+        Replaces every keyword in a string from the data_types dict that doesnt
+        change between the files of a case, leaving only the YEAR and MONTH
+
+        Parameters:
+            data_type (str): the data type to look up
+            data_type_option (str): the option to render, file_format or local_path
+            case (str): the case the files belong to
+        Returns:
+            (instring, template): the string with the case keywords replaced, and the same
+                string as a format template taking year and month, or None if neither
+                keyword is in the string and it doesnt change from file to file
+        """
+        type_config = self._config['data_types'][data_type]
+        if type_config.get(case):
+            if type_config[case].get(data_type_option):
+                instring = type_config[case][data_type_option]
                 for item in self._config['simulations'][case]:
-                    if item.upper() in self._config['data_types'][data_type][case][data_type_option]:
+                    if item.upper() in type_config[case][data_type_option]:
                         instring = instring.replace(
                             item.upper(), self._config['simulations'][case][item])
-                return instring
+                # case overrides only use the keys from the simulation
+                return instring, None
 
-        instring = self._config['data_types'][data_type].get(data_type_option)
+        instring = type_config.get(data_type_option)
         if not instring:
-            return ""
+            return "", None
 
-        for string, val in list(replace.items()):
+        for string, val in self._case_keywords(case):
             if string in instring:
                 instring = instring.replace(string, val)
-        return instring
+
+        if 'YEAR' not in instring and 'MONTH' not in instring:
+            return instring, None
+        template = instring.replace('{', '{{').replace('}', '}}')
+        template = template.replace('YEAR', '{year}').replace('MONTH', '{month}')
+        return instring, template
+    # -----------------------------------------------
+
+    def render_file_string(self, data_type, data_type_option, case, year=None, month=None):
+        """
+        Takes strings from the data_types dict and replaces the keywords with the appropriate values
+        """
+        instring, template = self.compile_file_string(
+            data_type=data_type,
+            data_type_option=data_type_option,
+            case=case)
+        if template is None or (year is None and month is None):
+            return instring
+        return template.format(
+            year='{:04d}'.format(year) if year is not None else 'YEAR',
+            month='{:02d}'.format(month) if month is not None else 'MONTH')
+    # -----------------------------------------------
+
+    def _case_file_rows(self, case, data_type, local_path, start_year, end_year):
+        """
+        Yields the DataFile rows, as tuples in the order of INSERT_FIELDS, for
+        every file of the data_type in the case
+        """
+        instring, template = self.compile_file_string(
+            data_type=data_type,
+            data_type_option='file_format',
+            case=case)
+        # os.path.join, done once for the whole case
+        if instring.startswith('/'):
+            prefix = ''
+        else:
+            prefix = os.path.join(local_path, '')
+        status = FileStatus.NOT_PRESENT.value
+
+        monthly = self._config['data_types'][data_type].get('monthly')
+        if monthly and monthly in ['True', 'true', '1', 1]:
+            for year in range(start_year, end_year + 1):
+                year_string = '{:04d}'.format(year)
+                for month, month_string in MONTHS:
+                    if template is None:
+                        filename = instring
+                    else:
+                        filename = template.format(year=year_string, month=month_string)
+                    yield (filename, prefix + filename, status, case, year, month,
+                           data_type, 'raw_output', 0)
+        else:
+            # one-off data
+            yield (instring, prefix + instring, status, case, 0, 0,
+                   data_type, 'raw_output', 0)
+    # -----------------------------------------------
+
+    def compile_file_pattern(self, data_type, case, local_path):
+        """
+        Turns the file_format of a monthly data type into a regex over file names,
+        with the year and month as named groups. A data type can set its own
+        file_pattern regex instead, for files that dont follow a fixed format
+
+        Parameters:
+            data_type (str): the data type to look up
+            case (str): the case the files belong to
+            local_path (str): the rendered local_path of the data type
+        Returns:
+            (directory, regex): the directory holding every file of the type and
+                the compiled pattern, or None if the files dont all sit in one directory
+        """
+        instring, _ = self.compile_file_string(
+            data_type=data_type,
+            data_type_option='file_format',
+            case=case)
+        path = instring if instring.startswith('/') else os.path.join(local_path, instring)
+        directory, name = os.path.split(path)
+        if 'YEAR' in directory or 'MONTH' in directory:
+            return None
+        pattern = self._config['data_types'][data_type].get('file_pattern')
+        if not pattern:
+            pattern = re.escape(name)
+            pattern = pattern.replace('YEAR', r'(?P<year>\d{4})', 1).replace('YEAR', r'\d{4}')
+            pattern = pattern.replace('MONTH', r'(?P<month>\d{2})', 1).replace('MONTH', r'\d{2}')
+        return directory, re.compile(pattern)
+    # -----------------------------------------------
+
+    def _discover_case_files(self, case, data_type, local_path, start_year, end_year):
+        """
+        Scan the directory of a monthly data type once, matching every entry
+        against the compiled file pattern. Matched files are loaded as present, and
+        rows are added for any months missing from start_year to end_year so they
+        can still arrive later. The gaps, and the matched files outside the years
+        of the run, are reported
+
+        Returns:
+            the list of DataFile rows, as tuples in the order of INSERT_FIELDS,
+            or None if the data type cant be scanned
+        """
+        compiled = self.compile_file_pattern(data_type, case, local_path)
+        if compiled is None:
+            return None
+        directory, pattern = compiled
+
+        run_start = int(self._config['simulations']['start_year'])
+        found = dict()
+        extras = list()
+        if os.path.exists(directory):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    match = pattern.fullmatch(entry.name)
+                    if match is None or entry.is_dir():
+                        continue
+                    groups = match.groupdict()
+                    year = int(groups.get('year') or 0)
+                    month = int(groups.get('month') or 0)
+                    key = (year, month)
+                    if run_start <= year < start_year:
+                        # already in the table from when the run was extended to this year
+                        continue
+                    if not start_year <= year <= end_year or not 1 <= month <= 12 or key in found:
+                        extras.append(entry.name)
+                        continue
+                    found[key] = (entry.name, entry.path)
+
+        rows = list()
+        gaps = list()
+        present = FileStatus.PRESENT.value
+        missing = FileStatus.NOT_PRESENT.value
+        expected = ((year, month) for year in range(start_year, end_year + 1) for month, _ in MONTHS)
+        for year, month in expected:
+            if (year, month) in found:
+                name, path = found[(year, month)]
+                rows.append((name, path, present, case, year, month,
+                             data_type, 'raw_output', 0))
+                continue
+            path = self.render_file_string(
+                data_type=data_type,
+                data_type_option='file_format',
+                case=case,
+                year=year,
+                month=month)
+            if not path.startswith('/'):
+                path = os.path.join(local_path, path)
+            gaps.append('{:04d}-{:02d}'.format(year, month))
+            rows.append((os.path.basename(path), path, missing, case, year, month,
+                         data_type, 'raw_output', 0))
+
+        msg = '{case} {data_type}: found {found} files in {directory}, {gaps} missing, {extras} extra'.format(
+            case=self._config['simulations'][case].get('short_name', case),
+            data_type=data_type,
+            found=len(found),
+            directory=directory,
+            gaps=len(gaps),
+            extras=len(extras))
+        print_line(msg, self._event_list)
+        if gaps:
+            logging.info('{} {} missing months: {}'.format(case, data_type, ', '.join(gaps)))
+        if extras:
+            logging.info('{} {} files outside the run or repeated: {}'.format(
+                case, data_type, ', '.join(sorted(extras))))
+        return rows
+    # -----------------------------------------------
+
+    def _insert_rows(self, rows):
+        """
+        Adds the rows to the file index, and streams them into the DataFile table.
+        Peewee builds the insert statement once, instead of regenerating the sql
+        for every value of every row, and sqlite binds each row to it in turn
+
+        Parameters:
+            rows (iterable): tuples in the order of INSERT_FIELDS
+        """
+        index = self._index
+
+        def indexed(rows):
+            for row in rows:
+                row_id = index.add(
+                    case=row[3],
+                    datatype=row[6],
+                    year=row[4],
+                    month=row[5],
+                    status=row[2],
+                    size=row[8],
+                    path=row[1])
+                yield (row_id,) + row
+
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return
+        query, _ = DataFile.insert_many(
+            [(0,) + first], fields=[DataFile.id] + INSERT_FIELDS).sql()
+        cursor = DataFile._meta.database.cursor()
+        cursor.executemany(query, indexed(chain([first], rows)))
     # -----------------------------------------------
 
     def populate_file_list(self):
@@ -179,74 +432,115 @@ class FileManager(object):
         start_year = int(self._config['simulations']['start_year'])
         end_year = int(self._config['simulations']['end_year'])
         with DataFile._meta.database.atomic():
-            # for each case
-            for case in self._config['simulations']:
-                if case in ['start_year', 'end_year']:
-                    continue
-
-                # for each data type
-                for _type in self._config['data_types']:
-                    data_types_for_case = self._config['simulations'][case]['data_types']
-                    if 'all' not in data_types_for_case:
-                        if _type not in data_types_for_case:
-                            continue
-
-                    # setup the base local_path
-                    local_path = self.render_file_string(
-                        data_type=_type,
-                        data_type_option='local_path',
-                        case=case)
-
-                    new_files = list()
-                    if self._config['data_types'][_type].get('monthly') and self._config['data_types'][_type]['monthly'] in ['True', 'true', '1', 1]:
-                        # handle monthly data
-                        for year in range(start_year, end_year + 1):
-                            for month in range(1, 13):
-                                filename = self.render_file_string(
-                                    data_type=_type,
-                                    data_type_option='file_format',
-                                    case=case,
-                                    year=year,
-                                    month=month)
-                                new_files.append({
-                                    'name': filename,
-                                    'local_path': os.path.join(local_path, filename),
-                                    'local_status': FileStatus.NOT_PRESENT.value,
-                                    'case': case,
-                                    'year': year,
-                                    'month': month,
-                                    'datatype': _type,
-                                    'super_type': 'raw_output',
-                                    'local_size': 0
-                                })
-                    else:
-                        # handle one-off data
-                        filename = self.render_file_string(
-                            data_type=_type,
-                            data_type_option='file_format',
-                            case=case)
-                        new_files.append({
-                            'name': filename,
-                            'local_path': os.path.join(local_path, filename),
-                            'local_status': FileStatus.NOT_PRESENT.value,
-                            'case': case,
-                            'year': 0,
-                            'month': 0,
-                            'datatype': _type,
-                            'super_type': 'raw_output',
-                            'local_size': 0
-                        })
-                    tail, _ = os.path.split(new_files[0]['local_path'])
-                    if not os.path.exists(tail):
-                        os.makedirs(tail)
-                    step = 500
-                    for idx in range(0, len(new_files), step):
-                        with DataFile._meta.database.atomic():
-                            DataFile.insert_many(
-                                new_files[idx: idx + step]).execute()
-
+            discovered = self._add_rows(start_year, end_year)
             msg = 'Database update complete'
             print_line(msg, self._event_list)
+        for paths in discovered:
+            self._file_arrival(paths)
+    # -----------------------------------------------
+
+    def _case_types(self, monthly_only=False):
+        """
+        Yields each (case, data type) pair the run needs files for
+        """
+        for case in self._config['simulations']:
+            if case in ['start_year', 'end_year']:
+                continue
+            data_types_for_case = self._config['simulations'][case]['data_types']
+            for _type in self._config['data_types']:
+                if 'all' not in data_types_for_case:
+                    if _type not in data_types_for_case:
+                        continue
+                if monthly_only:
+                    monthly = self._config['data_types'][_type].get('monthly')
+                    if monthly not in ['True', 'true', '1', 1, True]:
+                        continue
+                yield case, _type
+    # -----------------------------------------------
+
+    def _add_rows(self, start_year, end_year, monthly_only=False):
+        """
+        Add the rows for every file the run needs from start_year to end_year
+
+        Returns:
+            a list of the lists of paths discovered already present, one per data type
+        """
+        scan = self._config['global'].get('input_discovery') == 'scan'
+        discovered = list()
+        for case, _type in self._case_types(monthly_only):
+            # setup the base local_path
+            local_path = self.render_file_string(
+                data_type=_type,
+                data_type_option='local_path',
+                case=case)
+
+            # scan for the files of monthly types instead of listing every name
+            monthly = self._config['data_types'][_type].get('monthly')
+            if scan and monthly in ['True', 'true', '1', 1, True]:
+                rows = self._discover_case_files(
+                    case=case,
+                    data_type=_type,
+                    local_path=local_path,
+                    start_year=start_year,
+                    end_year=end_year)
+                if rows is not None:
+                    present = [x[1] for x in rows if x[2] == FileStatus.PRESENT.value]
+                    if present:
+                        discovered.append(present)
+                    rows = iter(rows)
+            else:
+                rows = None
+            if rows is None:
+                rows = self._case_file_rows(
+                    case=case,
+                    data_type=_type,
+                    local_path=local_path,
+                    start_year=start_year,
+                    end_year=end_year)
+            first = next(rows)
+            tail, _ = os.path.split(first[1])
+            if not os.path.exists(tail) and not self._config['global'].get('plan_only'):
+                os.makedirs(tail)
+            self._insert_rows(chain([first], rows))
+        return discovered
+    # -----------------------------------------------
+
+    def add_years(self, start_year, end_year):
+        """
+        Extend the file table with the monthly files from start_year to end_year,
+        the files already on the local machine are marked present once they've settled
+
+        Parameters:
+            start_year (int): the first year to add
+            end_year (int): the last year to add
+        """
+        with DataFile._meta.database.atomic():
+            discovered = self._add_rows(start_year, end_year, monthly_only=True)
+        for paths in discovered:
+            self._file_arrival(paths)
+        directories = set()
+        for case, _type in self._case_types(monthly_only=True):
+            columns = self._index.columns(case, _type)
+            lo, hi = columns.span(start_year, end_year)
+            directories.update(os.path.dirname(x) for x in columns.paths[lo:hi])
+        # the simulation may be writing these years now, so only files that
+        # have stopped changing count, the watcher picks up the rest as they close
+        self.file_status_check(directories=directories, report_missing=False, ready=settled)
+    # -----------------------------------------------
+
+    def year_complete(self, year):
+        """
+        Returns True if every monthly file of every case is present for the year
+        """
+        present = FileStatus.PRESENT.value
+        for case, _type in self._case_types(monthly_only=True):
+            columns = self._index.columns(case, _type)
+            if columns is None:
+                return False
+            lo, hi = columns.span(year, year)
+            if lo == hi or not columns.all_status(present, lo, hi):
+                return False
+        return True
     # -----------------------------------------------
 
     def print_db(self):
@@ -273,75 +567,128 @@ class FileManager(object):
                 month (int): the month of the file, optional
         """
         try:
-            new_files = list()
-            for file in file_list:
-                new_files.append({
-                    'name': file['name'],
-                    'local_path': file['local_path'],
-                    'local_status': file.get('local_status', FileStatus.NOT_PRESENT.value),
-                    'datatype': data_type,
-                    'super_type': super_type,
-                    'case': file['case'],
-                    'year': file.get('year', 0),
-                    'month': file.get('month', 0),
-                    'local_size': 0,
-                })
-            step = 500
-            for idx in range(0, len(new_files), step):
-                with DataFile._meta.database.atomic():
-                    DataFile.insert_many(
-                        new_files[idx: idx + step]).execute()
+            rows = ((file['name'],
+                     file['local_path'],
+                     file.get('local_status', FileStatus.NOT_PRESENT.value),
+                     file['case'],
+                     file.get('year', 0),
+                     file.get('month', 0),
+                     data_type,
+                     super_type,
+                     0) for file in file_list)
+            with DataFile._meta.database.atomic():
+                self._insert_rows(rows)
+            present = [x['local_path'] for x in file_list
+                       if x.get('local_status') == FileStatus.PRESENT.value]
+            if present:
+                self._file_arrival(present)
         except Exception as e:
             print_debug(e)
     # -----------------------------------------------
 
-    def file_status_check(self):
+    def file_status_check(self, directories=None, report_missing=True, ready=None):
         """
         Update the database with the local status of the expected files
 
-        Return True if there was new local data found, False othewise
+        Parameters:
+            directories (set): only check the files in these directories,
+                every missing file is checked if not given
+            report_missing (bool): log each file that still isnt present
+            ready (callable): takes the path to a missing file and returns True
+                once its landed, by default a file has landed once it exists
         """
         try:
-            query = (DataFile
-                     .select()
-                     .where(DataFile.local_status == FileStatus.NOT_PRESENT.value))
-            to_update = list()
-            for datafile in query.execute():
-
-                if os.path.exists(datafile.local_path):
-                    datafile.local_status = FileStatus.PRESENT.value
-                    to_update.append(datafile)
-                else:
-                    msg = '{filename} is not present at {path}'.format(
-                        filename=datafile.name, path=datafile.local_path)
-                    logging.error(msg)
-                    print_line(msg, self._event_list)
+            if ready is not None:
+                exists = ready
+            elif self.listings is not None:
+                exists = self.listings.exists
+            else:
+                exists = os.path.exists
+            not_present = FileStatus.NOT_PRESENT.value
+            found = list()
+            arrived = list()
+            for columns in self._index:
+                if columns.status.count(not_present) == 0:
+                    continue
+                new_paths = list()
+                for idx, status in enumerate(columns.status):
+                    if status != not_present:
+                        continue
+                    path = columns.paths[idx]
+                    if directories is not None and os.path.dirname(path) not in directories:
+                        continue
+                    if exists(path):
+                        self._index.set_status(
+                            columns, idx, FileStatus.PRESENT.value)
+                        found.append(columns.ids[idx])
+                        new_paths.append(path)
+                    elif report_missing:
+                        msg = '{filename} is not present at {path}'.format(
+                            filename=os.path.basename(path), path=path)
+                        logging.error(msg)
+                        print_line(msg, self._event_list)
+                if new_paths:
+                    arrived.append(new_paths)
 
+            step = 500
             with DataFile._meta.database.atomic():
-                DataFile.bulk_update(to_update, fields=[
-                                     'local_status'], batch_size=100)
+                for idx in range(0, len(found), step):
+                    (DataFile
+                     .update(local_status=FileStatus.PRESENT.value)
+                     .where(DataFile.id.in_(found[idx: idx + step]))
+                     .execute())
+            for new_paths in arrived:
+                self._file_arrival(new_paths)
         except Exception as e:
             print_debug(e)
     # -----------------------------------------------
 
+    def _file_arrival(self, paths):
+        """
+        Let any subscribers know that new files are present on the local machine
+        """
+        if self._event_list is None:
+            return
+        self._event_list.push(
+            '{} new files present under {}'.format(
+                len(paths), os.path.dirname(paths[0])),
+            event_type=EventType.FILE_ARRIVAL,
+            data=paths)
+    # -----------------------------------------------
+
+    def count_missing(self):
+        """
+        Returns the number of files that arent present yet
+        """
+        return self._index.count(FileStatus.NOT_PRESENT.value)
+    # -----------------------------------------------
+
+    def missing_dirs(self):
+        """
+        Returns the set of directories that files are still expected to land in
+        """
+        not_present = FileStatus.NOT_PRESENT.value
+        directories = set()
+        for columns in self._index:
+            if columns.status.count(not_present) == 0:
+                continue
+            for idx, status in enumerate(columns.status):
+                if status == not_present:
+                    directories.add(os.path.dirname(columns.paths[idx]))
+        return directories
+    # -----------------------------------------------
+
     def all_data_local(self):
         """
         Returns True if all data is local, False otherwise
         """
-        try:
-            query = (DataFile
-                     .select()
-                     .where(DataFile.local_status == FileStatus.NOT_PRESENT.value))
-            missing_data = query.execute()
-            if missing_data:
-                return False
-        except Exception as e:
-            print_debug(e)
+        if self._index.count(FileStatus.NOT_PRESENT.value):
+            return False
         logging.debug('All data is local')
         return True
     # -----------------------------------------------
 
-    def get_file_paths_by_year(self, datatype, case, start_year=None, end_year=None):
+    def get_file_paths_by_year(self, datatype, case, start_year=None, end_year=None, present_only=True):
         """
         Return paths to files that match the given type, start, and end year
 
@@ -351,38 +698,37 @@ class FileManager(object):
             monthly (bool): is this datatype monthly frequency
             start_year (int): the first year to return data for
             end_year (int): the last year to return data for
+            present_only (bool): only return files that are on the local machine
         """
         try:
+            columns = self._index.columns(case, datatype)
+            if columns is None:
+                return None
             if start_year and end_year:
                 if datatype in ['climo_regrid', 'climo_native', 'ts_regrid', 'ts_native']:
-                    query = (DataFile
-                             .select()
-                             .where(
-                                 (DataFile.month == end_year) &
-                                 (DataFile.year == start_year) &
-                                 (DataFile.case == case) &
-                                 (DataFile.datatype == datatype) &
-                                 (DataFile.local_status == FileStatus.PRESENT.value)))
+                    # derived files keep their end year in the month field
+                    lo, hi = columns.span(start_year, start_year)
+                    idxs = [i for i in range(lo, hi) if columns.months[i] == end_year]
+                else:
+                    lo, hi = columns.span(start_year, end_year)
+                    idxs = None
+            else:
+                lo, hi = columns.span()
+                idxs = None
+
+            present = FileStatus.PRESENT.value
+            if idxs is None:
+                if not present_only or columns.all_status(present, lo, hi):
+                    paths = columns.paths[lo: hi]
                 else:
-                    query = (DataFile
-                             .select()
-                             .where(
-                                 (DataFile.year <= end_year) &
-                                 (DataFile.year >= start_year) &
-                                 (DataFile.case == case) &
-                                 (DataFile.datatype == datatype) &
-                                 (DataFile.local_status == FileStatus.PRESENT.value)))
+                    paths = [columns.paths[i] for i in range(lo, hi)
+                             if columns.status[i] == present]
             else:
-                query = (DataFile
-                         .select()
-                         .where(
-                                (DataFile.case == case) &
-                                (DataFile.datatype == datatype) &
-                                (DataFile.local_status == FileStatus.PRESENT.value)))
-            datafiles = query.execute()
-            if datafiles is None or len(datafiles) == 0:
+                paths = [columns.paths[i] for i in idxs
+                         if not present_only or columns.status[i] == present]
+            if not paths:
                 return None
-            return [x.local_path for x in datafiles]
+            return paths
         except Exception as e:
             print_debug(e)
     # -----------------------------------------------
@@ -4,7 +4,7 @@ import os
 from shutil import rmtree
 
 from processflow.lib.jobstatus import JobStatus
-from processflow.lib.mailer import Mailer
+from processflow.lib.logpipe import stop_logging
 from processflow.lib.util import print_message, print_debug
 
 
@@ -43,6 +43,7 @@ def finalize(config, event_list, status, runmanager):
                     msg += '\t > ' + job.get_report_string() + '\n'
                 msg += '\n'
 
+            from processflow.lib.mailer import Mailer
             m = Mailer(src='processflowbot@llnl.gov', dst=emailaddr)
             m.send(
                 status=status,
@@ -51,4 +52,11 @@ def finalize(config, event_list, status, runmanager):
             print_debug(e)
 
     logging.info("All processes complete")
+    if event_list is not None:
+        event_list.close()
+    if runmanager.journal is not None:
+        runmanager.journal.close()
+    # a hosted run leaves the log running for the rest of the daemon
+    if not config['global'].get('hosted'):
+        stop_logging()
 # -----------------------------------------------
@@ -0,0 +1,180 @@
+"""
+Incremental, parallel copying of diagnostic output into the web hosting directory
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import errno
+import hashlib
+import logging
+import os
+import shutil
+
+from concurrent.futures import ThreadPoolExecutor
+
+from processflow.lib.archive import HOST_MODE_BITS
+
+# the number of copy threads used when the caller doesnt ask for a specific number
+DEFAULT_WORKERS = 8
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class SyncResult(object):
+    """
+    Counts of what a sync_tree call did with each file
+    """
+
+    def __init__(self):
+        self.copied = 0
+        self.linked = 0
+        self.skipped = 0
+        self.removed = 0
+        self.errors = list()
+    # -----------------------------------------------
+
+    @property
+    def changed(self):
+        return self.copied + self.linked + self.removed
+    # -----------------------------------------------
+
+    def __str__(self):
+        return '{copied} copied, {linked} linked, {skipped} unchanged, {removed} removed, {errors} errors'.format(
+            copied=self.copied,
+            linked=self.linked,
+            skipped=self.skipped,
+            removed=self.removed,
+            errors=len(self.errors))
+    # -----------------------------------------------
+
+
+def file_digest(path):
+    """
+    Returns the sha1 hex digest of the file at path
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as infile:
+        for block in iter(lambda: infile.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+# -----------------------------------------------
+
+
+def _unchanged(src, src_stat, dst, checksum):
+    try:
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if checksum:
+        return file_digest(src) == file_digest(dst)
+    return int(src_stat.st_mtime) == int(dst_stat.st_mtime)
+# -----------------------------------------------
+
+
+def _sync_file(src, dst, checksum, hardlink, mode_bits):
+    """
+    Bring a single file up to date, returns one of 'skipped', 'linked' or 'copied'
+    """
+    src_stat = os.stat(src)
+    if _unchanged(src, src_stat, dst, checksum):
+        return 'skipped'
+
+    # write next to the target and rename over it so the hosted
+    # copy is never seen half written
+    temp = '{}.pfsync'.format(dst)
+    if os.path.lexists(temp):
+        os.remove(temp)
+    # a link shares its mode with the job's own output, so files that need
+    # their permissions changed are always copied
+    mode = (src_stat.st_mode & 0o7777) | mode_bits
+    action = 'copied'
+    if hardlink and mode == src_stat.st_mode & 0o7777:
+        try:
+            os.link(src, temp)
+            action = 'linked'
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+                raise
+    if action == 'copied':
+        shutil.copy2(src, temp)
+        os.chmod(temp, mode)
+    os.rename(temp, dst)
+    return action
+# -----------------------------------------------
+
+
+def sync_tree(src, dst, workers=None, checksum=False, prune=False,
+              hardlink=True, mode_bits=HOST_MODE_BITS):
+    """
+    Copy the new or changed files from src into dst. Files are compared by
+    size and modification time, or by content hash when checksum is set.
+    Permissions are set on each file and directory as it is written.
+
+    Parameters:
+        src (str): the directory to copy from
+        dst (str): the directory to copy into, created if missing
+        workers (int): the number of copy threads
+        checksum (bool): compare file contents instead of size and mtime
+        prune (bool): remove files from dst that no longer exist in src
+        hardlink (bool): link instead of copying when src and dst share a filesystem,
+            and the file already has the mode_bits set
+        mode_bits (int): permission bits added to every file and directory in dst
+    Returns:
+        result (SyncResult): counts of what was done
+    """
+    result = SyncResult()
+    if not os.path.exists(dst):
+        os.makedirs(dst)
+    os.chmod(dst, os.stat(dst).st_mode | mode_bits)
+    if hardlink and os.stat(src).st_dev != os.stat(dst).st_dev:
+        hardlink = False
+
+    tasks = list()
+    expected = set()
+    for dirpath, dirnames, filenames in os.walk(src):
+        relpath = os.path.relpath(dirpath, src)
+        target_dir = dst if relpath == '.' else os.path.join(dst, relpath)
+        for name in dirnames:
+            target = os.path.join(target_dir, name)
+            expected.add(target)
+            if not os.path.isdir(target):
+                os.makedirs(target)
+            os.chmod(target, os.stat(target).st_mode | mode_bits)
+        for name in filenames:
+            target = os.path.join(target_dir, name)
+            expected.add(target)
+            tasks.append((os.path.join(dirpath, name), target))
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as pool:
+        futures = [
+            (source, pool.submit(_sync_file, source, target, checksum, hardlink, mode_bits))
+            for source, target in tasks]
+        for source, future in futures:
+            try:
+                action = future.result()
+            except (IOError, OSError) as e:
+                result.errors.append((source, str(e)))
+                logging.error('unable to sync %s: %s', source, e)
+                continue
+            if action == 'copied':
+                result.copied += 1
+            elif action == 'linked':
+                result.linked += 1
+            else:
+                result.skipped += 1
+
+    if prune:
+        for dirpath, dirnames, filenames in os.walk(dst, topdown=False):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if path not in expected:
+                    os.remove(path)
+                    result.removed += 1
+            for name in dirnames:
+                path = os.path.join(dirpath, name)
+                if path not in expected and not os.listdir(path):
+                    os.rmdir(path)
+    return result
+# -----------------------------------------------
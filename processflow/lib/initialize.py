@@ -11,8 +11,7 @@ from shutil import copyfile
 from configobj import ConfigObj
 
 from processflow import resources
-from processflow.lib.filemanager import FileManager
-from processflow.lib.runmanager import RunManager
+from processflow.lib.logpipe import start_logging
 from processflow.lib.util import print_debug
 from processflow.lib.util import print_line
 from processflow.lib.util import print_message
@@ -48,6 +47,39 @@ def parse_args(argv=None, print_help=None):
         '--dryrun',
         help='Do everything up to starting the jobs, but dont start any jobs',
         action='store_true')
+    parser.add_argument(
+        '--simulate',
+        help='Build the job graph and forecast how long the run will take, without touching any files or submitting any jobs',
+        action='store_true')
+    parser.add_argument(
+        '--plan',
+        nargs='?',
+        const='processflow_plan.json',
+        metavar='MANIFEST',
+        help='Resolve every job, its inputs and its command without touching the project directory, and write them to a json manifest, defaults to processflow_plan.json')
+    parser.add_argument(
+        '--plan-scripts',
+        help='With --plan, also write out the run scripts each job would use',
+        action='store_true')
+    parser.add_argument(
+        '--live',
+        help='Start with whatever input data is already local, and process the rest as it lands while the simulation is still running',
+        action='store_true')
+    parser.add_argument(
+        '--follow',
+        nargs='?',
+        const=0,
+        type=int,
+        metavar='LAST_YEAR',
+        help='Follow a simulation thats still running, moving the end_year forward as each year of output is complete, until LAST_YEAR if its given. Implies --live',
+        action='store')
+    parser.add_argument(
+        '--daemon',
+        nargs='?',
+        const='',
+        metavar='SOCKET',
+        help='Run as a daemon hosting many runs, which are submitted through a unix socket, defaults to ~/.processflow/daemon.sock. See python -m processflow.lib.daemon --help',
+        action='store')
     parser.add_argument(
         '-v', '--version',
         help='Print version information and exit.',
@@ -74,6 +106,8 @@ def initialize(argv, **kwargs):
     Parameters:
         argv (list): a list of arguments
         event_list (EventList): The main list of events
+        host (Daemon): the daemon hosting this run, if any. A hosted run uses the
+            daemon's resource manager, directory listings and log
         __version__ (str): the current version number for processflow
         __branch__ (str): the branch this version was built from
     """
@@ -87,6 +121,11 @@ def initialize(argv, **kwargs):
         print(('Processflow version {} from branch {}'.format(
             __version__, __branch__)))
         sys.exit(0)
+    # the database and job modules are only needed once theres a run to setup,
+    # keep them out of the way of --help and --version
+    from processflow.lib.filemanager import FileManager
+    from processflow.lib.runmanager import RunManager
+    from processflow.lib.simulate import SimulatedManager
     if not pargs.config:
         parse_args(print_help=True)
         return False, False, False
@@ -127,8 +166,24 @@ Please add a space and run again.'''.format(num=line_index))
             print_message(message)
         return False, False
 
+    # the windows of years each job covers have to be fixed when the end keeps moving
+    if pargs.follow is not None:
+        missing = [key for key, val in config.get('post-processing', {}).items()
+                   if not val.get('run_frequency')]
+        if missing:
+            print_message('--follow needs a run_frequency for {}'.format(', '.join(missing)))
+            return False, False
+        if pargs.follow and pargs.follow <= int(config['simulations']['end_year']):
+            print_message('the last year to follow must come after the end_year')
+            return False, False
+        pargs.live = True
+
+    # nothing is written to disk when simulating or planning
+    plan_only = True if pargs.simulate or pargs.plan else False
+    if plan_only:
+        config['global']['plan_only'] = True
     try:
-        setup_directories(config)
+        setup_directories(config, create=not plan_only)
     except Exception as e:
         print_message('Failed to setup directories')
         print_debug(e)
@@ -147,9 +202,49 @@ Please add a space and run again.'''.format(num=line_index))
     config['global']['debug'] = True if pargs.debug else False
     config['global']['max_jobs'] = pargs.max_jobs if pargs.max_jobs else False
     config['global']['serial'] = True if pargs.serial else False
-
-    # setup logging
-    if pargs.log:
+    config['global']['simulate'] = True if pargs.simulate else False
+    config['global']['plan'] = pargs.plan if pargs.plan else False
+    config['global']['plan_scripts'] = True if pargs.plan_scripts else False
+    config['global']['live'] = True if pargs.live else False
+    config['global']['follow'] = True if pargs.follow is not None else False
+    config['global']['follow_until'] = pargs.follow if pargs.follow else None
+    host = kwargs.get('host')
+    config['global']['hosted'] = True if host is not None else False
+
+    if pargs.simulate:
+        # build the job graph against a stand in resource manager, the
+        # filemanager isnt needed since all the data is assumed to be local
+        nodes = int(config.get('simulation', {}).get('nodes', 1))
+        runmanager = RunManager(
+            event_list=event_list,
+            config=config,
+            filemanager=None,
+            manager=SimulatedManager(nodes=nodes))
+        runmanager.setup_cases()
+        runmanager.setup_jobs()
+        return config, runmanager
+
+    if pargs.plan:
+        # the file table only lives in memory, and the file status
+        # check is skipped since planning doesnt depend on whats present
+        filemanager = FileManager(
+            database=':memory:',
+            event_list=event_list,
+            config=config)
+        filemanager.populate_file_list()
+        runmanager = RunManager(
+            event_list=event_list,
+            config=config,
+            filemanager=filemanager,
+            manager=None if pargs.serial else SimulatedManager())
+        runmanager.setup_cases()
+        runmanager.setup_jobs()
+        return config, runmanager
+
+    # setup logging, a hosted run shares the daemon's log
+    if host is not None:
+        log_path = host.log_path
+    elif pargs.log:
         log_path = pargs.log
     else:
         log_path = os.path.join(
@@ -161,18 +256,27 @@ Please add a space and run again.'''.format(num=line_index))
         event_list=event_list)
 
     config['global']['log_path'] = log_path
-    if os.path.exists(log_path):
-        logbak = log_path + '.bak'
-        if os.path.exists(logbak):
-            os.remove(logbak)
-        copyfile(log_path, log_path + '.bak')
-    log_level = logging.DEBUG if pargs.debug else logging.INFO
-    logging.basicConfig(
-        format='%(asctime)s:%(levelname)s: %(message)s',
-        datefmt='%m/%d/%Y %I:%M:%S %p',
-        filename=log_path,
-        filemode='w',
-        level=log_level)
+    if host is None:
+        if os.path.exists(log_path):
+            logbak = log_path + '.bak'
+            if os.path.exists(logbak):
+                os.remove(logbak)
+            copyfile(log_path, log_path + '.bak')
+        log_level = logging.DEBUG if pargs.debug else logging.INFO
+        start_logging(
+            log_path=log_path,
+            level=log_level,
+            json_format=config['global'].get('log_format') == 'json')
+
+    if config['global'].get('event_log'):
+        event_log_path = os.path.join(
+            config['global']['project_path'],
+            'output',
+            'events.jsonl')
+        event_list.spill(event_log_path)
+        print_line(
+            line='Events saved to {}'.format(event_log_path),
+            event_list=event_list)
 
     logging.info("Running with config:")
     msg = json.dumps(config, sort_keys=False, indent=4)
@@ -223,21 +327,33 @@ Please add a space and run again.'''.format(num=line_index))
         database=db,
         event_list=event_list,
         config=config)
+    if host is not None:
+        filemanager.listings = host.listings
 
     filemanager.populate_file_list()
 
     msg = 'Starting local status update'
     print_line(msg, event_list)
 
-    filemanager.file_status_check()
+    # in live mode most of the files are expected to be missing, theres no need to list them
+    filemanager.file_status_check(report_missing=not pargs.live)
     msg = 'Local status update complete'
     print_line(msg, event_list)
 
     all_data = filemanager.all_data_local()
 
+    # keep the file table a year ahead of the run, to see the next year arrive
+    if config['global']['follow']:
+        end_year = int(config['simulations']['end_year'])
+        filemanager.add_years(end_year + 1, end_year + 1)
+
     if all_data:
         msg = 'all data is local'
         print_line(msg, event_list)
+    elif pargs.live:
+        msg = 'Running in live mode, {} files have yet to land in {} directories'.format(
+            filemanager.count_missing(), len(filemanager.missing_dirs()))
+        print_line(msg, event_list)
     else:
         msg = 'Additional data needed'
         print_message(msg, 'error')
@@ -250,7 +366,10 @@ Please add a space and run again.'''.format(num=line_index))
     runmanager = RunManager(
         event_list=event_list,
         config=config,
-        filemanager=filemanager)
+        filemanager=filemanager,
+        manager=host.manager if host is not None else None)
+    if host is not None:
+        runmanager.budget = host.budget
 
     if pargs.debug:
         msg = '-- setting up cases -- '
@@ -261,6 +380,21 @@ Please add a space and run again.'''.format(num=line_index))
         msg = '-- setting up jobs --'
         print_line(msg, event_list)
     runmanager.setup_jobs()
+    if config['global']['follow']:
+        runmanager.follow_simulation()
+
+    # pick up from the journal of any earlier run, a dryrun never submits
+    # anything so it neither reads nor writes the journal
+    if not config['global'].get('dryrun'):
+        journal_path = os.path.join(
+            config['global']['project_path'],
+            'output',
+            'journal.jsonl')
+        reattached = runmanager.resume(journal_path)
+        msg = 'Journal saved to {}'.format(journal_path)
+        if reattached:
+            msg += ', reattached to {} running jobs'.format(reattached)
+        print_line(msg, event_list)
 
     if pargs.debug:
         msg = '-- writing job state out to file --'
@@ -273,28 +407,32 @@ Please add a space and run again.'''.format(num=line_index))
 # -----------------------------------------------
 
 
-def setup_directories(config):
+def setup_directories(config, create=True):
     """
     Setup the input, output, pp, and diags directories
+
+    Parameters:
+        config (dict): the global config object, the paths are added to its global section
+        create (bool): if False the paths are set but the directories are not created
     """
     # setup output directory
     output_path = os.path.join(
         config['global']['project_path'],
         'output')
     config['global']['output_path'] = output_path
-    if not os.path.exists(output_path):
+    if create and not os.path.exists(output_path):
         os.makedirs(output_path)
 
     # setup post processing dir
     pp_path = os.path.join(output_path, 'pp')
     config['global']['pp_path'] = pp_path
-    if not os.path.exists(pp_path):
+    if create and not os.path.exists(pp_path):
         os.makedirs(pp_path)
 
     # setup diags dir
     diags_path = os.path.join(output_path, 'diags')
     config['global']['diags_path'] = diags_path
-    if not os.path.exists(diags_path):
+    if create and not os.path.exists(diags_path):
         os.makedirs(diags_path)
 
     # setup run_scripts_path
@@ -302,6 +440,6 @@ def setup_directories(config):
         output_path,
         'scripts')
     config['global']['run_scripts_path'] = run_script_path
-    if not os.path.exists(run_script_path):
+    if create and not os.path.exists(run_script_path):
         os.makedirs(run_script_path)
 # -----------------------------------------------
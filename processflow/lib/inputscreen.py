@@ -0,0 +1,105 @@
+"""
+Screens the history files a job is about to consume before it's submitted,
+so a damaged month or missing variable holds back only the jobs that need
+that file instead of failing after its been queued
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from processflow.lib.ncheader import MAX_WORKERS, HeaderError, check_header, read_header
+
+# the names the time dimension goes by in atmosphere/land and ocean/ice history
+TIME_DIMS = ('time', 'Time')
+
+
+class InputScreen(object):
+    """
+    Reads the header of each input file once, and keeps what it found for as
+    long as the files size and mtime stay the same. Files of the same type
+    almost always have the same variables, so the variable sets are shared
+
+    Parameters:
+        max_workers (int): how many headers to read at once
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self.max_workers = max_workers
+        # path -> (mtime_ns, size, header or error message)
+        self._cache = dict()
+        self._varsets = dict()
+        self._lock = threading.Lock()
+    # -----------------------------------------------
+
+    def __len__(self):
+        return len(self._cache)
+    # -----------------------------------------------
+
+    def _read(self, path, signature):
+        try:
+            header = read_header(path)
+        except (HeaderError, OSError, ValueError) as e:
+            result = '{}: {}'.format(path, e)
+        else:
+            if header.variables is not None:
+                names = frozenset(header.variables)
+                with self._lock:
+                    header.variables = self._varsets.setdefault(names, names)
+            result = header
+        with self._lock:
+            self._cache[path] = signature + (result,)
+    # -----------------------------------------------
+
+    def screen(self, paths, variables=None):
+        """
+        Check a set of input files
+
+        Parameters:
+            paths (list): the paths to the files
+            variables (list): the variables every file should have
+        Returns:
+            a dict mapping the path of each file that failed to what's wrong with it
+        """
+        errors = dict()
+        to_read = list()
+        for path in paths:
+            try:
+                info = os.stat(path)
+            except OSError as e:
+                errors[path] = '{}: {}'.format(path, e)
+                continue
+            signature = (info.st_mtime_ns, info.st_size)
+            cached = self._cache.get(path)
+            if cached is None or cached[:2] != signature:
+                to_read.append((path, signature))
+
+        if len(to_read) == 1:
+            self._read(*to_read[0])
+        elif to_read:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_read))) as pool:
+                list(pool.map(lambda item: self._read(*item), to_read))
+
+        for path in paths:
+            if path in errors:
+                continue
+            result = self._cache[path][2]
+            if not isinstance(result, str):
+                result = self._check(result, variables)
+            if result:
+                errors[path] = result
+        return errors
+    # -----------------------------------------------
+
+    def _check(self, header, variables):
+        error = check_header(header, variables)
+        if error or header.dims is None:
+            return error
+        for time_dim in TIME_DIMS:
+            if time_dim in header.dims:
+                if header.dims[time_dim] == 0:
+                    return '{}: no time steps were written'.format(header.path)
+                break
+        return None
+    # -----------------------------------------------
@@ -8,6 +8,7 @@ class JobInfo(object):
     """
     A simple container class for slurm job information
     """
+    __slots__ = ('jobid', 'jobname', 'partition', 'time', 'user', 'command', '_state')
 
     def __init__(self, jobid=None,
                  jobname=None,
@@ -81,6 +82,20 @@ class JobInfo(object):
             self._state = 'COMPLETED'
         elif state in ['FAILED', 'F']:
             self._state = 'FAILED'
+        elif state in ['CA', 'CANCELLED']:
+            self._state = 'CANCELLED'
+        elif state in ['TO', 'TIMEOUT']:
+            self._state = 'TIMEOUT'
+        elif state in ['DL', 'DEADLINE']:
+            self._state = 'DEADLINE'
+        elif state in ['NF', 'NODE_FAIL']:
+            self._state = 'NODE_FAIL'
+        elif state in ['BF', 'BOOT_FAIL']:
+            self._state = 'BOOT_FAIL'
+        elif state in ['OOM', 'OUT_OF_MEMORY']:
+            self._state = 'OUT_OF_MEMORY'
+        elif state in ['PR', 'PREEMPTED']:
+            self._state = 'PREEMPTED'
         else:
             self._state = state
     # -----------------------------------------------
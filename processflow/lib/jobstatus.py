@@ -27,6 +27,11 @@ StatusMap = {
     'CANCELLED': JobStatus.CANCELLED,
     'COMPLETING': JobStatus.COMPLETED,
     'TIMEOUT': JobStatus.TIMEOUT,
+    'DEADLINE': JobStatus.TIMEOUT,
+    'NODE_FAIL': JobStatus.FAILED,
+    'BOOT_FAIL': JobStatus.FAILED,
+    'OUT_OF_MEMORY': JobStatus.FAILED,
+    'PREEMPTED': JobStatus.FAILED,
     'OTHER': JobStatus.OTHER
 }
 
@@ -0,0 +1,119 @@
+"""
+An append only journal of the jobs in a run, their submissions and state changes,
+so a restarted processflow can pick up where the last one left off
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import io
+import json
+import logging
+import os
+
+from datetime import datetime
+
+from processflow.lib.events import EventType
+
+
+class Journal(object):
+    """
+    Each record is a single line of json, written and synced to disk before
+    the next one, so at worst a crash leaves a partial last line that replay skips.
+
+    There are three kinds of record:
+        job: a job's id and the identity it was derived from
+        submit: the id the resource manager gave a job
+        state: a job's new status
+
+    Parameters:
+        path (str): the journal file, its appended to if it already exists
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fp = io.open(path, 'a', encoding='utf-8')
+    # -----------------------------------------------
+
+    def write(self, kind, job_id, **fields):
+        """
+        Append a record to the journal and sync it to disk
+        """
+        fields['time'] = datetime.now().isoformat()
+        fields['kind'] = kind
+        fields['id'] = job_id
+        self._fp.write(json.dumps(fields, sort_keys=True, default=str) + '\n')
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+    # -----------------------------------------------
+
+    def add_jobs(self, jobs, known=None):
+        """
+        Record the identity of every job not already in the journal
+        """
+        known = known or dict()
+        lines = list()
+        now = datetime.now().isoformat()
+        for job in jobs:
+            if job.id in known:
+                continue
+            lines.append(json.dumps({
+                'time': now,
+                'kind': 'job',
+                'id': job.id,
+                'identity': job.identity(),
+            }, sort_keys=True, default=str) + '\n')
+        if lines:
+            self._fp.write(''.join(lines))
+            self._fp.flush()
+            os.fsync(self._fp.fileno())
+    # -----------------------------------------------
+
+    def subscribe(self, event_list):
+        """
+        Record every submission and job state change pushed into the event list
+        """
+        event_list.subscribe(
+            self._on_event, [EventType.SUBMISSION, EventType.JOB_STATE])
+    # -----------------------------------------------
+
+    def _on_event(self, event):
+        job = event.data
+        if event.event_type == EventType.SUBMISSION:
+            self.write('submit', job.id, manager_id=job.job_id)
+        else:
+            self.write('state', job.id, status=job.status.name)
+    # -----------------------------------------------
+
+    def close(self):
+        if not self._fp.closed:
+            self._fp.close()
+    # -----------------------------------------------
+
+
+def replay(path):
+    """
+    Read back a journal
+
+    Parameters:
+        path (str): the journal file
+    Returns:
+        a dict mapping each job id to a dict with the jobs last known 'status'
+        name and the 'manager_id' of its last submission, either may be None
+    """
+    jobs = dict()
+    if not os.path.exists(path):
+        return jobs
+    with io.open(path, 'r', encoding='utf-8') as fp:
+        for num, line in enumerate(fp, 1):
+            try:
+                record = json.loads(line)
+                kind = record['kind']
+                job_id = record['id']
+            except (ValueError, KeyError):
+                logging.error('skipping unreadable journal line {} in {}'.format(num, path))
+                continue
+            entry = jobs.setdefault(job_id, {'status': None, 'manager_id': None})
+            if kind == 'submit':
+                entry['manager_id'] = record.get('manager_id')
+            elif kind == 'state':
+                entry['status'] = record.get('status')
+    return jobs
+# -----------------------------------------------
@@ -0,0 +1,228 @@
+"""
+A shared link validation engine for diagnostic output pages
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import io
+import os
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from html.parser import HTMLParser
+except ImportError:
+    from HTMLParser import HTMLParser
+
+# pages are fed to the parser in chunks of this many characters
+CHUNK_SIZE = 64 * 1024
+
+# below this many subpages the pool startup costs more than it saves
+MIN_PARALLEL_PAGES = 16
+
+
+class _LinkParser(HTMLParser):
+    """
+    A streaming parser that only keeps the requested attributes of <a> tags
+    """
+
+    def __init__(self, attrs):
+        HTMLParser.__init__(self)
+        self._attrs = attrs
+        self.links = list()
+    # -----------------------------------------------
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        for name, value in attrs:
+            if name in self._attrs and value:
+                self.links.append(value)
+    # -----------------------------------------------
+
+
+def extract_links(page_path, attrs=('href',)):
+    """
+    Stream an html page through the parser and return the values of the
+    requested <a> tag attributes, in page order
+
+    Parameters:
+        page_path (str): path to the html page
+        attrs (tuple): the attribute names to collect
+    Returns:
+        links (list): a list of attribute values
+    """
+    parser = _LinkParser(attrs)
+    with io.open(page_path, 'r', encoding='utf-8', errors='replace') as page:
+        while True:
+            chunk = page.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    return parser.links
+# -----------------------------------------------
+
+
+def _extract_page(args):
+    """
+    Pool worker, returns the page path along with its links
+    """
+    page_path, attrs = args
+    try:
+        return page_path, extract_links(page_path, attrs), None
+    except (IOError, OSError) as e:
+        return page_path, list(), str(e)
+# -----------------------------------------------
+
+
+def _walk(root):
+    """
+    Returns the set of every file and directory path under root
+    """
+    found = set([root])
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in dirnames:
+            found.add(os.path.join(dirpath, name))
+        for name in filenames:
+            found.add(os.path.join(dirpath, name))
+    return found
+# -----------------------------------------------
+
+
+def _matches(link, suffixes):
+    if suffixes is None:
+        return True
+    return link.endswith(tuple(suffixes))
+# -----------------------------------------------
+
+
+class LinkReport(object):
+    """
+    The result of a link check
+
+    Attributes:
+        index (str): the path to the index page that was checked
+        pages_checked (int): the number of pages parsed, including the index
+        missing (OrderedDict): a mapping of page path to a list of
+            (href, resolved_path) pairs for every missing link on that page
+        errors (dict): a mapping of page path to the error that stopped it being read
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.index_found = False
+        self.pages_checked = 0
+        self.missing = OrderedDict()
+        self.errors = dict()
+    # -----------------------------------------------
+
+    def add_missing(self, page, href, path):
+        self.missing.setdefault(page, list()).append((href, path))
+    # -----------------------------------------------
+
+    @property
+    def num_missing(self):
+        return sum(len(x) for x in self.missing.values())
+    # -----------------------------------------------
+
+    @property
+    def ok(self):
+        return self.index_found and not self.missing and not self.errors
+    # -----------------------------------------------
+
+    def missing_paths(self):
+        """
+        Returns a flat list of the resolved paths for all missing links
+        """
+        return [path for links in self.missing.values() for _, path in links]
+    # -----------------------------------------------
+
+    def missing_hrefs(self, page):
+        """
+        Returns the set of raw href values that were missing on the given page
+        """
+        return set(href for href, _ in self.missing.get(page, list()))
+    # -----------------------------------------------
+
+    def __str__(self):
+        return 'LinkReport({index}: {pages} pages, {missing} missing links)'.format(
+            index=self.index,
+            pages=self.pages_checked,
+            missing=self.num_missing)
+    # -----------------------------------------------
+
+
+def check_links(index_path, link_filter=None, follow=None,
+                sublink_attrs=('href',), sublink_filter=None, workers=None):
+    """
+    Check an index page, and optionally the subpages it links to, for missing links
+
+    Existence is checked against a single walk of the index's directory, links
+    that resolve outside of it fall back to os.path.exists
+
+    Parameters:
+        index_path (str): the path to the index page
+        link_filter (list): only check index links ending with one of these suffixes,
+            None checks every link
+        follow (list): index links ending with one of these suffixes are parsed as subpages,
+            None doesnt follow any links
+        sublink_attrs (tuple): which <a> attributes to collect from subpages
+        sublink_filter (list): only check subpage links ending with one of these suffixes,
+            None checks every link
+        workers (int): the number of processes used to parse subpages, defaults to the cpu count
+    Returns:
+        report (LinkReport): the missing link report
+    """
+    report = LinkReport(index_path)
+    if not os.path.exists(index_path):
+        return report
+    report.index_found = True
+
+    root = os.path.dirname(os.path.abspath(index_path))
+    existing = _walk(root)
+    prefix = root + os.sep
+
+    def exists(path):
+        if path == root or path.startswith(prefix):
+            return path in existing
+        return os.path.exists(path)
+
+    subpages = list()
+    for link in extract_links(index_path):
+        if not _matches(link, link_filter):
+            continue
+        link_path = os.path.normpath(os.path.join(root, link))
+        if not exists(link_path):
+            report.add_missing(index_path, link, link_path)
+            continue
+        if follow is not None and _matches(link, follow):
+            subpages.append(link_path)
+    report.pages_checked = 1
+
+    tasks = [(page, tuple(sublink_attrs)) for page in subpages]
+    if len(tasks) < MIN_PARALLEL_PAGES or workers == 1:
+        results = map(_extract_page, tasks)
+        _collect(report, results, exists, sublink_filter)
+    else:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_extract_page, tasks, chunksize=chunksize)
+            _collect(report, results, exists, sublink_filter)
+    return report
+# -----------------------------------------------
+
+
+def _collect(report, results, exists, sublink_filter):
+    for page_path, links, error in results:
+        report.pages_checked += 1
+        if error:
+            report.errors[page_path] = error
+            continue
+        page_dir = os.path.dirname(page_path)
+        for link in links:
+            if not _matches(link, sublink_filter):
+                continue
+            link_path = os.path.normpath(os.path.join(page_dir, link))
+            if not exists(link_path):
+                report.add_missing(page_path, link, link_path)
+# -----------------------------------------------
@@ -0,0 +1,283 @@
+"""
+The logging pipeline: log records are handed off to a queue and written out in
+batches by a background thread, and console lines are rate limited with
+repeated messages folded together, so chatty jobs dont stall the main loop
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+# how many records the file handler holds before writing them out
+BATCH_SIZE = 200
+# how long the listener waits for a new record before writing out a partial batch
+FLUSH_INTERVAL = 1.0
+# the most lines printed to the console each second, the rest are counted
+CONSOLE_LINES_PER_SECOND = 20
+
+TEXT_FORMAT = '%(asctime)s:%(levelname)s: %(message)s'
+TEXT_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats each record as a single line of json
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        job = getattr(record, 'job', None)
+        if job is not None:
+            entry['job'] = job
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+    # -----------------------------------------------
+
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    A FileHandler that collects formatted records and writes them out
+    together, errors are written out right away
+    """
+
+    def __init__(self, filename, mode='a', capacity=BATCH_SIZE):
+        super(BatchedFileHandler, self).__init__(filename, mode=mode)
+        self.capacity = capacity
+        self._batch = list()
+    # -----------------------------------------------
+
+    def emit(self, record):
+        try:
+            self._batch.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        if len(self._batch) >= self.capacity or record.levelno >= logging.ERROR:
+            self.flush()
+    # -----------------------------------------------
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._batch and self.stream:
+                self.stream.write(''.join(self._batch))
+                self._batch = list()
+            super(BatchedFileHandler, self).flush()
+        finally:
+            self.release()
+    # -----------------------------------------------
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    A QueueListener that writes out any partial batch once the
+    queue has been quiet for flush_interval seconds
+    """
+
+    def __init__(self, log_queue, *handlers, **kwargs):
+        self.flush_interval = kwargs.pop('flush_interval', FLUSH_INTERVAL)
+        super(BatchingQueueListener, self).__init__(log_queue, *handlers, **kwargs)
+    # -----------------------------------------------
+
+    def dequeue(self, block):
+        if not block:
+            return self.queue.get(False)
+        while True:
+            try:
+                return self.queue.get(True, self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+    # -----------------------------------------------
+
+
+class ConsoleThrottle(object):
+    """
+    Prints timestamped lines to the console, a message repeated back to back
+    is only printed once followed by a count, and past the per second limit
+    lines are counted instead of printed
+    """
+
+    def __init__(self, lines_per_second=CONSOLE_LINES_PER_SECOND, stream=None):
+        self.lines_per_second = lines_per_second
+        self.stream = stream
+        self.log_path = None
+        self._last = None
+        self._repeats = 0
+        self._window = 0
+        self._printed = 0
+        self._suppressed = 0
+        self._lock = threading.Lock()
+    # -----------------------------------------------
+
+    def _write(self, text, newline=True):
+        stream = self.stream or sys.stdout
+        line = '{time}: {text}'.format(
+            time=datetime.now().strftime('%H:%M:%S'),
+            text=text)
+        stream.write(line + ('\n' if newline else ' '))
+        stream.flush()
+    # -----------------------------------------------
+
+    def _summarize(self):
+        if self._repeats:
+            self._write('last message repeated {} more times'.format(self._repeats))
+            self._repeats = 0
+        if self._suppressed:
+            msg = '{} messages not shown'.format(self._suppressed)
+            if self.log_path:
+                msg += ', see {}'.format(self.log_path)
+            self._write(msg)
+            self._suppressed = 0
+    # -----------------------------------------------
+
+    def line(self, text, newline=True):
+        """
+        Print a line, unless its a repeat of the last one or the limit has been hit.
+        A line without a newline is always printed, since the caller finishes it
+        with a print of its own
+        """
+        with self._lock:
+            if newline and text == self._last:
+                self._repeats += 1
+                return
+            window = int(time.time())
+            if window != self._window:
+                self._window = window
+                self._printed = 0
+                self._summarize()
+            elif self._repeats:
+                self._write('last message repeated {} more times'.format(self._repeats))
+                self._repeats = 0
+            if newline and self._printed >= self.lines_per_second:
+                self._suppressed += 1
+                return
+            self._last = text if newline else None
+            self._printed += 1
+            self._write(text, newline)
+    # -----------------------------------------------
+
+    def flush(self):
+        """
+        Print the counts for anything held back
+        """
+        with self._lock:
+            self._summarize()
+            self._last = None
+    # -----------------------------------------------
+
+
+console = ConsoleThrottle()
+
+
+class LogPipeline(object):
+    """
+    A QueueHandler on the root logger, feeding a BatchingQueueListener
+    that owns the file handler. While its running it's the only handler on the
+    root logger, any logging before it started will have put a console handler there
+    """
+
+    def __init__(self, log_path, level=logging.INFO, json_format=False, mode='w'):
+        self.log_queue = queue.Queue(-1)
+        self.file_handler = BatchedFileHandler(log_path, mode=mode)
+        if json_format:
+            self.file_handler.setFormatter(JsonFormatter())
+        else:
+            self.file_handler.setFormatter(
+                logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATE_FORMAT))
+        self.queue_handler = QueueHandler(self.log_queue)
+        self.listener = BatchingQueueListener(
+            self.log_queue, self.file_handler, respect_handler_level=False)
+        self.level = level
+        self._previous = list()
+        self._previous_level = logging.WARNING
+    # -----------------------------------------------
+
+    def start(self):
+        root = logging.getLogger()
+        self._previous = root.handlers[:]
+        self._previous_level = root.level
+        for handler in self._previous:
+            root.removeHandler(handler)
+        root.addHandler(self.queue_handler)
+        root.setLevel(self.level)
+        self.listener.start()
+    # -----------------------------------------------
+
+    def stop(self):
+        root = logging.getLogger()
+        root.removeHandler(self.queue_handler)
+        for handler in self._previous:
+            root.addHandler(handler)
+        root.setLevel(self._previous_level)
+        self.listener.stop()
+        self.file_handler.close()
+    # -----------------------------------------------
+
+
+def start_logging(log_path, level=logging.INFO, json_format=False):
+    """
+    Send all logging to log_path through the queued pipeline, replacing any
+    pipeline already running
+
+    Parameters:
+        log_path (str): the path to the log file, its overwritten
+        level (int): the logging level
+        json_format (bool): write each record as a line of json instead of text
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+        _pipeline = LogPipeline(log_path, level=level, json_format=json_format)
+        _pipeline.start()
+    console.log_path = log_path
+# -----------------------------------------------
+
+
+def stop_logging():
+    """
+    Print the counts for anything the console held back, write out everything
+    still queued and stop the pipeline. Nothing happens if logging wasnt started
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            return
+        console.flush()
+        _pipeline.stop()
+        _pipeline = None
+    console.log_path = None
+# -----------------------------------------------
+
+
+def _close_pipeline():
+    """
+    At exit, write out whatever is still queued. Nothing is printed, a run that
+    finished normally already stopped logging, and the log may be gone by now
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            _pipeline.stop()
+            _pipeline = None
+# -----------------------------------------------
+
+
+atexit.register(_close_pipeline)
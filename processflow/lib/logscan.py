@@ -0,0 +1,112 @@
+"""
+Incremental scanning of job log directories for error messages
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import os
+
+READ_SIZE = 256 * 1024
+
+
+class _LogState(object):
+    """
+    What is known about a single log file from previous scans
+    """
+
+    def __init__(self):
+        self.mtime = None
+        self.offset = 0
+        self.tail = b''
+        self.error = None
+    # -----------------------------------------------
+
+
+class LogScanner(object):
+    """
+    Scans a directory of log files for a pattern, remembering how far into each
+    file it has read so repeated scans only look at newly appended bytes
+    """
+
+    def __init__(self, pattern='Error', suffix='.log'):
+        """
+        Parameters:
+            pattern (str): the text that marks an error
+            suffix (str): only files ending with this suffix are scanned
+        """
+        self._pattern = pattern.encode('utf-8')
+        self._suffix = suffix
+        self._files = dict()
+    # -----------------------------------------------
+
+    def count_files(self, log_dir):
+        """
+        Returns the number of entries in the log directory
+        """
+        count = 0
+        with os.scandir(log_dir) as entries:
+            for _ in entries:
+                count += 1
+        return count
+    # -----------------------------------------------
+
+    def find_error(self, log_dir):
+        """
+        Scan the logs in log_dir, stopping at the first file containing the pattern
+
+        Parameters:
+            log_dir (str): the directory holding the logs
+        Returns:
+            a (path, line) tuple for the first error found, or None. A directory
+            without any logs in it counts as an error, since the job never ran
+        """
+        with os.scandir(log_dir) as entries:
+            entries = sorted(entries, key=lambda x: x.name)
+        found = False
+        for entry in entries:
+            if not entry.name.endswith(self._suffix) or not entry.is_file():
+                continue
+            found = True
+            error = self._scan_file(entry.path, entry.stat())
+            if error is not None:
+                return entry.path, error
+        if not found:
+            return log_dir, 'no {} files found'.format(self._suffix)
+        return None
+    # -----------------------------------------------
+
+    def _scan_file(self, path, info):
+        state = self._files.get(path)
+        if state is None or info.st_size < state.offset or (
+                info.st_size == state.offset and info.st_mtime != state.mtime):
+            # new file, or one that has been truncated, replaced or rewritten in place
+            state = _LogState()
+            self._files[path] = state
+        elif state.mtime == info.st_mtime and state.offset == info.st_size:
+            return state.error
+
+        if state.error is not None:
+            state.mtime = info.st_mtime
+            state.offset = info.st_size
+            return state.error
+
+        keep = len(self._pattern) - 1
+        with open(path, 'rb') as infile:
+            infile.seek(state.offset)
+            while True:
+                block = infile.read(READ_SIZE)
+                if not block:
+                    break
+                data = state.tail + block
+                index = data.find(self._pattern)
+                if index >= 0:
+                    start = data.rfind(b'\n', 0, index) + 1
+                    end = data.find(b'\n', index)
+                    line = data[start:end if end >= 0 else len(data)]
+                    state.error = line.decode('utf-8', 'replace').strip()
+                    state.offset = info.st_size
+                    state.mtime = info.st_mtime
+                    return state.error
+                state.offset += len(block)
+                state.tail = data[-keep:] if keep else b''
+        state.mtime = info.st_mtime
+        return None
+    # -----------------------------------------------
@@ -0,0 +1,320 @@
+"""
+Run metrics in the prometheus text format, served over http on the local
+machine or written out to a file, so a long campaign can be watched while it runs
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import logging
+import threading
+import time
+
+from collections import deque
+
+from processflow.lib.events import EventType
+
+# the upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# every metric, its type and help text
+METRICS = {
+    'processflow_jobs': (
+        'gauge', 'Jobs by state and job type'),
+    'processflow_loop_seconds': (
+        'histogram', 'Time spent in each pass of the main loop, not counting the sleep'),
+    'processflow_submissions_total': (
+        'counter', 'Jobs submitted to the resource manager'),
+    'processflow_submissions_per_minute': (
+        'gauge', 'Jobs submitted to the resource manager in the last minute'),
+    'processflow_validations_total': (
+        'counter', 'Job output validations by result'),
+    'processflow_manager_call_seconds': (
+        'histogram', 'Resource manager command latency'),
+    'processflow_manager_call_errors_total': (
+        'counter', 'Resource manager commands that failed or timed out'),
+    'processflow_readiness_check_seconds': (
+        'histogram', 'Time spent checking whether the data for each job is ready'),
+    'processflow_files_expected': (
+        'gauge', 'Input files expected by the run'),
+    'processflow_files_present': (
+        'gauge', 'Input files present on the local machine'),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+# -----------------------------------------------
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(key, _escape(val)) for key, val in items) + '}'
+# -----------------------------------------------
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+# -----------------------------------------------
+
+
+class Histogram(object):
+    """
+    Counts of observations at or under each bucket bound, with their sum
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+    # -----------------------------------------------
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+    # -----------------------------------------------
+
+
+class Metrics(object):
+    """
+    A registry of counters, gauges and histograms, keyed by name and labels.
+    Collectors fill in gauges that are cheaper to compute on demand than to keep
+    up to date, they read the run's state so they're only called from the main
+    loop through collect, and rendering serves whatever they last wrote
+    """
+
+    def __init__(self):
+        self._values = dict()
+        self._histograms = dict()
+        self._collectors = dict()
+        self._submissions = deque()
+        # reentrant, so a collect holds it across every collector's clear and set
+        self._lock = threading.RLock()
+    # -----------------------------------------------
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+    # -----------------------------------------------
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = value
+    # -----------------------------------------------
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = Histogram()
+                self._histograms[key] = histogram
+            histogram.observe(value)
+    # -----------------------------------------------
+
+    def clear(self, name, **labels):
+        """
+        Drop every labelled value of a gauge, used by collectors before refilling it.
+        Given labels, only the values carrying all of them are dropped
+        """
+        labels = set(labels.items())
+        with self._lock:
+            for key in [x for x in self._values
+                        if x[0] == name and labels.issubset(x[1])]:
+                del self._values[key]
+    # -----------------------------------------------
+
+    def timer(self, name, **labels):
+        """
+        Returns a context manager that observes how long its block took
+        """
+        return _Timer(self, name, labels)
+    # -----------------------------------------------
+
+    def register_collector(self, key, collector):
+        """
+        Call collector with this registry every time the metrics are collected,
+        a collector registered under the same key replaces the old one
+        """
+        self._collectors[key] = collector
+    # -----------------------------------------------
+
+    def unregister_collector(self, key):
+        """
+        Stop calling the collector registered under key, if there is one
+        """
+        self._collectors.pop(key, None)
+    # -----------------------------------------------
+
+    def subscribe(self, event_list):
+        """
+        Count submissions and validations as they're pushed into the event list,
+        subscribing to the same list again doesnt count anything twice
+        """
+        event_list.unsubscribe(self._on_event)
+        event_list.subscribe(
+            self._on_event, [EventType.SUBMISSION, EventType.VALIDATION])
+    # -----------------------------------------------
+
+    def unsubscribe(self, event_list):
+        """
+        Stop counting events from the event list
+        """
+        event_list.unsubscribe(self._on_event)
+    # -----------------------------------------------
+
+    def _on_event(self, event):
+        job = event.data
+        job_type = getattr(job, 'job_type', 'unknown')
+        if event.event_type == EventType.SUBMISSION:
+            self.inc('processflow_submissions_total', type=job_type)
+            with self._lock:
+                self._submissions.append(time.time())
+        else:
+            result = 'invalid' if event.message.endswith('invalid') else 'valid'
+            self.inc('processflow_validations_total', type=job_type, result=result)
+    # -----------------------------------------------
+
+    def collect(self):
+        """
+        Refresh the collected gauges, called from the main loop after each pass.
+        A render from another thread sees either the old values or the new ones
+        """
+        with self._lock:
+            for collector in list(self._collectors.values()):
+                try:
+                    collector(self)
+                except Exception as e:
+                    logging.error('metrics collector failed: {}'.format(repr(e)))
+    # -----------------------------------------------
+
+    def render(self):
+        """
+        Returns every metric in the prometheus text exposition format, as of the last collect
+        """
+        with self._lock:
+            cutoff = time.time() - 60
+            while self._submissions and self._submissions[0] < cutoff:
+                self._submissions.popleft()
+            self._values[('processflow_submissions_per_minute', ())] = len(self._submissions)
+
+            lines = list()
+            for name in sorted(METRICS):
+                metric_type, help_text = METRICS[name]
+                if metric_type == 'histogram':
+                    samples = sorted(
+                        (key[1], val) for key, val in self._histograms.items() if key[0] == name)
+                else:
+                    samples = sorted(
+                        (key[1], val) for key, val in self._values.items() if key[0] == name)
+                if not samples:
+                    continue
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} {}'.format(name, metric_type))
+                for labels, value in samples:
+                    if metric_type != 'histogram':
+                        lines.append('{}{} {}'.format(
+                            name, _format_labels(labels), _format_value(value)))
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets, value.counts):
+                        cumulative += count
+                        lines.append('{}_bucket{} {}'.format(
+                            name,
+                            _format_labels(labels, ('le', _format_value(float(bound)))),
+                            cumulative))
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _format_labels(labels, ('le', '+Inf')), value.count))
+                    lines.append('{}_sum{} {}'.format(
+                        name, _format_labels(labels), _format_value(value.total)))
+                    lines.append('{}_count{} {}'.format(
+                        name, _format_labels(labels), value.count))
+        return '\n'.join(lines) + '\n'
+    # -----------------------------------------------
+
+    def write(self, path):
+        """
+        Write the metrics out to a file, in the same format the endpoint serves,
+        called from the main loop so the gauges are collected first
+        """
+        from processflow.lib.util import atomic_write
+        self.collect()
+        atomic_write(path, self.render())
+    # -----------------------------------------------
+
+
+class _Timer(object):
+
+    def __init__(self, metrics, name, labels):
+        self._metrics = metrics
+        self._name = name
+        self._labels = labels
+        self._start = None
+    # -----------------------------------------------
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+    # -----------------------------------------------
+
+    def __exit__(self, *args):
+        self._metrics.observe(
+            self._name, time.time() - self._start, **self._labels)
+        return False
+    # -----------------------------------------------
+
+
+# the registry for the whole run
+metrics = Metrics()
+
+
+def start_server(port, host='127.0.0.1', registry=None):
+    """
+    Serve the metrics at http://host:port/metrics from a daemon thread
+
+    Parameters:
+        port (int): the port to listen on, 0 picks a free port
+        host (str): the address to listen on, the local machine by default
+        registry (Metrics): the registry to serve, the run wide one by default
+    Returns:
+        the running http server, its server_address has the port it bound to
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    registry = registry or metrics
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ['/', '/metrics']:
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='processflow-metrics')
+    thread.daemon = True
+    thread.start()
+    return server
+# -----------------------------------------------
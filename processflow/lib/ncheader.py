@@ -0,0 +1,344 @@
+"""
+A quick integrity check for netCDF output that only reads the file header.
+Classic format files (CDF-1, CDF-2 and CDF-5) have their dimensions and variables
+read, and the size the header says the file should be is checked against the
+size it actually is. netCDF-4 files are HDF5, for those the superblock is read
+and the end of file address it records is checked against the file size
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import mmap
+import os
+import struct
+
+from concurrent.futures import ThreadPoolExecutor
+
+# how many files are checked at once
+MAX_WORKERS = 8
+
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+# the offsets an HDF5 superblock can be found at, it moves past any user block
+HDF5_OFFSETS = (0, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+NC_DIMENSION = 10
+NC_VARIABLE = 11
+NC_ATTRIBUTE = 12
+STREAMING = 0xFFFFFFFF
+
+# the size in bytes of each netCDF external type
+TYPE_SIZES = {
+    1: 1,   # byte
+    2: 1,   # char
+    3: 2,   # short
+    4: 4,   # int
+    5: 4,   # float
+    6: 8,   # double
+    7: 1,   # ubyte
+    8: 2,   # ushort
+    9: 4,   # uint
+    10: 8,  # int64
+    11: 8,  # uint64
+}
+
+
+class HeaderError(Exception):
+    pass
+
+
+class NcHeader(object):
+    """
+    What the header of a netCDF file says about it
+
+    Parameters:
+        path (str): the path to the file
+        file_format (str): one of CDF-1, CDF-2, CDF-5 or HDF5
+        size (int): the size of the file in bytes
+        expected_size (int): the smallest size the file can be given its header
+        dims (dict): dimension name to length, the record dimension has the
+            number of records, None for HDF5 files
+        variables (dict): variable name to a tuple of its dimension names,
+            None for HDF5 files
+    """
+    __slots__ = ('path', 'file_format', 'size', 'expected_size', 'dims', 'variables')
+
+    def __init__(self, path, file_format, size, expected_size, dims=None, variables=None):
+        self.path = path
+        self.file_format = file_format
+        self.size = size
+        self.expected_size = expected_size
+        self.dims = dims
+        self.variables = variables
+    # -----------------------------------------------
+
+
+class _Reader(object):
+    """
+    Reads the big endian fields of a classic format header out of a buffer
+    """
+
+    def __init__(self, buf, version):
+        self.buf = buf
+        self.pos = 4
+        # CDF-5 uses 64 bit counts, CDF-2 and CDF-5 use 64 bit offsets
+        self.count_format = '>Q' if version == 5 else '>I'
+        self.offset_format = '>I' if version == 1 else '>Q'
+    # -----------------------------------------------
+
+    def _unpack(self, fmt):
+        size = struct.calcsize(fmt)
+        if self.pos + size > len(self.buf):
+            raise HeaderError('header is truncated')
+        value, = struct.unpack_from(fmt, self.buf, self.pos)
+        self.pos += size
+        return value
+    # -----------------------------------------------
+
+    def int32(self):
+        return self._unpack('>I')
+    # -----------------------------------------------
+
+    def count(self):
+        return self._unpack(self.count_format)
+    # -----------------------------------------------
+
+    def offset(self):
+        return self._unpack(self.offset_format)
+    # -----------------------------------------------
+
+    def skip(self, nbytes):
+        # everything in the header is padded out to four bytes
+        nbytes += -nbytes % 4
+        if self.pos + nbytes > len(self.buf):
+            raise HeaderError('header is truncated')
+        self.pos += nbytes
+    # -----------------------------------------------
+
+    def name(self):
+        length = self.count()
+        end = self.pos + length
+        if end > len(self.buf):
+            raise HeaderError('header is truncated')
+        name = bytes(self.buf[self.pos:end]).decode('utf-8', 'replace')
+        self.skip(length)
+        return name
+    # -----------------------------------------------
+
+    def list_header(self, tag):
+        """
+        Returns the number of items in a list, after checking its tag
+        """
+        found = self.int32()
+        nelems = self.count()
+        if found == 0 and nelems == 0:
+            return 0
+        if found != tag:
+            raise HeaderError('unexpected tag {} in header'.format(found))
+        return nelems
+    # -----------------------------------------------
+
+    def skip_attributes(self):
+        for _ in range(self.list_header(NC_ATTRIBUTE)):
+            self.name()
+            nc_type = self.int32()
+            nelems = self.count()
+            if nc_type not in TYPE_SIZES:
+                raise HeaderError('unknown type {} in header'.format(nc_type))
+            self.skip(nelems * TYPE_SIZES[nc_type])
+    # -----------------------------------------------
+
+
+def _read_classic(path, buf, size):
+    version = buf[3]
+    if version not in (1, 2, 5):
+        raise HeaderError('unknown classic format version {}'.format(version))
+    reader = _Reader(buf, version)
+    numrecs = reader.count()
+
+    dim_names = list()
+    dim_lengths = list()
+    for _ in range(reader.list_header(NC_DIMENSION)):
+        dim_names.append(reader.name())
+        dim_lengths.append(reader.count())
+    record_dim = dim_lengths.index(0) if 0 in dim_lengths else None
+
+    reader.skip_attributes()
+
+    variables = dict()
+    expected_size = 0
+    record_begin = None
+    record_size = 0
+    record_vars = list()
+    for _ in range(reader.list_header(NC_VARIABLE)):
+        name = reader.name()
+        dimids = [reader.count() for _ in range(reader.count())]
+        reader.skip_attributes()
+        nc_type = reader.int32()
+        vsize = reader.count()
+        begin = reader.offset()
+        if any(x >= len(dim_names) for x in dimids):
+            raise HeaderError('variable {} has an unknown dimension'.format(name))
+        if nc_type not in TYPE_SIZES:
+            raise HeaderError('variable {} has unknown type {}'.format(name, nc_type))
+        variables[name] = tuple(dim_names[x] for x in dimids)
+        if dimids and dimids[0] == record_dim:
+            record_vars.append((nc_type, dimids))
+            record_size += vsize
+            if record_begin is None or begin < record_begin:
+                record_begin = begin
+        else:
+            expected_size = max(expected_size, begin + vsize)
+    expected_size = max(expected_size, reader.pos)
+
+    if record_begin is not None:
+        if numrecs == STREAMING:
+            raise HeaderError('number of records was never written')
+        # each record is padded out to four bytes, unless theres only one record variable
+        if len(record_vars) == 1:
+            nc_type, dimids = record_vars[0]
+            record_size = TYPE_SIZES[nc_type]
+            for dimid in dimids[1:]:
+                record_size *= dim_lengths[dimid]
+        expected_size = max(expected_size, record_begin + numrecs * record_size)
+
+    dims = dict(zip(dim_names, dim_lengths))
+    if record_dim is not None:
+        dims[dim_names[record_dim]] = numrecs
+    return NcHeader(
+        path=path,
+        file_format='CDF-{}'.format(version),
+        size=size,
+        expected_size=expected_size,
+        dims=dims,
+        variables=variables)
+# -----------------------------------------------
+
+
+def _read_hdf5(path, buf, size):
+    for base in HDF5_OFFSETS:
+        if base + 8 > len(buf):
+            raise HeaderError('not a netCDF file')
+        if buf[base:base + 8] == HDF5_SIGNATURE:
+            break
+    else:
+        raise HeaderError('not a netCDF file')
+
+    if base + 16 > len(buf):
+        raise HeaderError('HDF5 superblock is truncated')
+    version = buf[base + 8]
+    if version in (0, 1):
+        offset_size = buf[base + 13]
+        # the base, free space and end of file addresses follow the fixed fields
+        eof_pos = base + (24 if version == 0 else 28) + 2 * offset_size
+    elif version in (2, 3):
+        offset_size = buf[base + 9]
+        eof_pos = base + 12 + 2 * offset_size
+    else:
+        raise HeaderError('unknown HDF5 superblock version {}'.format(version))
+    if offset_size not in (2, 4, 8):
+        raise HeaderError('bad HDF5 offset size {}'.format(offset_size))
+    if eof_pos + offset_size > len(buf):
+        raise HeaderError('HDF5 superblock is truncated')
+    eof = int.from_bytes(bytes(buf[eof_pos:eof_pos + offset_size]), 'little')
+    return NcHeader(
+        path=path,
+        file_format='HDF5',
+        size=size,
+        expected_size=base + eof)
+# -----------------------------------------------
+
+
+def read_header(path):
+    """
+    Read the header of a netCDF file, only the pages the header is on are read
+
+    Parameters:
+        path (str): the path to the file
+    Returns:
+        an NcHeader
+    Raises:
+        HeaderError if the file is empty, or isnt a netCDF file, or its header is damaged
+    """
+    with open(path, 'rb') as infile:
+        size = os.fstat(infile.fileno()).st_size
+        if size == 0:
+            raise HeaderError('file is empty')
+        buf = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if buf[:3] == b'CDF':
+                return _read_classic(path, buf, size)
+            return _read_hdf5(path, buf, size)
+        finally:
+            buf.close()
+# -----------------------------------------------
+
+
+def check_file(path, variables=None, time_length=None, time_dim='time'):
+    """
+    Check that a netCDF file is whole, and optionally that it has the expected
+    variables and number of time steps. The variables and time length can only
+    be checked for classic format files
+
+    Parameters:
+        path (str): the path to the file
+        variables (list): the names of variables the file should have
+        time_length (int): how many time steps the file should have
+        time_dim (str): the name of the time dimension
+    Returns:
+        None if the file passes, otherwise a message saying what's wrong with it
+    """
+    try:
+        header = read_header(path)
+    except (HeaderError, OSError, ValueError) as e:
+        return '{}: {}'.format(path, e)
+    return check_header(header, variables, time_length, time_dim)
+# -----------------------------------------------
+
+
+def check_header(header, variables=None, time_length=None, time_dim='time'):
+    """
+    The checks check_file makes, against a header thats already been read
+
+    Returns:
+        None if the file passes, otherwise a message saying what's wrong with it
+    """
+    path = header.path
+    if header.size < header.expected_size:
+        return '{}: file is truncated, {} of {} bytes'.format(
+            path, header.size, header.expected_size)
+    if header.variables is None:
+        return None
+    if variables:
+        missing = [x for x in variables if x not in header.variables]
+        if missing:
+            return '{}: missing variables {}'.format(path, ', '.join(missing))
+    if time_length is not None and header.dims.get(time_dim) != time_length:
+        return '{}: expected {} time steps, found {}'.format(
+            path, time_length, header.dims.get(time_dim))
+    return None
+# -----------------------------------------------
+
+
+def check_files(paths, variables=None, time_length=None, time_dim='time', max_workers=MAX_WORKERS):
+    """
+    Run check_file over many files at once
+
+    Parameters:
+        paths (list): the paths to the files
+        variables (list or dict): the variables every file should have, or a dict
+            mapping each path to the variables that file should have
+        time_length (int): how many time steps every file should have
+        time_dim (str): the name of the time dimension
+        max_workers (int): how many files to check at once
+    Returns:
+        a dict mapping the path of each file that failed to what's wrong with it
+    """
+    def check(path):
+        expected = variables.get(path) if isinstance(variables, dict) else variables
+        return path, check_file(path, expected, time_length, time_dim)
+
+    if len(paths) <= 1:
+        results = [check(x) for x in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+            results = list(pool.map(check, paths))
+    return {path: error for path, error in results if error}
+# -----------------------------------------------
@@ -0,0 +1,58 @@
+"""
+Writes the manifest for a plan only run, every job with its inputs,
+command and run script, resolved without touching the project directory
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import json
+
+from collections import OrderedDict
+
+from processflow.lib.util import print_line
+from processflow.version import __version__
+
+
+def write_plan(runmanager, config, manifest_path, event_list, write_scripts=False):
+    """
+    Plan every job and write the manifest
+
+    Parameters:
+        runmanager (RunManager): a runmanager with its cases and jobs setup
+        config (dict): the global config object
+        manifest_path (str): where to write the manifest json
+        event_list (EventList): an EventList to push user notifications into
+        write_scripts (bool): also write out the run scripts and templates each job rendered
+    Returns:
+        the manifest as a dict
+    """
+    jobs = runmanager.plan_jobs()
+
+    manifest = OrderedDict([
+        ('processflow_version', __version__),
+        ('project_path', config['global']['project_path']),
+        ('start_year', int(config['simulations']['start_year'])),
+        ('end_year', int(config['simulations']['end_year'])),
+        ('scripts_written', write_scripts),
+        ('jobs', jobs),
+    ])
+    with open(manifest_path, 'w') as outfile:
+        json.dump(manifest, outfile, indent=4)
+
+    failed = len([x for x in jobs if x['error']])
+    msg = 'Planned {num} jobs, manifest written to {path}'.format(
+        num=len(jobs),
+        path=manifest_path)
+    print_line(msg, event_list)
+    if failed:
+        msg = '{} jobs could not be planned, see the error field in the manifest'.format(
+            failed)
+        print_line(msg, event_list)
+
+    if write_scripts:
+        written = 0
+        for case in runmanager.cases:
+            for job in case['jobs']:
+                written += len(job.write_planned_files())
+        msg = 'Wrote {} scripts'.format(written)
+        print_line(msg, event_list)
+    return manifest
+# -----------------------------------------------
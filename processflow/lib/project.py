@@ -0,0 +1,130 @@
+"""
+A single processflow run, stepped through one pass of the main loop at a time,
+either by processflow's own main loop or by a daemon hosting many runs
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import os
+
+from processflow.lib.finalize import finalize
+from processflow.lib.util import print_line
+from processflow.lib.watcher import InputWatcher
+
+
+class Project(object):
+    """
+    Parameters:
+        config (dict): the run's config, as setup by initialize
+        runmanager (RunManager): the run's runmanager
+        event_list (EventList): the run's event list
+    """
+
+    def __init__(self, config, runmanager, event_list):
+        self.config = config
+        self.runmanager = runmanager
+        self.filemanager = runmanager.filemanager
+        self.event_list = event_list
+        self.debug = True if config['global'].get('debug') else False
+        self.follow = True if config['global'].get('follow') else False
+        self.state_path = os.path.join(
+            config['global']['project_path'],
+            'output',
+            'job_state.txt')
+        # the is_all_done status the run finished with, None while its running
+        self.status = None
+
+        # in live mode, watch the directories the missing input files will land in
+        self.watcher = None
+        if config['global'].get('live') and not self.filemanager.all_data_local():
+            self.watcher = InputWatcher(self.filemanager.missing_dirs())
+            msg = 'Watching {} input directories for new files{}'.format(
+                len(self.watcher.directories),
+                '' if self.watcher.inotify else ', rescanning every {} seconds'.format(
+                    self.watcher.interval))
+            print_line(msg, event_list)
+    # -----------------------------------------------
+
+    @property
+    def project_path(self):
+        return self.config['global']['project_path']
+    # -----------------------------------------------
+
+    def _check_inputs(self):
+        paths = self.watcher.poll()
+        if not paths:
+            return
+        filemanager = self.filemanager
+        filemanager.file_status_check(
+            directories=set(os.path.dirname(x) for x in paths),
+            report_missing=False,
+            ready=lambda path: path in paths and os.path.exists(path))
+        if self.follow:
+            self.runmanager.follow_simulation()
+            self.watcher.watch(filemanager.missing_dirs())
+        self.watcher.unwatch(self.watcher.directories - filemanager.missing_dirs())
+        if filemanager.all_data_local():
+            self.watcher.close()
+            self.watcher = None
+            print_line('All input data has landed', self.event_list)
+    # -----------------------------------------------
+
+    def step(self):
+        """
+        Run one pass of the main loop, finalizing the run once its done
+
+        Returns:
+            -1 if the run is still going, 0 if a job failed, 1 if everything completed
+        """
+        if self.status is not None:
+            return self.status
+        runmanager = self.runmanager
+        event_list = self.event_list
+        debug = self.debug
+        if self.filemanager is not None:
+            self.filemanager.activate()
+
+        if self.watcher is not None:
+            self._check_inputs()
+
+        if debug:
+            print_line(' -- checking data -- ', event_list)
+        runmanager.check_data_ready()
+
+        if debug:
+            print_line(' -- starting ready jobs --', event_list)
+        runmanager.start_ready_jobs()
+
+        if debug:
+            print_line(' -- monitoring running jobs --', event_list)
+        runmanager.monitor_running_jobs(debug=debug)
+
+        if runmanager.state_changed:
+            if debug:
+                print_line(' -- writing out state -- ', event_list)
+            self.write_state()
+
+        status = runmanager.is_all_done()
+        if status >= 0:
+            msg = "Finishing up run"
+            print_line(msg, event_list)
+            self.close()
+            finalize(
+                config=self.config,
+                event_list=event_list,
+                status=status,
+                runmanager=runmanager)
+            self.status = status
+        return status
+    # -----------------------------------------------
+
+    def write_state(self):
+        self.runmanager.write_job_sets(self.state_path)
+    # -----------------------------------------------
+
+    def close(self):
+        """
+        Stop watching for input, for a run thats finished or being dropped
+        """
+        if self.watcher is not None:
+            self.watcher.close()
+            self.watcher = None
+    # -----------------------------------------------
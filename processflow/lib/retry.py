@@ -0,0 +1,311 @@
+"""
+Resubmits jobs that fail for reasons a second try can fix. Each failure is put
+in a class from the final slurm state and the end of the jobs console output,
+and the policy for the job type decides whether its retried, how long to wait
+first, and what to change about the job before it goes back in the queue:
+
+    timeout: the walltime is multiplied by walltime_factor, up to max_walltime
+    oom: the job asks for all of its node's memory, or double what it asked for,
+        and once thats been tried its number of workers is halved
+    node_fail: the job is resubmitted as it was
+    cancelled, error: not retried by default
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import io
+import logging
+import os
+import re
+import time
+
+TIMEOUT = 'timeout'
+OOM = 'oom'
+NODE_FAIL = 'node_fail'
+CANCELLED = 'cancelled'
+ERROR = 'error'
+FAILURE_CLASSES = (TIMEOUT, OOM, NODE_FAIL, CANCELLED, ERROR)
+
+# the final slurm state of a job, to the class of failure it always means
+STATE_CLASSES = {
+    'TIMEOUT': TIMEOUT,
+    'DEADLINE': TIMEOUT,
+    'OUT_OF_MEMORY': OOM,
+    'NODE_FAIL': NODE_FAIL,
+    'BOOT_FAIL': NODE_FAIL,
+    'PREEMPTED': NODE_FAIL,
+    'CANCELLED': CANCELLED,
+}
+
+# what slurm and the tools write to the console output for each class, checked in order
+OUTPUT_PATTERNS = (
+    (TIMEOUT, re.compile(r'DUE TO TIME LIMIT|time limit exceeded', re.IGNORECASE)),
+    (OOM, re.compile(
+        r'oom[-_ ]kill|out of memory|exceeded (job )?memory limit|MemoryError|std::bad_alloc',
+        re.IGNORECASE)),
+    (NODE_FAIL, re.compile(r'DUE TO NODE FAIL|NODE_FAIL|node failure|DUE TO PREEMPTION', re.IGNORECASE)),
+    (CANCELLED, re.compile(r'CANCELLED AT .* BY', re.IGNORECASE)),
+)
+# how much of the end of the console output is read
+OUTPUT_TAIL = 64 * 1024
+
+DEFAULT_POLICY = {
+    'max_retries': 2,
+    'backoff': 60.0,
+    'max_backoff': 3600.0,
+    'walltime_factor': 2.0,
+    'max_walltime': '2-00:00:00',
+    'retry_on': [TIMEOUT, OOM, NODE_FAIL],
+}
+# the most retries between every job in the run
+DEFAULT_BUDGET = 20
+
+
+def parse_walltime(walltime):
+    """
+    Turn a slurm time limit into seconds, slurm accepts minutes, minutes:seconds,
+    hours:minutes:seconds, days-hours, days-hours:minutes and days-hours:minutes:seconds
+    """
+    walltime = str(walltime).strip()
+    days = 0
+    if '-' in walltime:
+        day_string, walltime = walltime.split('-', 1)
+        days = int(day_string)
+        parts = [int(x) for x in walltime.split(':')]
+        # after a day count, the first field is always hours
+        parts += [0] * (3 - len(parts))
+        hours, minutes, seconds = parts
+    else:
+        parts = [int(x) for x in walltime.split(':')]
+        if len(parts) == 1:
+            hours, minutes, seconds = 0, parts[0], 0
+        elif len(parts) == 2:
+            hours, minutes, seconds = 0, parts[0], parts[1]
+        else:
+            hours, minutes, seconds = parts
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+# -----------------------------------------------
+
+
+def format_walltime(seconds):
+    """
+    Turn seconds into a days-hours:minutes:seconds slurm time limit
+    """
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return '{}-{:02d}:{:02d}:{:02d}'.format(days, hours, minutes, seconds)
+# -----------------------------------------------
+
+
+def _double_memory(memory):
+    """
+    Double a slurm memory request like 16G or 4000, None if it cant be read
+    """
+    match = re.match(r'^(\d+)([KMGT]?)B?$', str(memory).strip(), re.IGNORECASE)
+    if match is None:
+        return None
+    return '{}{}'.format(int(match.group(1)) * 2, match.group(2).upper())
+# -----------------------------------------------
+
+
+def classify(state, console_output_path=None):
+    """
+    Decide why a job failed
+
+    Parameters:
+        state (str): the jobs final slurm state, None if its unknown
+        console_output_path (str): the jobs console output
+    Returns:
+        one of the FAILURE_CLASSES
+    """
+    if state in STATE_CLASSES:
+        return STATE_CLASSES[state]
+    if console_output_path and os.path.exists(console_output_path):
+        try:
+            with io.open(console_output_path, 'rb') as infile:
+                infile.seek(max(0, os.fstat(infile.fileno()).st_size - OUTPUT_TAIL))
+                tail = infile.read().decode('utf-8', 'replace')
+        except (IOError, OSError) as e:
+            logging.error('unable to read {}: {}'.format(console_output_path, e))
+            tail = ''
+        for failure, pattern in OUTPUT_PATTERNS:
+            if pattern.search(tail):
+                return failure
+    return ERROR
+# -----------------------------------------------
+
+
+class RetryPolicy(object):
+    """
+    How one job type is retried
+
+    Parameters:
+        max_retries (int): the most times a single job is resubmitted
+        backoff (float): seconds to wait before the first retry, doubling with each retry
+        max_backoff (float): the longest to wait before a retry
+        walltime_factor (float): what a timed out jobs walltime is multiplied by
+        max_walltime (str): the longest walltime to ask for
+        retry_on (list): the FAILURE_CLASSES to retry
+    """
+
+    def __init__(self, max_retries, backoff, max_backoff, walltime_factor, max_walltime, retry_on):
+        self.max_retries = int(max_retries)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.walltime_factor = float(walltime_factor)
+        self.max_walltime = parse_walltime(max_walltime) if max_walltime else None
+        if not isinstance(retry_on, list):
+            retry_on = [retry_on]
+        self.retry_on = [x.strip() for x in retry_on if x.strip()]
+        unknown = [x for x in self.retry_on if x not in FAILURE_CLASSES]
+        if unknown:
+            raise ValueError('unknown failure class {}, expected one of {}'.format(
+                ', '.join(unknown), ', '.join(FAILURE_CLASSES)))
+    # -----------------------------------------------
+
+    def delay(self, attempt):
+        """
+        Returns the seconds to wait before the given retry, counting from 1
+        """
+        return min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+    # -----------------------------------------------
+
+
+class Retry(object):
+    """
+    What to do about a failed job
+    """
+    __slots__ = ('failure', 'retry', 'attempt', 'delay', 'reason', 'changes')
+
+    def __init__(self, failure, retry, attempt=0, delay=0, reason=None, changes=None):
+        self.failure = failure
+        self.retry = retry
+        self.attempt = attempt
+        self.delay = delay
+        self.reason = reason
+        self.changes = changes or list()
+    # -----------------------------------------------
+
+
+class RetryEngine(object):
+    """
+    Keeps track of how many times each job has been retried, and when each
+    job waiting on a retry can be submitted again. Policies come from the optional
+    retry section of the config, whose options apply to every job type, with a
+    subsection for any job type that needs its own
+
+    Parameters:
+        config (dict): the global config
+    """
+
+    def __init__(self, config):
+        retry_config = config.get('retry', {})
+        self.config = config
+        self.budget = int(retry_config.get('budget', DEFAULT_BUDGET))
+        self.used = 0
+        base = dict(DEFAULT_POLICY)
+        base.update({key: val for key, val in retry_config.items()
+                     if key in DEFAULT_POLICY})
+        self.default_policy = RetryPolicy(**base)
+        self.policies = dict()
+        for key, val in retry_config.items():
+            if not isinstance(val, dict):
+                continue
+            options = dict(base)
+            options.update({x: y for x, y in val.items() if x in DEFAULT_POLICY})
+            self.policies[key] = RetryPolicy(**options)
+        # job id -> retries so far
+        self._attempts = dict()
+        # job id -> the earliest time it can be resubmitted
+        self._not_before = dict()
+    # -----------------------------------------------
+
+    def policy(self, job_type):
+        return self.policies.get(job_type, self.default_policy)
+    # -----------------------------------------------
+
+    def attempts(self, job):
+        return self._attempts.get(job.id, 0)
+    # -----------------------------------------------
+
+    def ready(self, job):
+        """
+        Returns True unless the job is waiting out the backoff before its next try
+        """
+        not_before = self._not_before.get(job.id)
+        if not_before is None:
+            return True
+        if time.time() < not_before:
+            return False
+        del self._not_before[job.id]
+        return True
+    # -----------------------------------------------
+
+    def failed(self, job, state=None):
+        """
+        Decide whether to retry a failed job, and get it ready to be resubmitted if so
+
+        Parameters:
+            job (Job): the job that failed
+            state (str): its final slurm state, None if its unknown
+        Returns:
+            a Retry
+        """
+        failure = classify(state, job.console_output_path)
+        policy = self.policy(job.job_type)
+        attempt = self.attempts(job) + 1
+        if failure not in policy.retry_on:
+            return Retry(failure, False, reason='{} failures are not retried'.format(failure))
+        if attempt > policy.max_retries:
+            return Retry(failure, False, reason='all {} retries used'.format(policy.max_retries))
+        if self.used >= self.budget:
+            return Retry(failure, False, reason='the run has used all {} of its retries'.format(
+                self.budget))
+
+        changes = list()
+        if failure == TIMEOUT:
+            changes = self._longer_walltime(job, policy)
+            if not changes:
+                return Retry(failure, False, reason='the walltime is already at the maximum')
+        elif failure == OOM:
+            changes = self._less_memory_pressure(job)
+
+        self._attempts[job.id] = attempt
+        self.used += 1
+        delay = policy.delay(attempt)
+        self._not_before[job.id] = time.time() + delay
+        return Retry(failure, True, attempt=attempt, delay=delay, changes=changes)
+    # -----------------------------------------------
+
+    def _longer_walltime(self, job, policy):
+        current = job.get_manager_arg('-t')
+        if current is None:
+            return list()
+        seconds = parse_walltime(current)
+        longer = int(seconds * policy.walltime_factor)
+        if policy.max_walltime is not None:
+            longer = min(longer, policy.max_walltime)
+        if longer <= seconds:
+            return list()
+        walltime = format_walltime(longer)
+        job.set_custom_args({'-t': walltime})
+        return ['walltime {} -> {}'.format(current, walltime)]
+    # -----------------------------------------------
+
+    def _less_memory_pressure(self, job):
+        memory = job.get_manager_arg('--mem')
+        if memory is None:
+            # a memory request of 0 is all the memory on the node
+            job.set_custom_args({'--mem': '0'})
+            return ['memory -> all of the node']
+        if memory.strip() != '0':
+            doubled = _double_memory(memory)
+            if doubled is not None:
+                job.set_custom_args({'--mem': doubled})
+                return ['memory {} -> {}'.format(memory, doubled)]
+        workers = job.workers(self.config)
+        if workers and workers > 1:
+            job.set_workers(max(1, workers // 2))
+            return ['workers {} -> {}'.format(workers, max(1, workers // 2))]
+        return list()
+    # -----------------------------------------------
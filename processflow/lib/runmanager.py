@@ -1,37 +1,76 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
-from time import sleep
+import importlib
+import logging
 
-from processflow.jobs.aprime import Aprime
-from processflow.jobs.timeseries import Timeseries
-from processflow.jobs.amwg import AMWG
-from processflow.jobs.climo import Climo
-from processflow.jobs.cmor import Cmor
-from processflow.jobs.diag import Diag
-from processflow.jobs.e3smdiags import E3SMDiags
-from processflow.jobs.mpasanalysis import MPASAnalysis
-from processflow.jobs.regrid import Regrid
+from time import sleep
 
+from processflow.lib.events import EventType
+from processflow.lib.inputscreen import InputScreen
+from processflow.lib.journal import Journal, replay
 from processflow.lib.jobstatus import JobStatus, StatusMap, ReverseMap
+from processflow.lib.metrics import metrics
+from processflow.lib.retry import RetryEngine
 from processflow.lib.serial import Serial
-from processflow.lib.slurm import Slurm
 from processflow.lib.util import print_line
 
+# outside of live mode, the passes a job is screened on before bad input fails it
+SCREEN_TRIES = 3
+
+
+class JobMap(object):
+    """
+    A mapping of job type names to job classes that only imports a job's
+    module the first time that type is looked up, so a run only pays for
+    the job types its config uses
+    """
+
+    def __init__(self, paths):
+        """
+        Parameters:
+            paths (dict): job type names mapped to 'module:Class' strings
+        """
+        self._paths = paths
+        self._classes = dict()
+    # -----------------------------------------------
+
+    def __getitem__(self, job_type):
+        job_class = self._classes.get(job_type)
+        if job_class is None:
+            module_name, class_name = self._paths[job_type].split(':')
+            module = importlib.import_module(module_name)
+            job_class = getattr(module, class_name)
+            self._classes[job_type] = job_class
+        return job_class
+    # -----------------------------------------------
+
+    def __contains__(self, job_type):
+        return job_type in self._paths
+    # -----------------------------------------------
+
+    def __iter__(self):
+        return iter(self._paths)
+    # -----------------------------------------------
+
+    def keys(self):
+        return list(self._paths.keys())
+    # -----------------------------------------------
 
-job_map = {
-    'climo': Climo,
-    'timeseries': Timeseries,
-    'regrid': Regrid,
-    'e3sm_diags': E3SMDiags,
-    'amwg': AMWG,
-    'aprime': Aprime,
-    'cmor': Cmor,
-    'mpas_analysis': MPASAnalysis
-}
+
+job_map = JobMap({
+    'climo': 'processflow.jobs.climo:Climo',
+    'timeseries': 'processflow.jobs.timeseries:Timeseries',
+    'regrid': 'processflow.jobs.regrid:Regrid',
+    'e3sm_diags': 'processflow.jobs.e3smdiags:E3SMDiags',
+    'amwg': 'processflow.jobs.amwg:AMWG',
+    'aprime': 'processflow.jobs.aprime:Aprime',
+    'cmor': 'processflow.jobs.cmor:Cmor',
+    'mpas_analysis': 'processflow.jobs.mpasanalysis:MPASAnalysis'
+})
 
 
 class RunManager(object):
 
-    def __init__(self, event_list, config, filemanager):
+    def __init__(self, event_list, config, filemanager, manager=None):
 
         self.config = config
         self.account = config['global'].get('account', '')
@@ -39,7 +78,20 @@ class RunManager(object):
         self.filemanager = filemanager
         self.dryrun = True if config['global'].get('dryrun') == True else False
         self.debug = True if config['global'].get('debug') == True else False
+        # when following a running simulation only whole windows of years get jobs
+        self.follow = True if config['global'].get('follow') else False
+        # in live mode bad input can still be replaced, otherwise it fails its jobs
+        self.live = True if config['global'].get('live') or self.follow else False
         self._resource_path = config['global'].get('resource_path')
+        # the history files each job will read are screened before its submitted,
+        # theres nothing to gain from it when nothing is being submitted
+        if config['global'].get('screen_inputs', True) and not self.dryrun \
+                and not config['global'].get('plan_only'):
+            self.input_screen = InputScreen()
+        else:
+            self.input_screen = None
+        # job id -> the passes its inputs have failed screening on
+        self._screen_failures = dict()
         """
         A list of cases, dictionaries structured as:
             case (str): the full case name
@@ -49,15 +101,43 @@ class RunManager(object):
         self.cases = list()
 
         self.running_jobs = list()
+        # a JobBudget shared with the other runs hosted in the same process
+        self.budget = None
+        # failed jobs that a retry could fix are resubmitted, their dependents wait on them
+        self.retry = RetryEngine(config)
+        # jobs a previous run finished, which dont need their output checked again
+        self._journal_completed = set()
+        self._journal_history = dict()
+        self.journal = None
         self._job_total = 0
         self._job_complete = 0
 
-        if config['global'].get('serial'):
+        # data readiness only needs checking once new files have arrived, and
+        # the state file only needs writing once something about a job changed
+        self._files_arrived = True
+        self.state_changed = True
+        if event_list is not None:
+            event_list.subscribe(
+                self._on_file_arrival, [EventType.FILE_ARRIVAL])
+            event_list.subscribe(
+                self._on_job_change,
+                [EventType.JOB_STATE, EventType.SUBMISSION, EventType.FILE_ARRIVAL])
+            metrics.subscribe(event_list)
+        # a process hosting more than one run keeps each run's gauges apart by project
+        project_path = config['global']['project_path']
+        self._metrics_labels = {'project': project_path} if config['global'].get('hosted') else {}
+        self._metrics_key = ('jobs', project_path)
+        metrics.register_collector(self._metrics_key, self._collect_metrics)
+
+        if manager is not None:
+            self.manager = manager
+        elif config['global'].get('serial'):
             msg = '\n\n=== Running in Serial Mode ===\n'
             print_line(msg, event_list)
             self.manager = Serial()
         else:
-            self.manager = Slurm()
+            from processflow.lib.asyncslurm import AsyncSlurm
+            self.manager = AsyncSlurm()
 
         max_jobs = config['global'].get('max_jobs', 1)
         self.max_running_jobs = max_jobs if max_jobs else self.manager.get_node_number()
@@ -68,6 +148,72 @@ class RunManager(object):
             self.max_running_jobs = self.manager.get_node_number()
     # -----------------------------------------------
 
+    def _on_file_arrival(self, event):
+        self._files_arrived = True
+    # -----------------------------------------------
+
+    def _on_job_change(self, event):
+        self.state_changed = True
+    # -----------------------------------------------
+
+    def _collect_metrics(self, registry):
+        """
+        Fill in the count of jobs in each state for each job type
+        """
+        counts = dict()
+        for case in self.cases:
+            for job in case['jobs']:
+                key = (job.status.name, job.job_type)
+                counts[key] = counts.get(key, 0) + 1
+        registry.clear('processflow_jobs', **self._metrics_labels)
+        for (state, job_type), count in counts.items():
+            registry.set('processflow_jobs', count,
+                         state=state, type=job_type, **self._metrics_labels)
+    # -----------------------------------------------
+
+    def unregister_metrics(self):
+        """
+        Stop reporting this run's metrics, once its no longer being hosted
+        """
+        metrics.unregister_collector(self._metrics_key)
+        metrics.clear('processflow_jobs', **self._metrics_labels)
+        if self.event_list is not None:
+            metrics.unsubscribe(self.event_list)
+    # -----------------------------------------------
+
+    def _notify(self, job, event_type, msg):
+        """
+        Push a typed event about the job for any subscribers
+        """
+        if self.event_list is not None:
+            self.event_list.push(
+                '{}: {}'.format(job.msg_prefix(), msg),
+                event_type=event_type,
+                data=job)
+    # -----------------------------------------------
+
+    def _set_status(self, job, status):
+        """
+        Set the jobs status, and let any subscribers know it changed
+        """
+        if job.status == status:
+            return
+        job.status = status
+        self._notify(job, EventType.JOB_STATE, status.name)
+    # -----------------------------------------------
+
+    def _postvalidate(self, job):
+        """
+        Validate the jobs output, through its manifest if it has a current one,
+        letting any subscribers know the outcome
+        """
+        valid = job.validate(
+            self.config, event_list=self.event_list)
+        self._notify(
+            job, EventType.VALIDATION, 'output valid' if valid else 'output invalid')
+        return valid
+    # -----------------------------------------------
+
     def _duplicate_check(self, job):
         """
         iterate over all the jobs and check if the input job is already in the list
@@ -95,7 +241,7 @@ class RunManager(object):
             return False
     # -----------------------------------------------
 
-    def add_pp_type_to_cases(self, freqs, job_type, start, end, case, run_type=None):
+    def add_pp_type_to_cases(self, freqs, job_type, start, end, case, run_type=None, after=None):
         """
         Add post processing jobs to the case.jobs list
 
@@ -106,6 +252,7 @@ class RunManager(object):
             end (int): the last year of simulated data
             data_type (str): what type of data to run this job on (regrid atm or lnd only)
             case (dict): the case to add this job to
+            after (int): only add the jobs whose years end after this year
             """
         if not freqs:
             freqs = end - start + 1
@@ -118,7 +265,11 @@ class RunManager(object):
                 if (year - start) % freq == 0:
                     job_end = year + freq - 1
                     if job_end > end:
+                        if self.follow:
+                            continue
                         job_end = end
+                    if after is not None and job_end <= after:
+                        continue
                     new_job = job_map[job_type](
                         short_name=case['short_name'],
                         case=case['case'],
@@ -132,7 +283,7 @@ class RunManager(object):
                         case['jobs'].append(new_job)
     # -----------------------------------------------
 
-    def add_diag_type_to_cases(self, freqs, job_type, start, end, case):
+    def add_diag_type_to_cases(self, freqs, job_type, start, end, case, after=None):
         """
         Add diagnostic jobs to the case.jobs list
 
@@ -142,6 +293,7 @@ class RunManager(object):
             start (int): the first year of simulated data
             end (int): the last year of simulated data
             case (dict): the case to add this job to
+            after (int): only add the jobs whose years end after this year
         """
 
         if not isinstance(freqs, list):
@@ -166,7 +318,11 @@ class RunManager(object):
                         comparisons = ['obs']
                     job_end = year + freq - 1
                     if job_end > end:
+                        if self.follow:
+                            continue
                         job_end = end
+                    if after is not None and job_end <= after:
+                        continue
                     # for each comparison, add a job to this case
                     for item in comparisons:
                         if item == 'all':
@@ -225,7 +381,18 @@ class RunManager(object):
                 'short_name': self.config['simulations'][case]['short_name'],
                 'jobs': list()
             })
+        self._add_jobs(start, end)
+
+        self._job_total = 0
+        for case in self.cases:
+            self._job_total += len(case['jobs'])
+    # -----------------------------------------------
 
+    def _add_jobs(self, start, end, after=None):
+        """
+        Add the post processing and diagnostic jobs for the years from start to end
+        to each case, only the jobs ending after the after year if its given
+        """
         pp = self.config.get('post-processing')
         if pp:
             for key, val in list(pp.items()):
@@ -247,7 +414,8 @@ class RunManager(object):
                                     start=start,
                                     end=end,
                                     run_type=dtype,
-                                    case=case)
+                                    case=case,
+                                    after=after)
                 else:
                     for case in cases_to_add:
                         self.add_pp_type_to_cases(
@@ -255,7 +423,8 @@ class RunManager(object):
                             job_type=key,
                             start=start,
                             end=end,
-                            case=case)
+                            case=case,
+                            after=after)
         diags = self.config.get('diags')
         if diags:
             for key, val in list(diags.items()):
@@ -269,19 +438,22 @@ class RunManager(object):
                             job_type=key,
                             start=start,
                             end=end,
-                            case=case)
-
-        self._job_total = 0
-        for case in self.cases:
-            self._job_total += len(case['jobs'])
+                            case=case,
+                            after=after)
     # -----------------------------------------------
 
-    def setup_jobs(self):
+    def setup_jobs(self, jobs=None):
         """
         Setup the dependencies for each job in each case
+
+        Parameters:
+            jobs (list): only setup these jobs, every job is setup if not given
         """
+        only = set(id(job) for job in jobs) if jobs is not None else None
         for case in self.cases:
             for job in case['jobs']:
+                if only is not None and id(job) not in only:
+                    continue
                 if job.comparison != 'obs':
                     other_case, = [case for case in self.cases if case['case'] == job.comparison]
                     job.setup_dependencies(
@@ -292,14 +464,137 @@ class RunManager(object):
                         jobs=case['jobs'])
     # -----------------------------------------------
 
+    def resume(self, journal_path):
+        """
+        Replay the journal left by a previous run, then keep it up to date.
+        Jobs it recorded as completed are skipped without checking their output,
+        and jobs it submitted that the resource manager still knows about are
+        monitored again instead of being resubmitted
+
+        Parameters
+        ----------
+            journal_path (str): the path to the journal file
+        Returns
+        -------
+            the number of jobs reattached to the resource manager
+        """
+        history = replay(journal_path)
+        self._journal_history = history
+        jobs = [job for case in self.cases for job in case['jobs']]
+
+        pending = dict()
+        for job in jobs:
+            entry = history.get(job.id)
+            if not entry:
+                continue
+            if entry['status'] == JobStatus.COMPLETED.name:
+                self._journal_completed.add(job.id)
+            elif entry['manager_id'] and entry['status'] in [
+                    JobStatus.PENDING.name, JobStatus.SUBMITTED.name, JobStatus.RUNNING.name]:
+                pending[entry['manager_id']] = job
+
+        # the serial manager's ids dont outlive the process that made them
+        if pending and not isinstance(self.manager, Serial):
+            job_states = self._lookup_jobs(list(pending.keys()))
+            for manager_id, job in pending.items():
+                job_info = job_states.get(manager_id)
+                if job_info is None or isinstance(job_info, Exception) or job_info.state is None:
+                    continue
+                # a job that finished while nothing was watching it is picked back up
+                # as submitted, so the next monitor pass handles it finishing
+                status = StatusMap.get(job_info.state, JobStatus.OTHER)
+                if status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED,
+                              JobStatus.TIMEOUT]:
+                    status = JobStatus.SUBMITTED
+                job.reattach(manager_id, status)
+                self.running_jobs.append({
+                    'manager_id': manager_id,
+                    'job_id': job.id
+                })
+                msg = '{}: reattached to job {}'.format(job.msg_prefix(), manager_id)
+                print_line(msg, self.event_list)
+
+        self.journal = Journal(journal_path)
+        self.journal.add_jobs(jobs, known=history)
+        if self.event_list is not None:
+            self.journal.subscribe(self.event_list)
+        return len(self.running_jobs)
+    # -----------------------------------------------
+
+    def extend(self, end_year):
+        """
+        Move the end of the run out to end_year, adding the jobs for every window
+        of years the new years complete. The jobs already in the run are left as they are
+
+        Parameters
+        ----------
+            end_year (int): the new last year of the run
+        Returns
+        -------
+            the list of new jobs
+        """
+        start = int(self.config['simulations']['start_year'])
+        old_end = int(self.config['simulations']['end_year'])
+        if end_year <= old_end:
+            return list()
+        self.config['simulations']['end_year'] = end_year
+
+        counts = [len(case['jobs']) for case in self.cases]
+        self._add_jobs(start, end_year, after=old_end)
+        new_jobs = list()
+        for case, count in zip(self.cases, counts):
+            new_jobs.extend(case['jobs'][count:])
+        self.setup_jobs(jobs=new_jobs)
+
+        for job in new_jobs:
+            entry = self._journal_history.get(job.id)
+            if entry and entry['status'] == JobStatus.COMPLETED.name:
+                self._journal_completed.add(job.id)
+        if self.journal is not None:
+            self.journal.add_jobs(new_jobs, known=self._journal_history)
+
+        self._job_total += len(new_jobs)
+        self._files_arrived = True
+        self.state_changed = True
+        msg = 'Simulation output is complete through year {}, added {} jobs'.format(
+            end_year, len(new_jobs))
+        print_line(msg, self.event_list)
+        return new_jobs
+    # -----------------------------------------------
+
+    def follow_simulation(self):
+        """
+        Advance the end of the run past every complete year of history that
+        has landed, keeping the file table one year ahead of the run so the
+        next year can be seen arriving
+
+        Returns
+        -------
+            the list of new jobs
+        """
+        until = self.config['global'].get('follow_until')
+        end = int(self.config['simulations']['end_year'])
+        new_end = end
+        while (not until or new_end < until) and self.filemanager.year_complete(new_end + 1):
+            new_end += 1
+            if not until or new_end < until:
+                self.filemanager.add_years(new_end + 1, new_end + 1)
+        return self.extend(new_end)
+    # -----------------------------------------------
+
     def check_data_ready(self):
         """
         Loop over all jobs, checking if their data is ready, and setting
-        the internal job.data_ready variable
+        the internal job.data_ready variable. Nothing can have changed unless
+        new files have arrived since the last check
         """
-        for case in self.cases:
-            for job in case['jobs']:
-                job.check_data_ready(self.filemanager)
+        if not self._files_arrived:
+            return
+        self._files_arrived = False
+        with metrics.timer('processflow_readiness_check_seconds'):
+            for case in self.cases:
+                for job in case['jobs']:
+                    job.check_data_ready(self.filemanager)
     # -----------------------------------------------
 
     def start_ready_jobs(self):
@@ -309,7 +604,10 @@ class RunManager(object):
         """
         for case in self.cases:
             for job in case['jobs']:
-                if job.status != JobStatus.VALID:
+                if job.status not in [JobStatus.VALID, JobStatus.WAITING_ON_INPUT]:
+                    continue
+                # a job being retried waits out its backoff first
+                if not self.retry.ready(job):
                     continue
                 if len(self.running_jobs) >= self.max_running_jobs:
                     msg = 'running {} of {} jobs, waiting for queue to shrink'.format(
@@ -317,6 +615,10 @@ class RunManager(object):
                     if self.debug:
                         print_line(msg, self.event_list)
                     return
+                if self.budget is not None and self.budget.available() <= 0:
+                    if self.debug:
+                        print_line('the shared job budget is used up, waiting for it to free', self.event_list)
+                    return
                 deps_ready = True
                 for depjobid in job.depends_on:
                     depjob = self.get_job_by_id(depjobid)
@@ -325,11 +627,10 @@ class RunManager(object):
                         break
                 if deps_ready and job.data_ready:
 
-                    # if the job was finished by a previous run of the processflow
-
-                    if job.postvalidate(
-                            self.config, event_list=self.event_list):
-                        job.status = JobStatus.COMPLETED
+                    # if the job was finished by a previous run of the processflow,
+                    # the journal saying so isnt enough, its output and config may have changed since
+                    if job.status == JobStatus.VALID and self._postvalidate(job):
+                        self._set_status(job, JobStatus.COMPLETED)
                         self._job_complete += 1
                         job.handle_completion(
                             filemanager=self.filemanager,
@@ -341,8 +642,17 @@ class RunManager(object):
                         print_line(msg, self.event_list)
                         continue
 
+                    if job.id in self._journal_completed:
+                        self._journal_completed.discard(job.id)
+                        msg = '{}: Job was completed by a previous run, but its output is missing or out of date, rerunning'.format(
+                            job.msg_prefix())
+                        print_line(msg, self.event_list)
+
+                    if not self._screen_inputs(job):
+                        continue
+
                     # set to pending before data setup so we dont double submit
-                    job.status = JobStatus.PENDING
+                    self._set_status(job, JobStatus.PENDING)
 
                     # setup the data needed for the job
                     job.setup_data(
@@ -351,26 +661,136 @@ class RunManager(object):
                         case=job.case)
                     # if this job needs data from another case, set that up too
 
-                    if isinstance(job, Diag):
-                        if job.comparison != 'obs':
-                            job.setup_data(
-                                config=self.config,
-                                filemanager=self.filemanager,
-                                case=job.comparison)
+                    if job.comparison != 'obs':
+                        job.setup_data(
+                            config=self.config,
+                            filemanager=self.filemanager,
+                            case=job.comparison)
 
                     run_id = job.execute(
                         config=self.config,
                         dryrun=self.dryrun,
                         event_list=self.event_list)
                     if run_id == 0:
-                        job.status = JobStatus.COMPLETED
+                        self._set_status(job, JobStatus.COMPLETED)
                     else:
+                        self._notify(
+                            job, EventType.SUBMISSION, 'submitted as {}'.format(run_id))
                         self.running_jobs.append({
                             'manager_id': run_id,
                             'job_id': job.id
                         })
     # -----------------------------------------------
 
+    def _screen_inputs(self, job):
+        """
+        Check the headers of the history files the job will read, and that they have
+        any variables the job needs. If any file fails the job is held back as
+        WAITING_ON_INPUT, and screened again on each pass until its files are fixed.
+        Outside of live mode the job fails, along with everything depending on it,
+        once its input has failed SCREEN_TRIES passes
+
+        Parameters
+        ----------
+            job (Job): the job about to be submitted
+        Returns
+        -------
+            True if the jobs inputs passed
+        """
+        if self.input_screen is None:
+            return True
+        required_variables = job.required_variables(self.config)
+        errors = dict()
+        for datatype in job.data_required:
+            datainfo = self.config['data_types'].get(datatype)
+            if not datainfo or datainfo.get('monthly') not in ['True', True]:
+                continue
+            paths = self.filemanager.get_file_paths_by_year(
+                datatype=datatype,
+                case=job.case,
+                start_year=job.start_year,
+                end_year=job.end_year)
+            errors.update(self.input_screen.screen(
+                paths or [], required_variables.get(datatype)))
+        if not errors:
+            self._screen_failures.pop(job.id, None)
+            return True
+        failures = self._screen_failures.get(job.id, 0) + 1
+        self._screen_failures[job.id] = failures
+        if job.status != JobStatus.WAITING_ON_INPUT:
+            msg = '{}: {} input files failed screening, holding the job until they are fixed'.format(
+                job.msg_prefix(), len(errors))
+            print_line(msg, self.event_list)
+            for error in sorted(errors.values()):
+                logging.error('{}: {}'.format(job.msg_prefix(), error))
+            self._set_status(job, JobStatus.WAITING_ON_INPUT)
+        if not self.live and failures >= SCREEN_TRIES:
+            # nothing is going to replace the files, so the job and everything after it fails
+            del self._screen_failures[job.id]
+            msg = '{}: input files failed screening {} times, failing the job'.format(
+                job.msg_prefix(), failures)
+            print_line(msg, self.event_list)
+            self._set_status(job, JobStatus.FAILED)
+            self._job_complete += 1
+            self.report_completed_job()
+            for depjob in self._all_dependents(job):
+                self._set_status(depjob, JobStatus.FAILED)
+        return False
+    # -----------------------------------------------
+
+    def _all_dependents(self, job):
+        """
+        Returns every job that depends on the given job, directly or through other jobs
+        """
+        found = dict()
+        queue = [job]
+        while queue:
+            for depjob in self.get_jobs_that_depend(queue.pop().id):
+                if depjob.id not in found:
+                    found[depjob.id] = depjob
+                    queue.append(depjob)
+        return list(found.values())
+    # -----------------------------------------------
+
+    def plan_jobs(self):
+        """
+        Resolve the inputs, command and run script for every job without
+        linking, writing or submitting anything, the jobs must have been
+        created with plan_only set in the global config
+
+        Returns
+        -------
+            a list with the plan for each job, in the order they would be started
+        """
+        plans = list()
+        for case in self.cases:
+            for job in case['jobs']:
+                error = None
+                try:
+                    job.setup_data(
+                        config=self.config,
+                        filemanager=self.filemanager,
+                        case=job.case)
+                    if job.comparison != 'obs':
+                        job.setup_data(
+                            config=self.config,
+                            filemanager=self.filemanager,
+                            case=job.comparison)
+                    job.execute(
+                        config=self.config,
+                        dryrun=False,
+                        event_list=self.event_list)
+                except Exception as e:
+                    error = repr(e)
+                    msg = '{}: unable to plan job: {}'.format(
+                        job.msg_prefix(), error)
+                    print_line(msg, self.event_list)
+                plan = job.plan()
+                plan['error'] = error
+                plans.append(plan)
+        return plans
+    # -----------------------------------------------
+
     def get_job_by_id(self, jobid):
         for case in self.cases:
             for job in case['jobs']:
@@ -380,6 +800,7 @@ class RunManager(object):
     # -----------------------------------------------
 
     def write_job_sets(self, path):
+        self.state_changed = False
         out_str = ''
         with open(path, 'w') as fp:
             for case in self.cases:
@@ -446,6 +867,8 @@ class RunManager(object):
         Any new jobs that are started are added to the self.running_jobs list
         """
         for_removal = list()
+        job_states = self._lookup_jobs(
+            [x['manager_id'] for x in self.running_jobs if x['manager_id'] != 0])
         for item in self.running_jobs:
             # each item is a mapping of job UUIDs to the id given by the resource manager
             job = self.get_job_by_id(item['job_id'])
@@ -461,25 +884,27 @@ class RunManager(object):
                 self.report_completed_job()
                 continue
             try:
-                job_info = self.manager.showjob(item['manager_id'])
+                job_info = job_states[item['manager_id']]
+                if isinstance(job_info, Exception):
+                    raise job_info
                 if job_info.state is None:
                     continue
             except Exception:
                 # if the job is old enough it wont be in the slurm list anymore
                 # which will throw an exception
-                self._job_complete += 1
                 for_removal.append(item)
 
-                if job.postvalidate(
-                        self.config, event_list=self.event_list):
-                    job.status = JobStatus.COMPLETED
+                if self._postvalidate(job):
+                    self._job_complete += 1
+                    self._set_status(job, JobStatus.COMPLETED)
                     job.handle_completion(
                         filemanager=self.filemanager,
                         event_list=self.event_list,
                         config=self.config)
                     self.report_completed_job()
-                else:
-                    job.status = JobStatus.FAILED
+                elif not self._retry(job, None):
+                    self._job_complete += 1
+                    self._set_status(job, JobStatus.FAILED)
                     line = "{job}: resource manager lookup error for jobid {id}. The job may have failed, check the error output".format(
                         job=job.msg_prefix(),
                         id=item['manager_id'])
@@ -488,7 +913,8 @@ class RunManager(object):
                         event_list=self.event_list)
                 continue
 
-            status = StatusMap[job_info.state]
+            # states with nothing to act on, like SUSPENDED or REQUEUED, are left alone
+            status = StatusMap.get(job_info.state, JobStatus.OTHER)
             if debug:
                 print(str(job_info))
             if status != job.status:
@@ -497,30 +923,87 @@ class RunManager(object):
                     s1=ReverseMap[job.status],
                     s2=ReverseMap[status])
                 print_line(msg, self.event_list)
-                job.status = status
+                self._set_status(job, status)
 
-                if status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
-                    self._job_complete += 1
-
-                    if not job.postvalidate(
-                            self.config, event_list=self.event_list):
-                        job.status = JobStatus.FAILED
+                if status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED,
+                              JobStatus.TIMEOUT]:
+                    for_removal.append(item)
+                    if not self._postvalidate(job):
+                        # a job that finished without its output is classed by its console output
+                        if self._retry(job, None if status == JobStatus.COMPLETED else job_info.state):
+                            continue
+                        self._set_status(job, JobStatus.FAILED)
                     else:
                         job.handle_completion(
                             filemanager=self.filemanager,
                             event_list=self.event_list,
                             config=self.config)
+                    self._job_complete += 1
                     self.report_completed_job()
-                    for_removal.append(item)
-                    if status in [JobStatus.FAILED, JobStatus.CANCELLED]:
+                    if status in [JobStatus.FAILED, JobStatus.CANCELLED, JobStatus.TIMEOUT]:
                         for depjob in self.get_jobs_that_depend(job.id):
-                            depjob.status = JobStatus.FAILED
+                            self._set_status(depjob, JobStatus.FAILED)
         if for_removal:
             self.running_jobs = [
                 x for x in self.running_jobs if x not in for_removal]
         return
     # -----------------------------------------------
 
+    def _retry(self, job, state):
+        """
+        Put a failed job back in line to be resubmitted, if its retry policy allows it
+
+        Parameters
+        ----------
+            job (Job): the job that failed
+            state (str): the jobs final resource manager state, None if its unknown
+        Returns
+        -------
+            True if the job will be retried, False if it has failed for good
+        """
+        retry = self.retry.failed(job, state)
+        if not retry.retry:
+            msg = '{prefix}: {failure} failure, {reason}'.format(
+                prefix=job.msg_prefix(),
+                failure=retry.failure,
+                reason=retry.reason)
+            print_line(msg, self.event_list)
+            return False
+        msg = '{prefix}: {failure} failure, retry {attempt} in {delay:.0f} seconds{changes}'.format(
+            prefix=job.msg_prefix(),
+            failure=retry.failure,
+            attempt=retry.attempt,
+            delay=retry.delay,
+            changes=' with {}'.format(', '.join(retry.changes)) if retry.changes else '')
+        print_line(msg, self.event_list)
+        job.prepare_retry()
+        self._set_status(job, JobStatus.VALID)
+        return True
+    # -----------------------------------------------
+
+    def _lookup_jobs(self, manager_ids):
+        """
+        Get the state of every running job from the resource manager, all at once
+        if the manager supports it
+
+        Parameters
+        ----------
+            manager_ids (list): the resource manager ids of the jobs
+        Returns
+        -------
+            a dict mapping each id to its JobInfo, or to the exception raised while looking it up
+        """
+        if hasattr(self.manager, 'showjobs'):
+            return self.manager.showjobs(manager_ids)
+        job_states = dict()
+        for manager_id in manager_ids:
+            try:
+                job_states[manager_id] = self.manager.showjob(manager_id)
+            except Exception as e:
+                job_states[manager_id] = e
+        return job_states
+    # -----------------------------------------------
+
     def get_jobs_that_depend(self, job_id):
         """
         returns a list of all jobs that depend on the give job
@@ -544,11 +1027,17 @@ class RunManager(object):
         """
         if len(self.running_jobs) > 0:
             return -1
+        # an open ended run keeps waiting for the simulation to write more years
+        if self.follow:
+            until = self.config['global'].get('follow_until')
+            if not until or int(self.config['simulations']['end_year']) < until:
+                return -1
 
         failed = False
         for case in self.cases:
             for job in case['jobs']:
-                if job.status in [JobStatus.VALID, JobStatus.PENDING, JobStatus.RUNNING]:
+                if job.status in [JobStatus.VALID, JobStatus.PENDING, JobStatus.RUNNING,
+                                  JobStatus.WAITING_ON_INPUT]:
                     return -1
                 if job.status in [JobStatus.FAILED, JobStatus.CANCELLED]:
                     failed = True
@@ -0,0 +1,303 @@
+"""
+A discrete event simulation of a processflow run, used to forecast how long a
+campaign will take before anything is submitted
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import heapq
+import math
+import random
+
+from processflow.lib.util import print_line
+
+# median minutes and lognormal sigma for each job type, the post processing
+# types are per simulated year since their cost grows with the length of the job
+DEFAULT_DURATIONS = {
+    'regrid': (2.0, 0.5),
+    'timeseries': (4.0, 0.5),
+    'climo': (3.0, 0.5),
+    'cmor': (6.0, 0.5),
+    'e3sm_diags': (45.0, 0.4),
+    'amwg': (40.0, 0.4),
+    'aprime': (90.0, 0.4),
+    'mpas_analysis': (120.0, 0.4),
+}
+PER_YEAR_TYPES = ['regrid', 'timeseries', 'climo', 'cmor']
+# mean minutes a job spends waiting in the queue before it starts
+DEFAULT_QUEUE_WAIT = 5.0
+# seconds between passes of the main loop, completions are only
+# noticed, and new jobs only submitted, once per pass
+DEFAULT_LOOP_DELAY = 10
+DEFAULT_TRIALS = 20
+
+
+class SimulatedManager(object):
+    """
+    Stands in for the resource manager while the job graph is built,
+    nothing given to it is ever run
+    """
+
+    def __init__(self, nodes=1):
+        self._nodes = nodes
+    # -----------------------------------------------
+
+    def get_node_number(self):
+        return self._nodes
+    # -----------------------------------------------
+
+    def batch(self, cmd, sargs=None):
+        raise Exception('jobs cannot be submitted while simulating a run')
+    # -----------------------------------------------
+
+
+class SimulatedJob(object):
+    """
+    The timeline of a single job in one simulated run, all times in seconds
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.submit = None
+        self.start = None
+        self.finish = None
+        self.noticed = None
+        # the dependency that held this job back, or None if it
+        # was waiting on the running job limit
+        self.gate = None
+    # -----------------------------------------------
+
+
+class SimulationResult(object):
+    """
+    The outcome of a single simulated run
+    """
+
+    def __init__(self, timeline, makespan, slots, blocked):
+        self.timeline = timeline
+        self.makespan = makespan
+        self.slots = slots
+        self.blocked = blocked
+    # -----------------------------------------------
+
+    @property
+    def utilization(self):
+        """
+        The fraction of the available job slots spent running jobs
+        """
+        if not self.makespan:
+            return 0.0
+        busy = sum(x.finish - x.start for x in self.timeline.values())
+        return busy / (self.slots * self.makespan)
+    # -----------------------------------------------
+
+    @property
+    def occupancy(self):
+        """
+        The fraction of the available job slots held by a job, including
+        the time waiting in the queue and waiting for the main loop to notice it finished
+        """
+        if not self.makespan:
+            return 0.0
+        held = sum(x.noticed - x.submit for x in self.timeline.values())
+        return held / (self.slots * self.makespan)
+    # -----------------------------------------------
+
+    def critical_path(self):
+        """
+        Returns the chain of jobs that determined when the run finished,
+        from the first job to the last
+        """
+        if not self.timeline:
+            return list()
+        item = max(self.timeline.values(), key=lambda x: x.noticed)
+        path = [item]
+        while item.gate is not None:
+            item = self.timeline[item.gate]
+            path.append(item)
+        return list(reversed(path))
+    # -----------------------------------------------
+
+
+class Simulation(object):
+    """
+    Replays the job graph from a RunManager against a simulated resource manager
+    """
+
+    def __init__(self, runmanager, config):
+        """
+        Parameters:
+            runmanager (RunManager): a runmanager that has already run setup_cases and setup_jobs
+            config (dict): the global config object, the optional [simulation]
+                section overrides the default durations and queue model
+        """
+        self._runmanager = runmanager
+        sim_config = config.get('simulation', {})
+        self.loop_delay = int(sim_config.get('loop_delay', DEFAULT_LOOP_DELAY))
+        self.queue_wait = float(sim_config.get('queue_wait', DEFAULT_QUEUE_WAIT)) * 60
+        self.trials = int(sim_config.get('trials', DEFAULT_TRIALS))
+        self.seed = int(sim_config.get('seed', 0))
+        self.durations = dict(DEFAULT_DURATIONS)
+        for job_type, value in list(sim_config.get('durations', {}).items()):
+            if not isinstance(value, list):
+                value = [value]
+            median = float(value[0])
+            sigma = float(value[1]) if len(value) > 1 else DEFAULT_DURATIONS.get(job_type, (0, 0.5))[1]
+            self.durations[job_type] = (median, sigma)
+
+        self._jobs = list()
+        for case in runmanager.cases:
+            self._jobs.extend(case['jobs'])
+    # -----------------------------------------------
+
+    def _duration(self, job, rand):
+        median, sigma = self.durations.get(job.job_type, (30.0, 0.5))
+        if job.job_type in PER_YEAR_TYPES:
+            median *= job.end_year - job.start_year + 1
+        return rand.lognormvariate(math.log(median * 60), sigma)
+    # -----------------------------------------------
+
+    def _wait(self, rand):
+        if self.queue_wait <= 0:
+            return 0.0
+        return rand.expovariate(1.0 / self.queue_wait)
+    # -----------------------------------------------
+
+    def _tick(self, seconds):
+        """
+        Returns the time of the first main loop pass at or after seconds
+        """
+        return math.ceil(seconds / self.loop_delay) * self.loop_delay
+    # -----------------------------------------------
+
+    def run_once(self, rand):
+        """
+        Simulate a single run, following the order the RunManager starts jobs in:
+        on each pass of the main loop ready jobs are submitted until the running job
+        limit is hit, then the running jobs are checked for completion
+
+        Parameters:
+            rand (random.Random): the source of the random durations
+        Returns:
+            a SimulationResult
+        """
+        slots = self._runmanager.max_running_jobs
+        known = set(x.id for x in self._jobs)
+        timeline = dict()
+        pending = list()
+        for job in self._jobs:
+            if all(x in known for x in job.depends_on):
+                pending.append(job)
+        blocked = [x for x in self._jobs if x not in pending]
+
+        running = list()
+        done = set()
+        now = 0
+        seq = 0
+        while pending or running:
+            # start phase
+            started = list()
+            for job in pending:
+                if len(running) >= slots:
+                    break
+                if not all(x in done for x in job.depends_on):
+                    continue
+                item = SimulatedJob(job)
+                item.submit = now
+                item.start = now + self._wait(rand)
+                item.finish = item.start + self._duration(job, rand)
+                item.noticed = self._tick(item.finish)
+                if item.noticed <= now:
+                    item.noticed = now + self.loop_delay
+                if job.depends_on:
+                    gate = max(job.depends_on, key=lambda x: timeline[x].noticed)
+                    # if the job went out on the first pass after its last dependency
+                    # finished its the dependency that held it up, otherwise it
+                    # was the running job limit
+                    if timeline[gate].noticed + self.loop_delay >= now:
+                        item.gate = gate
+                timeline[job.id] = item
+                heapq.heappush(running, (item.noticed, seq, job.id))
+                seq += 1
+                started.append(job)
+            pending = [x for x in pending if x not in started]
+
+            if not running:
+                # whats left can never start
+                blocked.extend(pending)
+                break
+
+            # monitor phase, jump ahead to the next pass where a job is seen to finish
+            now = running[0][0]
+            while running and running[0][0] <= now:
+                _, _, job_id = heapq.heappop(running)
+                done.add(job_id)
+            now += self.loop_delay
+
+        makespan = max([x.noticed for x in timeline.values()] or [0])
+        return SimulationResult(timeline, makespan, slots, blocked)
+    # -----------------------------------------------
+
+    def run(self):
+        """
+        Run every trial
+
+        Returns:
+            a list of SimulationResults, sorted by makespan
+        """
+        rand = random.Random(self.seed)
+        results = [self.run_once(rand) for _ in range(max(self.trials, 1))]
+        return sorted(results, key=lambda x: x.makespan)
+    # -----------------------------------------------
+
+
+def _format_time(seconds):
+    seconds = int(seconds)
+    return '{:d}:{:02d}:{:02d}'.format(
+        seconds // 3600, (seconds % 3600) // 60, seconds % 60)
+# -----------------------------------------------
+
+
+def run_simulation(runmanager, config, event_list):
+    """
+    Simulate the run and print a forecast of its makespan,
+    the slot utilization and the critical path
+
+    Parameters:
+        runmanager (RunManager): a runmanager with its cases and jobs setup
+        config (dict): the global config object
+        event_list (EventList): an EventList to push the report into
+    Returns:
+        the list of SimulationResults, sorted by makespan
+    """
+    simulation = Simulation(runmanager, config)
+    results = simulation.run()
+    median = results[len(results) // 2]
+    p90 = results[min(int(len(results) * 0.9), len(results) - 1)]
+
+    lines = [
+        '=== Simulated run: {} jobs, {} at a time, {} trials ==='.format(
+            len(median.timeline) + len(median.blocked),
+            median.slots,
+            len(results)),
+        'makespan: best {best}, median {median}, 90th percentile {p90}'.format(
+            best=_format_time(results[0].makespan),
+            median=_format_time(median.makespan),
+            p90=_format_time(p90.makespan)),
+        'job slot utilization {run:.1%} running, {held:.1%} held including queue wait'.format(
+            run=median.utilization,
+            held=median.occupancy),
+        'critical path of the median run:']
+    for item in median.critical_path():
+        lines.append('    {prefix}: submitted {submit}, started {start}, done {done}{limit}'.format(
+            prefix=item.job.msg_prefix(),
+            submit=_format_time(item.submit),
+            start=_format_time(item.start),
+            done=_format_time(item.noticed),
+            limit=', held back by the running job limit' if item.gate is None and item.submit else ''))
+    for job in median.blocked:
+        lines.append('{}: dependencies can never complete, not scheduled'.format(
+            job.msg_prefix()))
+    lines.append('all input data is assumed to be local and no job is assumed to have been run before')
+    for line in lines:
+        print_line(line, event_list)
+    return results
+# -----------------------------------------------
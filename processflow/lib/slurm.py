@@ -107,6 +107,13 @@ class Slurm(object):
 
         if err:
             raise Exception('SLURM ERROR: ' + err)
+        return self._parse_showjob(out)
+    # -----------------------------------------------
+
+    def _parse_showjob(self, out):
+        """
+        Build a JobInfo from the output of scontrol show job
+        """
         job_info = JobInfo()
         for item in out.split(b'\n'):
             for j in item.split(b' '):
@@ -176,7 +183,13 @@ class Slurm(object):
                 sleep(1)
         if tries == 10:
             raise Exception('SLURM ERROR: Transport endpoint is not connected')
+        return self._parse_queue(out)
+    # -----------------------------------------------
 
+    def _parse_queue(self, out):
+        """
+        Build the list of job dicts from the output of squeue
+        """
         queueinfo = []
         for item in out.split(b'\n')[1:]:
             if not item:
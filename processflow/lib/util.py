@@ -3,11 +3,11 @@ import logging
 import os
 import re
 import sys
+import tempfile
+import threading
 import traceback
 
-from datetime import datetime
-
-import jinja2
+from processflow.lib import logpipe
 
 
 def print_line(line, event_list, ignore_text=False, newline=True):
@@ -20,20 +20,10 @@ def print_line(line, event_list, ignore_text=False, newline=True):
         ignore_text (bool): should this be printed to the console if in text mode
     """
     logging.info(line)
+    if event_list is not None:
+        event_list.push(line)
     if not ignore_text:
-        now = datetime.now()
-        timestr = '{hour}:{min}:{sec}'.format(
-            hour=now.strftime('%H'),
-            min=now.strftime('%M'),
-            sec=now.strftime('%S'))
-        msg = '{time}: {line}'.format(
-            time=timestr,
-            line=line)
-        if newline:
-            print(msg)
-        else:
-            print(msg, end=' ')
-        sys.stdout.flush()
+        logpipe.console.line(line, newline=newline)
 # -----------------------------------------------
 
 
@@ -166,22 +156,108 @@ def print_message(message, status='error'):
 # -----------------------------------------------
 
 
-def render(variables, input_path, output_path):
+def _template_cache_path():
+    cache_home = os.environ.get(
+        'XDG_CACHE_HOME',
+        os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(cache_home, 'processflow', 'jinja')
+# -----------------------------------------------
+
+
+# one jinja2 Environment per template directory, shared by the whole process
+# so each template is only loaded and compiled once
+_template_envs = dict()
+_template_lock = threading.Lock()
+
+
+def get_template_environment(template_dir):
     """
-    Renders the jinja2 template from the input_path into the output_path
-    using the variables from variables
+    Returns the shared jinja2 Environment for templates in template_dir. Compiled
+    templates are also kept in a bytecode cache on disk so later runs skip parsing them
+
+    Parameters:
+        template_dir (str): the directory the templates are loaded from
+    """
+    template_dir = os.path.abspath(template_dir)
+    env = _template_envs.get(template_dir)
+    if env is not None:
+        return env
+    with _template_lock:
+        env = _template_envs.get(template_dir)
+        if env is None:
+            import jinja2
+            bytecode_cache = None
+            cache_path = _template_cache_path()
+            try:
+                if not os.path.exists(cache_path):
+                    os.makedirs(cache_path)
+                bytecode_cache = jinja2.FileSystemBytecodeCache(cache_path)
+            except OSError as e:
+                logging.info('not caching compiled templates: %s', e)
+            env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(searchpath=template_dir),
+                bytecode_cache=bytecode_cache)
+            _template_envs[template_dir] = env
+    return env
+# -----------------------------------------------
+
+
+def render_template(variables, input_path):
+    """
+    Renders the jinja2 template from the input_path using the variables
+    from variables, and returns the result as a string
+    """
+    tail, head = os.path.split(input_path)
+    template = get_template_environment(tail).get_template(head)
+    return template.render(variables)
+# -----------------------------------------------
+
+
+# the permissions a newly opened file would get, temp files are
+# created private so they are set explicitly before the rename
+_umask = os.umask(0)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+
+def atomic_write(path, text):
+    """
+    Write text to path through a temp file in the same directory that is renamed
+    over the target, so the file is never seen partially written
+
+    Parameters:
+        path (str): the file to write
+        text (str): the contents
     """
+    head, tail = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=head, prefix='.{}.'.format(tail))
     try:
-        tail, head = os.path.split(input_path)
+        with os.fdopen(fd, 'w') as outfile:
+            outfile.write(text)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.chmod(temp_path, FILE_MODE)
+        os.rename(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+# -----------------------------------------------
+
 
-        template_path = os.path.abspath(tail)
-        loader = jinja2.FileSystemLoader(searchpath=template_path)
-        env = jinja2.Environment(loader=loader)
-        template = env.get_template(head)
-        outstr = template.render(variables)
+def render(variables, input_path, output_path, prefix=''):
+    """
+    Renders the jinja2 template from the input_path into the output_path
+    using the variables from variables, replacing anything already at output_path
 
-        with open(output_path, 'a+') as outfile:
-            outfile.write(outstr)
+    Parameters:
+        variables (dict): the template variables
+        input_path (str): the path to the template
+        output_path (str): where to write the result
+        prefix (str): text to write ahead of the rendered template
+    """
+    try:
+        atomic_write(output_path, prefix + render_template(variables, input_path))
     except Exception as e:
         return False
     else:
@@ -20,6 +20,26 @@ def verify_config(config):
         if not config['global'].get('project_path'):
             msg = 'no project_path in global options'
             messages.append(msg)
+        if config['global'].get('event_log') in ['True', 'true', '1', True]:
+            config['global']['event_log'] = True
+        else:
+            config['global']['event_log'] = False
+        if config['global'].get('log_format', 'text') not in ['text', 'json']:
+            msg = 'log_format must be either text or json'
+            messages.append(msg)
+        if config['global'].get('input_discovery', 'enumerate') not in ['enumerate', 'scan']:
+            msg = 'input_discovery must be either enumerate or scan'
+            messages.append(msg)
+        if config['global'].get('screen_inputs') in ['False', 'false', '0', False]:
+            config['global']['screen_inputs'] = False
+        else:
+            config['global']['screen_inputs'] = True
+        if config['global'].get('metrics_port'):
+            try:
+                config['global']['metrics_port'] = int(config['global']['metrics_port'])
+            except ValueError:
+                msg = 'metrics_port must be an integer'
+                messages.append(msg)
     if not config.get('data_types'):
         msg = 'No data_types section found in config'
         messages.append(msg)
@@ -112,6 +132,10 @@ def verify_config(config):
         if not config['img_hosting'].get('host_directory'):
             msg = 'image hosting is turned on, but no host_directory specified'
             messages.append(msg)
+        if config['img_hosting'].get('sync_checksum') in ['True', 'true', '1', True]:
+            config['img_hosting']['sync_checksum'] = True
+        else:
+            config['img_hosting']['sync_checksum'] = False
 
     if config.get('post-processing'):
         # ------------------------------------------------------------------------
@@ -119,7 +143,7 @@ def verify_config(config):
         # ------------------------------------------------------------------------
         if config['post-processing'].get('regrid'):
             for item in config['post-processing']['regrid']:
-                if item in ['custom_args']:
+                if item in ['custom_args', 'run_frequency']:
                     continue
                 if item == 'lnd':
                     if not config['post-processing']['regrid'][item].get('source_grid_path'):
@@ -233,6 +257,16 @@ def verify_config(config):
                         msg = 'variable {} is in the cmor variable_list but not present in the timeseries list, all cmor input variables must first be extracted as timeseries varibles'.format(
                             variable)
                         messages.append(msg)
+            for option in ['variable_group_size', 'max_parallel']:
+                value = config['post-processing']['cmor'].get(option)
+                if value is None:
+                    continue
+                try:
+                    config['post-processing']['cmor'][option] = int(value)
+                except ValueError:
+                    msg = 'cmor {} must be an integer, got {}'.format(
+                        option, value)
+                    messages.append(msg)
             for sim in config['post-processing']['cmor']:
                 if sim not in config['simulations']:
                     continue
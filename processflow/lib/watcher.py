@@ -0,0 +1,214 @@
+"""
+Watches the input directories of a live run for newly landed files. On linux
+the directories are watched with inotify, anywhere else, or for any directory
+inotify cant watch, the directories are rescanned on a timer. The rescan runs
+even when inotify is working, since files written from another node of a
+shared filesystem never raise an inotify event on this one. A rescan cant see
+a file being closed, so it only reports files that have stopped changing
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import stat
+import struct
+import sys
+import time
+
+# how often every directory is rescanned, in seconds
+RESCAN_INTERVAL = 60
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# wd, mask, cookie, len, followed by len bytes of name
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def settled(path, age=RESCAN_INTERVAL):
+    """
+    Returns True if the file exists and hasnt been written to in the last age seconds
+    """
+    try:
+        return time.time() - os.stat(path).st_mtime >= age
+    except OSError:
+        return False
+# -----------------------------------------------
+
+
+def _load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+# -----------------------------------------------
+
+
+class InputWatcher(object):
+    """
+    Tells the main loop which files have finished landing in the input directories.
+    Files are only reported once they're closed after writing or moved into
+    place, so a file thats still being copied in isnt picked up half written,
+    a file that shows up as a new symlink is reported right away. The rescan
+    reports files whose size and mtime havent changed since the last rescan,
+    or that havent been written to for longer than the rescan interval
+
+    Parameters:
+        directories (iterable): the directories to watch
+        interval (int): seconds between rescans of every directory
+    """
+
+    def __init__(self, directories, interval=RESCAN_INTERVAL):
+        self.interval = interval
+        self.directories = set()
+        self._last_scan = time.time()
+        self._fd = None
+        # watch descriptor -> directory
+        self._watches = dict()
+        # path -> (size, mtime) of every file seen on the last rescan
+        self._signatures = dict()
+
+        self._libc = _load_inotify()
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                logging.error('unable to start inotify: {}'.format(
+                    os.strerror(ctypes.get_errno())))
+            else:
+                self._fd = fd
+        self.watch(directories)
+    # -----------------------------------------------
+
+    @property
+    def inotify(self):
+        return self._fd is not None
+    # -----------------------------------------------
+
+    def watch(self, directories):
+        """
+        Start watching more directories, directories that dont exist
+        yet are only picked up by the rescan
+        """
+        for directory in directories:
+            self.directories.add(directory)
+            self._add_watch(directory)
+    # -----------------------------------------------
+
+    def unwatch(self, directories):
+        """
+        Stop watching directories that have nothing left to wait for
+        """
+        for directory in directories:
+            self.directories.discard(directory)
+            for wd, path in list(self._watches.items()):
+                if path == directory:
+                    del self._watches[wd]
+                    if self._fd is not None:
+                        self._libc.inotify_rm_watch(self._fd, wd)
+    # -----------------------------------------------
+
+    def _add_watch(self, directory):
+        if self._fd is None or directory in self._watches.values():
+            return
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err != errno.ENOENT:
+                logging.error('unable to watch {}: {}'.format(
+                    directory, os.strerror(err)))
+            return
+        self._watches[wd] = directory
+    # -----------------------------------------------
+
+    def poll(self):
+        """
+        Returns the set of files that have finished landing, this never blocks
+        """
+        ready = set()
+        if self._fd is not None:
+            ready.update(self._read_events())
+        if time.time() - self._last_scan >= self.interval:
+            self._last_scan = time.time()
+            for directory in self.directories:
+                self._add_watch(directory)
+            ready.update(self._rescan())
+        return set(x for x in ready if os.path.dirname(x) in self.directories)
+    # -----------------------------------------------
+
+    def _rescan(self):
+        now = time.time()
+        signatures = dict()
+        ready = set()
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    info = entry.stat()
+                except OSError:
+                    continue
+                if not stat.S_ISREG(info.st_mode):
+                    continue
+                signature = (info.st_size, info.st_mtime_ns)
+                signatures[entry.path] = signature
+                if self._signatures.get(entry.path) == signature \
+                        or now - info.st_mtime >= self.interval:
+                    ready.add(entry.path)
+        self._signatures = signatures
+        return ready
+    # -----------------------------------------------
+
+    def _read_events(self):
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                logging.error('failed to read inotify events: {}'.format(e))
+                break
+            pos = 0
+            while pos + EVENT_HEADER.size <= len(buf):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buf, pos)
+                name = buf[pos + EVENT_HEADER.size:pos + EVENT_HEADER.size + length]
+                pos += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # events were dropped, so rescan now for anything that was missed
+                    self._last_scan = 0
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # the directory was removed, the rescan will watch it again if it comes back
+                    del self._watches[wd]
+                    continue
+                path = os.path.join(directory, os.fsdecode(name.rstrip(b'\0')))
+                if mask & IN_CREATE and not os.path.islink(path):
+                    continue
+                changed.add(path)
+        return changed
+    # -----------------------------------------------
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._watches = dict()
+    # -----------------------------------------------
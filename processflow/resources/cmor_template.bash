@@ -0,0 +1,53 @@
+#!/bin/bash
+# Runs e3sm_to_cmip once per variable group, sizing the number of groups run
+# at once and the processes given to each group from the cpus in this allocation
+
+NPROC=${SLURM_CPUS_ON_NODE:-$(nproc)}
+NUM_GROUPS={{ groups|length }}
+MAX_PARALLEL={{ max_parallel if max_parallel else '$NUM_GROUPS' }}
+if [ "$MAX_PARALLEL" -gt "$NPROC" ]; then
+    MAX_PARALLEL=$NPROC
+fi
+if [ "$MAX_PARALLEL" -gt "$NUM_GROUPS" ]; then
+    MAX_PARALLEL=$NUM_GROUPS
+fi
+PROC_PER_GROUP=$(( NPROC / MAX_PARALLEL ))
+if [ "$PROC_PER_GROUP" -lt 1 ]; then
+    PROC_PER_GROUP=1
+fi
+echo "running $NUM_GROUPS variable groups, $MAX_PARALLEL at a time with $PROC_PER_GROUP processes each"
+
+mkdir -p {{ log_path }}
+FAILED=0
+
+run_group () {
+    rm -f {{ log_path }}/$1.done
+    e3sm_to_cmip \
+        --input {{ input_path }} \
+        --output {{ output_path }} \
+        --var-list "$2" \
+        --user-input {{ user_input }} \
+        --tables {{ tables_path }} \
+        {% if handlers_path %}--handlers {{ handlers_path }} \
+        {% endif %}--num-proc $PROC_PER_GROUP > {{ log_path }}/$1.log 2>&1
+    status=$?
+    if [ $status -ne 0 ]; then
+        echo "variable group $1 failed with exit code $status, see {{ log_path }}/$1.log"
+    else
+        # record the variables this group completed so a rerun can skip them
+        echo "$2" > {{ log_path }}/$1.done
+    fi
+    return $status
+}
+
+{% for name, variables in groups %}
+while [ "$(jobs -rp | wc -l)" -ge "$MAX_PARALLEL" ]; do
+    wait -n || FAILED=1
+done
+run_group {{ name }} "{{ variables|join(' ') }}" &
+{% endfor %}
+
+for pid in $(jobs -p); do
+    wait $pid || FAILED=1
+done
+exit $FAILED
@@ -11,4 +11,5 @@ setup(
     packages=['processflow', 'processflow.jobs', 'processflow.lib'],
     package_dir={'processflow': 'processflow'},
     include_package_data=True,
+    python_requires='>=3.7',
     entry_points={'console_scripts': ['processflow = processflow.__main__:main']})
@@ -0,0 +1,61 @@
+import inspect
+import os
+import stat
+import tarfile
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.archive import extract_tar, tar_member_counts
+from processflow.lib.util import print_message
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        source = os.path.join(self.root, 'case-vs-obs')
+        for setname, count in [('set1', 3), ('set5_6', 2)]:
+            os.makedirs(os.path.join(source, setname))
+            for idx in range(count):
+                path = os.path.join(source, setname, '{}.png'.format(idx))
+                with open(path, 'w') as fp:
+                    fp.write(setname)
+        os.makedirs(os.path.join(source, 'set9'))
+        # a nested directory is one entry of its set, however many files it holds
+        os.makedirs(os.path.join(source, 'set1', 'extra'))
+        for idx in range(2):
+            with open(os.path.join(source, 'set1', 'extra', '{}.png'.format(idx)), 'w') as fp:
+                fp.write('extra')
+        with open(os.path.join(source, 'index.html'), 'w') as fp:
+            fp.write('<html></html>')
+        self.tar_path = source + '.tar'
+        with tarfile.open(self.tar_path, 'w') as archive:
+            archive.add(source, arcname='case-vs-obs')
+        rmtree(source)
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_member_counts(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        counts = tar_member_counts(self.tar_path, prefix='case-vs-obs')
+        self.assertEqual(counts, {'set1': 4, 'set5_6': 2, 'set9': 0})
+        self.assertEqual(tar_member_counts(self.tar_path, prefix='other'), {})
+
+    def test_extract_to_host(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        host = os.path.join(self.root, 'www', 'amwg')
+        written = extract_tar(self.tar_path, host, prefix='case-vs-obs')
+        self.assertEqual(written, 8)
+        self.assertTrue(os.path.exists(os.path.join(host, 'set1', '2.png')))
+        self.assertTrue(os.path.exists(os.path.join(host, 'index.html')))
+        mode = os.stat(os.path.join(host, 'set5_6', '1.png')).st_mode
+        self.assertTrue(mode & stat.S_IROTH and mode & stat.S_IXGRP)
+
+
+if __name__ == '__main__':
+    unittest.main()
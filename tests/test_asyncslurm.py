@@ -0,0 +1,98 @@
+import inspect
+import os
+import stat
+import time
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.asyncslurm import AsyncSlurm
+from processflow.lib.metrics import metrics
+from processflow.lib.util import print_message
+
+FAKE_COMMANDS = {
+    'sinfo': 'exit 0',
+    'sbatch': 'echo "Submitted batch job 1234"',
+    'scontrol': 'sleep 0.5\necho "JobId=$3 JobName=test UserId=me(1) JobState=RUNNING Partition=debug"',
+    'squeue': 'echo "JOBID|NAME|COMMAND|ST"\necho "1234|test|/tmp/run.sh|R"',
+    'scancel': 'if [ "$1" == "99" ]; then echo "invalid job id" >&2; fi',
+}
+
+
+class TestAsyncSlurm(unittest.TestCase):
+
+    def setUp(self):
+        self.bin_path = mkdtemp()
+        for name, body in FAKE_COMMANDS.items():
+            path = os.path.join(self.bin_path, name)
+            with open(path, 'w') as fp:
+                fp.write('#!/bin/bash\n{}\n'.format(body))
+            os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        self.old_path = os.environ['PATH']
+        os.environ['PATH'] = self.bin_path + os.pathsep + self.old_path
+        os.environ.setdefault('USER', 'me')
+        self.slurm = AsyncSlurm(max_concurrent=8, timeout=5, tries=2, backoff=0.01)
+
+    def tearDown(self):
+        self.slurm.close()
+        os.environ['PATH'] = self.old_path
+        rmtree(self.bin_path, ignore_errors=True)
+
+    def test_batch_and_queue(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.assertEqual(self.slurm.batch('/tmp/run.sh'), 1234)
+        queue = self.slurm.queue()
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue[0]['JOBID'], b'1234')
+
+    def test_showjobs_concurrent(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        start = time.time()
+        states = self.slurm.showjobs([1, 2, 3, 4, 5, 6])
+        # each lookup takes half a second, run one at a time they would take three
+        self.assertLess(time.time() - start, 2.5)
+        self.assertEqual(sorted(states.keys()), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(states[3].state, 'RUNNING')
+        self.assertEqual(states[3].jobid, '3')
+
+    def test_showjobs_contended(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        narrow = AsyncSlurm(max_concurrent=2, timeout=5, tries=1, backoff=0.01)
+        try:
+            start = time.time()
+            states = narrow.showjobs([1, 2, 3, 4, 5, 6])
+            # only two lookups run at a time, so the six take three rounds
+            self.assertGreaterEqual(time.time() - start, 1.4)
+            for jobid in range(1, 7):
+                self.assertNotIsInstance(states[jobid], Exception)
+                self.assertEqual(states[jobid].state, 'RUNNING')
+            # and the semaphore still works on the next pass
+            self.assertEqual(narrow.showjobs([7, 8, 9])[9].state, 'RUNNING')
+        finally:
+            narrow.close()
+
+    def test_cancel_and_timeout(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        errors_key = ('processflow_manager_call_errors_total', (('command', 'scancel'),))
+        errors = metrics._values.get(errors_key, 0)
+        self.assertEqual(self.slurm.cancel_jobs([10, 99]), {10: True, 99: False})
+        # both tries of the bad cancel are counted
+        self.assertEqual(metrics._values[errors_key] - errors, 2)
+        self.assertIn('processflow_manager_call_seconds_count{command="scancel"}',
+                      metrics.render())
+
+        slow = AsyncSlurm(timeout=0.1, tries=2, backoff=0.01)
+        try:
+            states = slow.showjobs([1])
+            self.assertIsInstance(states[1], Exception)
+        finally:
+            slow.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,10 @@ import os
 import sys
 import unittest
 
+from shutil import rmtree
+from tempfile import mkdtemp
+from unittest import mock
+
 from configobj import ConfigObj
 
  
@@ -96,5 +100,65 @@ class TestCmor(unittest.TestCase):
             event_list=EventList(),
             config=config))
 
+    def test_cmor_variable_fanout(self):
+        """
+        tests that only the variables without a completion marker are
+        rendered into the run script, in groups of variable_group_size
+        """
+        print_message('\n---- Starting Test: {} ----'.format(
+            inspect.stack()[0][3]), 'ok')
+        project_path = mkdtemp()
+        try:
+            config = ConfigObj(self.valid_config_path)
+            config['global']['project_path'] = project_path
+            config['global']['run_scripts_path'] = project_path
+            config['global']['resource_path'] = os.path.join(
+                os.getcwd(), 'processflow', 'resources')
+            config['post-processing']['cmor']['variable_list'] = [
+                'CLDTOT', 'TREFHT', 'PRECC', 'PRECL', 'TS']
+            config['post-processing']['cmor']['variable_group_size'] = 2
+            case_name = '20180129.DECKv1b_piControl.ne30_oEC.edison'
+            case = config['simulations'][case_name]
+            cmor = Cmor(
+                short_name=case['short_name'],
+                case=case_name,
+                start=1,
+                end=2,
+                config=config)
+            cmor._input_file_paths = [os.path.join(project_path, 'ts', 'CLDTOT_000101_000212.nc')]
+
+            output = os.path.join(cmor._output_path, 'CMIP6', 'clt_Amon_piControl.nc')
+            os.makedirs(os.path.dirname(output))
+            with open(output, 'w') as fp:
+                fp.write('cdf')
+            os.makedirs(cmor._log_path)
+            with open(os.path.join(cmor._log_path, 'CLDTOT-TREFHT.done'), 'w') as fp:
+                fp.write('CLDTOT TREFHT\n')
+
+            self.assertFalse(cmor.postvalidate(config=config))
+            self.assertEqual(
+                cmor._missing_variables(config), ['PRECC', 'PRECL', 'TS'])
+            self.assertEqual(
+                cmor._variable_groups(['PRECC', 'PRECL', 'TS'], 2),
+                [('PRECC-PRECL', ['PRECC', 'PRECL']), ('TS', ['TS'])])
+
+            with mock.patch.object(Cmor, '_submit_cmd_to_manager',
+                                   lambda self, config, cmd, event_list: cmd):
+                cmd = cmor.execute(config=config, event_list=EventList())
+            with open(cmd[-1], 'r') as fp:
+                script = fp.read()
+            self.assertIn('run_group PRECC-PRECL "PRECC PRECL"', script)
+            self.assertIn('run_group TS "TS"', script)
+            self.assertNotIn('TREFHT', script)
+
+            with open(os.path.join(cmor._log_path, 'PRECC-PRECL.done'), 'w') as fp:
+                fp.write('PRECC PRECL\n')
+            with open(os.path.join(cmor._log_path, 'TS.done'), 'w') as fp:
+                fp.write('TS\n')
+            self.assertTrue(cmor.postvalidate(config=config))
+        finally:
+            rmtree(project_path, ignore_errors=True)
+
+
 if __name__ == '__main__':
     unittest.main()
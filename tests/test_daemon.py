@@ -0,0 +1,181 @@
+import inspect
+import os
+import sqlite3
+import threading
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.daemon import Daemon, DirectoryListings, JobBudget, SharedManager, send_request
+from processflow.lib.metrics import metrics
+from processflow.lib.serial import Serial
+from processflow.lib.util import print_message
+from tests.utils import FakeManager, write_run_config
+
+
+class FakeRunManager(object):
+
+    def __init__(self, running):
+        self.running_jobs = [{'manager_id': x, 'job_id': x} for x in range(running)]
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def write_config(self, name):
+        # every project reads the same case data
+        return write_run_config(
+            self.root, name=name, project=name,
+            data_path=os.path.join(self.root, 'data')).filename
+
+    def test_shared_manager(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        fake = FakeManager()
+        manager = SharedManager(fake)
+        self.assertEqual(manager.get_node_number(), 4)
+
+        # one bulk lookup for every run's jobs, each run is answered from it
+        manager.poll([1, 2, 2, 3])
+        self.assertEqual(fake.calls, [[1, 2, 3]])
+        jobs = manager.showjobs([1, 3])
+        self.assertEqual({x: y.jobid for x, y in jobs.items()}, {1: 1, 3: 3})
+        self.assertEqual(manager.showjob(2).jobid, 2)
+        self.assertEqual(len(fake.calls), 1)
+        # jobs submitted since the poll are looked up on their own
+        jobs = manager.showjobs([3, 4])
+        self.assertEqual({x: y.jobid for x, y in jobs.items()}, {3: 3, 4: 4})
+        self.assertEqual(fake.calls[-1], [4])
+        manager.poll([])
+        self.assertEqual(len(fake.calls), 2)
+
+    def test_budget(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        budget = JobBudget(5)
+        first, second = FakeRunManager(2), FakeRunManager(3)
+        budget.register(first)
+        self.assertEqual(budget.available(), 3)
+        budget.register(second)
+        self.assertEqual(budget.available(), 0)
+        budget.unregister(first)
+        self.assertEqual(budget.running(), 3)
+
+    def test_listings(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        listings = DirectoryListings()
+        path = os.path.join(self.root, 'case.cam.h0.0001-01.nc')
+        self.assertFalse(listings.exists(path))
+        self.assertFalse(listings.exists(os.path.join(self.root, 'missing', 'file.nc')))
+
+        # a directory is only looked at again on the next pass
+        open(path, 'w').close()
+        self.assertFalse(listings.exists(path))
+        listings.refresh()
+        self.assertTrue(listings.exists(path))
+
+        # and only listed again once its changed
+        os.utime(self.root, ns=(0, 0))
+        listings.refresh()
+        self.assertTrue(listings.exists(path))
+        listings._listings[self.root] = (0, 2 * 10 ** 9, frozenset())
+        listings.refresh()
+        self.assertFalse(listings.exists(path))
+        os.remove(path)
+        listings.refresh()
+        self.assertFalse(listings.exists(path))
+
+    def test_socket_api(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        socket_path = os.path.join(self.root, 'daemon.sock')
+        daemon = Daemon(
+            socket_path=socket_path,
+            max_jobs=3,
+            manager=Serial(),
+            loop_delay=0.05)
+        thread = threading.Thread(target=daemon.run)
+        thread.start()
+        try:
+            for _ in range(100):
+                if os.path.exists(socket_path):
+                    break
+                thread.join(0.05)
+
+            first = self.write_config('first')
+            second = self.write_config('second')
+            reply = send_request(
+                {'command': 'submit', 'config': first, 'args': ['--live', '--dryrun']},
+                socket_path)
+            self.assertTrue(reply['ok'], reply)
+            self.assertTrue(reply['jobs'] > 0)
+            reply = send_request(
+                {'command': 'submit', 'config': second, 'args': ['--live', '--dryrun']},
+                socket_path)
+            self.assertTrue(reply['ok'], reply)
+
+            reply = send_request(
+                {'command': 'submit', 'config': first, 'args': ['--live']}, socket_path)
+            self.assertFalse(reply['ok'])
+            self.assertIn('already hosted', reply['error'])
+            reply = send_request(
+                {'command': 'submit', 'config': first, 'args': ['--plan']}, socket_path)
+            self.assertFalse(reply['ok'])
+            reply = send_request({'command': 'restart'}, socket_path)
+            self.assertFalse(reply['ok'])
+
+            reply = send_request({'command': 'list'}, socket_path)
+            self.assertTrue(reply['ok'])
+            self.assertEqual(
+                [x['project'] for x in reply['projects']],
+                [os.path.join(self.root, 'first'), os.path.join(self.root, 'second')])
+            self.assertEqual(reply['projects'][0]['state'], 'running')
+            self.assertEqual(reply['budget'], {'limit': 3, 'running': 0})
+
+            # each run keeps its own file database
+            for name in ['first', 'second']:
+                conn = sqlite3.connect(os.path.join(self.root, name, 'output', 'processflow.db'))
+                count, = conn.execute('select count(*) from datafile').fetchone()
+                conn.close()
+                self.assertEqual(count, 72)
+
+            # and its own metrics, collected after each pass, until its removed
+            expected = ['processflow_files_expected{{project="{}"}} 72'.format(
+                os.path.join(self.root, name)) for name in ['first', 'second']]
+            for _ in range(100):
+                text = metrics.render()
+                if all(x in text for x in expected):
+                    break
+                thread.join(0.05)
+            for line in expected:
+                self.assertIn(line, text)
+
+            reply = send_request(
+                {'command': 'remove', 'project': os.path.join(self.root, 'first')},
+                socket_path)
+            self.assertTrue(reply['ok'], reply)
+            reply = send_request({'command': 'list'}, socket_path)
+            self.assertEqual(len(reply['projects']), 1)
+            text = metrics.render()
+            self.assertNotIn(os.path.join(self.root, 'first'), text)
+            self.assertIn(os.path.join(self.root, 'second'), text)
+            reply = send_request(
+                {'command': 'remove', 'project': os.path.join(self.root, 'first')},
+                socket_path)
+            self.assertFalse(reply['ok'])
+        finally:
+            send_request({'command': 'shutdown'}, socket_path)
+            thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(os.path.exists(socket_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from configobj import ConfigObj
+
+from processflow.lib.events import EventList, EventType
+from processflow.lib.filemanager import FileManager, FileStatus
+from processflow.lib.models import DataFile
+from processflow.lib.util import print_message
+
+
+def touch(path):
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    open(path, 'w').close()
+
+
+class TestDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        config = ConfigObj(os.path.join(
+            os.getcwd(), 'tests', 'test_configs', 'runmanager_valid_many_jobs.cfg'))
+        config['global']['project_path'] = os.path.join(self.root, 'project')
+        config['global']['input_discovery'] = 'scan'
+        config['simulations']['end_year'] = '3'
+        self.case = [x for x in config['simulations']
+                     if x not in ['start_year', 'end_year']][0]
+        config['simulations'][self.case]['local_path'] = os.path.join(self.root, 'data')
+        config['simulations'][self.case]['data_types'] = ['atm', 'lnd', 'ocn']
+        # land files with a run specific suffix, found through a pattern
+        config['data_types']['lnd']['file_pattern'] = r'.*\.clm2\.h0\.(?P<year>\d{4})-(?P<month>\d{2})\..*\.nc'
+        # ocean files in a directory per year cant be scanned, and are listed instead
+        config['data_types']['ocn']['local_path'] = 'LOCAL_PATH/ocn'
+        config['data_types']['ocn']['file_format'] = 'YEAR/mpaso.hist.am.timeSeriesStatsMonthly.YEAR-MONTH-01.nc'
+        self.config = config
+
+        self.atm_path = os.path.join(self.root, 'data', 'atmos', 'native', 'model-output', 'mon', 'ens1', 'v1')
+        for year in range(1, 4):
+            for month in range(1, 13):
+                if (year, month) == (2, 5):
+                    continue
+                touch(os.path.join(self.atm_path, '{}.cam.h0.{:04d}-{:02d}.nc'.format(
+                    self.case, year, month)))
+        touch(os.path.join(self.atm_path, '{}.cam.h0.0004-01.nc'.format(self.case)))
+        touch(os.path.join(self.atm_path, '{}.cam.h1.0001-01.nc'.format(self.case)))
+        touch(os.path.join(self.atm_path, 'notes.txt'))
+
+        self.lnd_path = os.path.join(self.root, 'data', 'land', 'native', 'model-output', 'mon', 'ens1', 'v1')
+        for year in range(1, 4):
+            for month in range(1, 13):
+                touch(os.path.join(self.lnd_path, 'run7.clm2.h0.{:04d}-{:02d}.r01.nc'.format(
+                    year, month)))
+
+        self.event_list = EventList()
+        self.filemanager = FileManager(
+            event_list=self.event_list,
+            config=config,
+            database=':memory:')
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_scan(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        arrivals = list()
+        self.event_list.subscribe(arrivals.append, [EventType.FILE_ARRIVAL])
+        self.filemanager.populate_file_list()
+
+        atm = list(DataFile.select().where(
+            DataFile.datatype == 'atm').order_by(DataFile.year, DataFile.month))
+        self.assertEqual(len(atm), 36)
+        missing = [x for x in atm if x.local_status == FileStatus.NOT_PRESENT.value]
+        self.assertEqual([(x.year, x.month) for x in missing], [(2, 5)])
+        self.assertEqual(
+            missing[0].local_path,
+            os.path.join(self.atm_path, '{}.cam.h0.0002-05.nc'.format(self.case)))
+        self.assertEqual(atm[0].local_path, os.path.join(
+            self.atm_path, '{}.cam.h0.0001-01.nc'.format(self.case)))
+
+        lnd = list(DataFile.select().where(DataFile.datatype == 'lnd'))
+        self.assertEqual(len(lnd), 36)
+        self.assertTrue(all(x.local_status == FileStatus.PRESENT.value for x in lnd))
+
+        ocn = list(DataFile.select().where(DataFile.datatype == 'ocn'))
+        self.assertEqual(len(ocn), 36)
+        self.assertTrue(all(x.local_status == FileStatus.NOT_PRESENT.value for x in ocn))
+
+        self.assertEqual(sorted(len(x.data) for x in arrivals), [35, 36])
+        messages = [x.message for x in self.event_list.list]
+        self.assertTrue(any('atm: found 35 files' in x and '1 missing, 1 extra' in x
+                            for x in messages))
+
+        self.assertTrue(self.filemanager.check_data_ready(['atm'], self.case, 1, 1))
+        self.assertFalse(self.filemanager.check_data_ready(['atm'], self.case, 1, 2))
+
+        # the gap is picked up once the file arrives
+        touch(missing[0].local_path)
+        self.filemanager.file_status_check()
+        self.assertTrue(self.filemanager.check_data_ready(['atm'], self.case, 1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import inspect
+import json
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.events import EventList, EventType
+from processflow.lib.initialize import initialize
+from processflow.lib.jobstatus import JobStatus
+from processflow.lib.util import print_line, print_message
+from tests.utils import write_run_config
+
+
+class TestEventBus(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_bounded(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        elist = EventList(maxlen=5)
+        for idx in range(12):
+            elist.push('event {}'.format(idx))
+        self.assertEqual(len(elist.list), 5)
+        self.assertEqual(elist.list[0].message, 'event 7')
+        self.assertEqual(elist.list[0].event_type, EventType.MESSAGE)
+        elist.replace(index=4, message='replaced')
+        self.assertEqual(elist.list[-1].message, 'replaced')
+
+        print_line('printed', elist)
+        self.assertEqual(elist.list[-1].message, 'printed')
+
+    def test_subscribe_and_spill(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        spill_path = os.path.join(self.root, 'events.jsonl')
+        elist = EventList(maxlen=2, spill_path=spill_path)
+        everything = list()
+        arrivals = list()
+        elist.subscribe(everything.append)
+        elist.subscribe(arrivals.append, [EventType.FILE_ARRIVAL])
+
+        def broken(event):
+            raise ValueError('subscriber errors dont stop the push')
+        elist.subscribe(broken)
+
+        elist.push('hello')
+        elist.push('2 new files', event_type=EventType.FILE_ARRIVAL, data=['a', 'b'])
+        elist.push('goodbye')
+        self.assertEqual(len(everything), 3)
+        self.assertEqual([x.data for x in arrivals], [['a', 'b']])
+
+        elist.unsubscribe(everything.append)
+        elist.push('unheard')
+        self.assertEqual(len(everything), 3)
+        elist.close()
+
+        # the spill file keeps every event, not just the last maxlen
+        with open(spill_path, 'r') as fp:
+            lines = [json.loads(x) for x in fp]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1]['type'], 'FILE_ARRIVAL')
+        self.assertEqual(lines[1]['data'], ['a', 'b'])
+
+    def test_runmanager_events(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        config = write_run_config(self.root)
+        elist = EventList()
+        _, runmanager = initialize(
+            argv=[config.filename, '--plan', os.path.join(self.root, 'plan.json')],
+            event_list=elist)
+
+        states = list()
+        elist.subscribe(states.append, [EventType.JOB_STATE])
+        runmanager.state_changed = False
+        job = runmanager.cases[0]['jobs'][0]
+        runmanager._set_status(job, JobStatus.FAILED)
+        runmanager._set_status(job, JobStatus.FAILED)
+        self.assertEqual(len(states), 1)
+        self.assertIs(states[0].data, job)
+        self.assertTrue(runmanager.state_changed)
+        self.assertIn('FAILED', states[0].message)
+
+        # data readiness is only rechecked once new files arrive
+        runmanager.check_data_ready()
+        self.assertFalse(runmanager._files_arrived)
+        elist.push('new files', event_type=EventType.FILE_ARRIVAL, data=[])
+        self.assertTrue(runmanager._files_arrived)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import inspect
+import os
+import unittest
+
+from configobj import ConfigObj
+
+from processflow.lib.events import EventList
+from processflow.lib.filemanager import FileManager
+from processflow.lib.models import DataFile
+from processflow.lib.util import print_message
+
+
+class TestFileStrings(unittest.TestCase):
+
+    def setUp(self):
+        config = ConfigObj(os.path.join(
+            os.getcwd(), 'tests', 'test_configs', 'runmanager_valid_many_jobs.cfg'))
+        config['global']['project_path'] = '/tmp/project'
+        config['global']['plan_only'] = True
+        config['simulations']['end_year'] = '3'
+        self.case = [x for x in config['simulations']
+                     if x not in ['start_year', 'end_year']][0]
+        config['simulations'][self.case]['data_types'] = 'all'
+        config['data_types']['ocn']['file_format'] = 'ocn.{x}.START_YR-END_YR.YEAR-MONTH.nc'
+        config['data_types']['restart'] = {
+            'file_format': 'CASEID.rest.REST_YR.nc',
+            'local_path': 'PROJECT_PATH/input'
+        }
+        config['data_types']['lnd'][self.case] = {
+            'file_format': 'SHORT_NAME.clm2.YEAR.nc',
+            'local_path': 'LOCAL_PATH/lnd'
+        }
+        self.config = config
+        self.filemanager = FileManager(
+            event_list=EventList(),
+            config=config,
+            database=':memory:')
+
+    def test_render_file_string(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        render = self.filemanager.render_file_string
+        self.assertEqual(
+            render('atm', 'file_format', self.case, year=2, month=7),
+            '{}.cam.h0.0002-07.nc'.format(self.case))
+        self.assertEqual(
+            render('atm', 'file_format', self.case),
+            '{}.cam.h0.YEAR-MONTH.nc'.format(self.case))
+        self.assertEqual(
+            render('ocn', 'file_format', self.case, year=1, month=12),
+            'ocn.{x}.0001-0003.0001-12.nc')
+        self.assertEqual(
+            render('restart', 'local_path', self.case), '/tmp/project/input')
+        # case overrides only fill in the simulation keys
+        self.assertEqual(
+            render('lnd', 'file_format', self.case, year=1, month=1),
+            'piControl_testing.clm2.YEAR.nc')
+        self.assertEqual(render('atm', 'not_an_option', self.case), '')
+
+    def test_populate_file_list(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.filemanager.populate_file_list()
+        atm = list(DataFile.select().where(
+            DataFile.datatype == 'atm').order_by(DataFile.id))
+        self.assertEqual(len(atm), 36)
+        self.assertEqual((atm[13].year, atm[13].month), (2, 2))
+        local_path = self.filemanager.render_file_string('atm', 'local_path', self.case)
+        self.assertEqual(
+            atm[13].local_path,
+            os.path.join(local_path, '{}.cam.h0.0002-02.nc'.format(self.case)))
+
+        restart, = DataFile.select().where(DataFile.datatype == 'restart')
+        self.assertEqual(
+            restart.local_path,
+            '/tmp/project/input/{}.rest.0002.nc'.format(self.case))
+        self.assertEqual((restart.year, restart.month), (0, 0))
+
+        self.filemanager.add_files(
+            data_type='climo_regrid',
+            file_list=[{'name': 'a.nc', 'local_path': '/tmp/a.nc', 'case': self.case, 'year': 1}],
+            super_type='derived')
+        added, = DataFile.select().where(DataFile.datatype == 'climo_regrid')
+        self.assertEqual(
+            (added.name, added.super_type, added.year, added.month, added.local_status),
+            ('a.nc', 'derived', 1, 0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
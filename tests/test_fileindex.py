@@ -0,0 +1,119 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from configobj import ConfigObj
+
+from processflow.lib.events import EventList
+from processflow.lib.fileindex import FileIndex
+from processflow.lib.filemanager import FileManager, FileStatus
+from processflow.lib.models import DataFile
+from processflow.lib.util import print_message
+
+
+class TestFileIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        config = ConfigObj(os.path.join(
+            os.getcwd(), 'tests', 'test_configs', 'runmanager_valid_many_jobs.cfg'))
+        config['global']['project_path'] = os.path.join(self.root, 'project')
+        config['simulations']['end_year'] = '3'
+        self.case = [x for x in config['simulations']
+                     if x not in ['start_year', 'end_year']][0]
+        config['simulations'][self.case]['local_path'] = os.path.join(self.root, 'input')
+        config['simulations'][self.case]['data_types'] = ['atm', 'ocn']
+        self.filemanager = FileManager(
+            event_list=EventList(),
+            config=config,
+            database=':memory:')
+        self.filemanager.populate_file_list()
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def _touch(self, datatype, years):
+        paths = self.filemanager.get_file_paths_by_year(
+            datatype=datatype,
+            case=self.case,
+            start_year=min(years),
+            end_year=max(years),
+            present_only=False)
+        for path in paths:
+            with open(path, 'w'):
+                pass
+        return paths
+
+    def test_index_order(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        index = FileIndex()
+        for year in [3, 1, 2, 1]:
+            index.add('case', 'atm', year, 0, 1, 0, 'f{}'.format(year))
+        columns = index.columns('case', 'atm')
+        self.assertEqual(list(columns.years), [1, 1, 2, 3])
+        self.assertEqual(list(columns.ids), [2, 4, 3, 1])
+        self.assertEqual(columns.span(2, 3), (2, 4))
+        self.assertEqual(columns.span(4, 5), (4, 4))
+        self.assertIsNone(index.columns('case', 'lnd'))
+        self.assertEqual(index.count(1), 4)
+        index.set_status(columns, 0, 0)
+        self.assertEqual((index.count(0), index.count(1)), (1, 3))
+
+    def test_readiness(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        filemanager = self.filemanager
+        self.assertFalse(filemanager.all_data_local())
+        self.assertIsNone(filemanager.get_file_paths_by_year('atm', self.case, 1, 2))
+        self.assertEqual(
+            len(filemanager.get_file_paths_by_year('atm', self.case, present_only=False)), 36)
+
+        paths = self._touch('atm', [1, 2])
+        self.assertEqual(len(paths), 24)
+        filemanager.file_status_check()
+        self.assertTrue(filemanager.check_data_ready(['atm'], self.case, 1, 2))
+        self.assertFalse(filemanager.check_data_ready(['atm'], self.case, 2, 3))
+        self.assertFalse(filemanager.check_data_ready(['atm', 'ocn'], self.case, 1, 2))
+        self.assertFalse(filemanager.check_data_ready(['lnd'], self.case, 1, 2))
+        self.assertEqual(filemanager.get_file_paths_by_year('atm', self.case, 1, 3), paths)
+
+        # the database is kept in step with the index
+        present = DataFile.select().where(
+            DataFile.local_status == FileStatus.PRESENT.value)
+        self.assertEqual(sorted(x.local_path for x in present), sorted(paths))
+
+        self._touch('atm', [3])
+        self._touch('ocn', [1, 3])
+        filemanager.file_status_check()
+        self.assertTrue(filemanager.all_data_local())
+        self.assertTrue(filemanager.check_data_ready(['atm', 'ocn'], self.case))
+
+    def test_derived_lookup(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        files = list()
+        for start, end in [(3, 4), (1, 2), (1, 4)]:
+            files.append({
+                'name': 'climo_{}_{}.nc'.format(start, end),
+                'local_path': os.path.join(self.root, 'climo_{}_{}.nc'.format(start, end)),
+                'case': self.case,
+                'year': start,
+                'month': end,
+                'local_status': FileStatus.PRESENT.value
+            })
+        self.filemanager.add_files(
+            data_type='climo_regrid', file_list=files, super_type='derived')
+        paths = self.filemanager.get_file_paths_by_year('climo_regrid', self.case, 1, 2)
+        self.assertEqual(paths, [files[1]['local_path']])
+        self.assertIsNone(
+            self.filemanager.get_file_paths_by_year('climo_regrid', self.case, 2, 3))
+        self.assertEqual(DataFile.select().where(
+            DataFile.datatype == 'climo_regrid').count(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import inspect
+import os
+import time
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.util import print_message
+from tests.utils import write_run_config
+
+
+class TestFollow(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.config = write_run_config(self.root, data_path=os.path.join(self.root, 'data'))
+        self.case = [x for x in self.config['simulations']
+                     if x not in ['start_year', 'end_year']][0]
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def land_year(self, filemanager, year, table_year=None, settled=True):
+        """
+        Write out the monthly files for a year, using the names the file
+        table has for table_year if the year isnt in the table yet. Settled
+        files are dated an hour back, as if they finished landing a while ago
+        """
+        table_year = table_year or year
+        written = time.time() - 3600 if settled else time.time()
+        for _type in ['atm', 'lnd', 'ocn']:
+            for path in filemanager.get_file_paths_by_year(
+                    datatype=_type, case=self.case, start_year=table_year,
+                    end_year=table_year, present_only=False):
+                head, name = os.path.split(path)
+                name = name.replace('{:04d}-'.format(table_year), '{:04d}-'.format(year))
+                open(os.path.join(head, name), 'w').close()
+                os.utime(os.path.join(head, name), (written, written))
+        filemanager.file_status_check(report_missing=False)
+
+    def test_needs_run_frequency(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.config.write()
+        config, runmanager = initialize(
+            argv=[self.config.filename, '--dryrun', '--serial', '--follow'],
+            event_list=EventList())
+        self.assertFalse(config)
+
+        self.config['post-processing']['regrid']['run_frequency'] = '2'
+        self.config.write()
+        config, runmanager = initialize(
+            argv=[self.config.filename, '--dryrun', '--serial', '--follow', '2'],
+            event_list=EventList())
+        self.assertFalse(config)
+
+    def test_follow(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.config['post-processing']['regrid']['run_frequency'] = '2'
+        self.config.write()
+        config, runmanager = initialize(
+            argv=[self.config.filename, '--dryrun', '--serial', '--follow', '6'],
+            event_list=EventList())
+        filemanager = runmanager.filemanager
+        self.assertTrue(config['global']['live'])
+        self.assertEqual(config['global']['follow_until'], 6)
+
+        jobs = list(runmanager.cases[0]['jobs'])
+        self.assertTrue(jobs)
+        self.assertEqual(set((x.start_year, x.end_year) for x in jobs), set([(1, 2)]))
+        # the file table runs a year ahead of the run
+        self.assertFalse(filemanager.year_complete(3))
+        self.assertEqual(len(filemanager.get_file_paths_by_year(
+            datatype='atm', case=self.case, start_year=3, end_year=3, present_only=False)), 12)
+        self.assertEqual(runmanager.follow_simulation(), [])
+
+        # a year that doesnt complete a window moves the end without adding jobs
+        self.land_year(filemanager, 3)
+        self.assertEqual(runmanager.follow_simulation(), [])
+        self.assertEqual(config['simulations']['end_year'], 3)
+        self.assertEqual(runmanager.is_all_done(), -1)
+
+        self.land_year(filemanager, 4)
+        new_jobs = runmanager.follow_simulation()
+        self.assertEqual(config['simulations']['end_year'], 4)
+        self.assertEqual(len(new_jobs), len(jobs))
+        self.assertEqual(set((x.start_year, x.end_year) for x in new_jobs), set([(3, 4)]))
+        self.assertEqual(runmanager.cases[0]['jobs'][:len(jobs)], jobs)
+        for job in new_jobs:
+            for dependency in job.depends_on:
+                self.assertIn(dependency, [x.id for x in new_jobs])
+        self.assertTrue(filemanager.check_data_ready(['atm', 'lnd', 'ocn'], self.case, 3, 4))
+
+        # files the simulation may still be writing arent taken when the table is extended
+        self.land_year(filemanager, 5)
+        self.land_year(filemanager, 6, table_year=5, settled=False)
+        self.assertEqual(runmanager.follow_simulation(), [])
+        self.assertEqual(config['simulations']['end_year'], 5)
+        self.assertFalse(filemanager.year_complete(6))
+
+        # several years landing at once are all taken, up to the last year to follow
+        for year in [6, 7]:
+            self.land_year(filemanager, year, table_year=5)
+        new_jobs = runmanager.follow_simulation()
+        self.assertEqual(config['simulations']['end_year'], 6)
+        self.assertEqual(set((x.start_year, x.end_year) for x in new_jobs), set([(5, 6)]))
+        self.assertIsNone(filemanager.get_file_paths_by_year(
+            datatype='atm', case=self.case, start_year=7, end_year=7, present_only=False))
+        self.assertEqual(runmanager.follow_simulation(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
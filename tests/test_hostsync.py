@@ -0,0 +1,100 @@
+import inspect
+import os
+import stat
+import time
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.hostsync import sync_tree
+from processflow.lib.util import print_message
+
+
+def write(path, text):
+    tail, _ = os.path.split(path)
+    if not os.path.exists(tail):
+        os.makedirs(tail)
+    with open(path, 'w') as fp:
+        fp.write(text)
+
+
+class TestHostSync(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.src = os.path.join(self.root, 'output')
+        self.dst = os.path.join(self.root, 'www', 'case')
+        write(os.path.join(self.src, 'index.html'), 'index')
+        write(os.path.join(self.src, 'set1', 'a.png'), 'a')
+        write(os.path.join(self.src, 'set1', 'b.png'), 'b')
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_first_sync(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        result = sync_tree(self.src, self.dst, workers=2)
+        self.assertEqual(result.copied + result.linked, 3)
+        self.assertEqual(result.skipped, 0)
+        with open(os.path.join(self.dst, 'set1', 'b.png')) as fp:
+            self.assertEqual(fp.read(), 'b')
+        for path in [os.path.join(self.dst, 'set1'), os.path.join(self.dst, 'set1', 'a.png')]:
+            mode = os.stat(path).st_mode
+            self.assertTrue(mode & stat.S_IRGRP and mode & stat.S_IXOTH)
+
+    def test_hardlink_mode(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        private = os.path.join(self.src, 'set1', 'a.png')
+        public = os.path.join(self.src, 'set1', 'b.png')
+        os.chmod(private, 0o600)
+        os.chmod(public, 0o755)
+        result = sync_tree(self.src, self.dst, workers=2)
+
+        # the jobs own output keeps its mode, only the hosted copy is opened up
+        self.assertEqual(stat.S_IMODE(os.stat(private).st_mode), 0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.dst, 'set1', 'a.png')).st_mode), 0o655)
+        self.assertNotEqual(os.stat(private).st_ino,
+                            os.stat(os.path.join(self.dst, 'set1', 'a.png')).st_ino)
+        self.assertEqual(os.stat(public).st_ino,
+                         os.stat(os.path.join(self.dst, 'set1', 'b.png')).st_ino)
+        self.assertEqual(result.linked, 1)
+
+    def test_incremental_sync(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        sync_tree(self.src, self.dst, hardlink=False)
+        stale = os.path.join(self.dst, 'set1', 'old.png')
+        write(stale, 'old')
+        time.sleep(1.1)
+        write(os.path.join(self.src, 'set1', 'a.png'), 'new a')
+        write(os.path.join(self.src, 'set2', 'c.png'), 'c')
+
+        result = sync_tree(self.src, self.dst, hardlink=False, prune=True)
+        self.assertEqual(result.copied, 2)
+        self.assertEqual(result.skipped, 2)
+        self.assertEqual(result.removed, 1)
+        self.assertFalse(os.path.exists(stale))
+        with open(os.path.join(self.dst, 'set1', 'a.png')) as fp:
+            self.assertEqual(fp.read(), 'new a')
+
+    def test_checksum_sync(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        sync_tree(self.src, self.dst, hardlink=False)
+        # same size and mtime, different contents
+        target = os.path.join(self.dst, 'set1', 'a.png')
+        info = os.stat(target)
+        write(target, 'z')
+        os.utime(target, (info.st_atime, info.st_mtime))
+
+        self.assertEqual(sync_tree(self.src, self.dst, hardlink=False).copied, 0)
+        self.assertEqual(sync_tree(self.src, self.dst, hardlink=False, checksum=True).copied, 1)
+        with open(target) as fp:
+            self.assertEqual(fp.read(), 'a')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from unittest import mock
+
+from processflow.lib import inputscreen
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.inputscreen import InputScreen
+from processflow.lib.jobstatus import JobStatus
+from processflow.lib.util import print_message
+from tests.utils import mock_netcdf, write_run_config
+
+VARIABLES = ['FSNTOA', 'FLUT', 'FSNT', 'FLNT', 'FSNS', 'FLNS', 'SHFLX', 'QFLX',
+             'PRECC', 'PRECL', 'PRECSC', 'PRECSL', 'TS', 'TREFHT']
+
+
+class TestInputScreen(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.paths = list()
+        for month in range(1, 13):
+            path = os.path.join(self.root, 'case.cam.h0.0001-{:02d}.nc'.format(month))
+            mock_netcdf(path, variables=VARIABLES)
+            self.paths.append(path)
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_screen(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        screen = InputScreen()
+        self.assertEqual(screen.screen(self.paths, variables=['TS', 'PRECC']), {})
+        self.assertEqual(len(screen), 12)
+
+        errors = screen.screen(self.paths[:2], variables=['TS', 'U'])
+        self.assertEqual(sorted(errors), self.paths[:2])
+        self.assertIn('missing variables U', errors[self.paths[0]])
+
+        # headers are only read again once a file changes
+        with mock.patch.object(inputscreen, 'read_header', side_effect=AssertionError):
+            self.assertEqual(screen.screen(self.paths), {})
+        mock_netcdf(self.paths[3], variables=VARIABLES, time_length=0)
+        with open(self.paths[5], 'r+b') as fp:
+            fp.truncate(100)
+        os.remove(self.paths[7])
+        errors = screen.screen(self.paths)
+        self.assertEqual(sorted(errors), [self.paths[3], self.paths[5], self.paths[7]])
+        self.assertIn('no time steps were written', errors[self.paths[3]])
+
+    def test_runmanager_holds_jobs(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        config = write_run_config(self.root)
+        _, runmanager = initialize(
+            argv=[config.filename, '--plan', os.path.join(self.root, 'plan.json')],
+            event_list=EventList())
+        # planning never screens, so turn it on by hand
+        self.assertIsNone(runmanager.input_screen)
+        runmanager.input_screen = InputScreen()
+
+        jobs = runmanager.cases[0]['jobs']
+        timeseries, = [x for x in jobs if x.job_type == 'timeseries' and x.run_type == 'atm']
+        climo, = [x for x in jobs if x.job_type == 'climo']
+        mock_netcdf(self.paths[0], variables=['TS'])
+
+        with mock.patch.object(runmanager.filemanager, 'get_file_paths_by_year',
+                               return_value=self.paths):
+            # the climo reads whatever is there, the timeseries needs its variables
+            self.assertTrue(runmanager._screen_inputs(climo))
+            self.assertFalse(runmanager._screen_inputs(timeseries))
+            self.assertEqual(timeseries.status, JobStatus.WAITING_ON_INPUT)
+            self.assertEqual(climo.status, JobStatus.VALID)
+            self.assertEqual(runmanager.is_all_done(), -1)
+
+            mock_netcdf(self.paths[0], variables=VARIABLES)
+            self.assertTrue(runmanager._screen_inputs(timeseries))
+
+            # outside of live mode, input that stays bad fails the job and its dependents
+            with open(self.paths[5], 'r+b') as fp:
+                fp.truncate(100)
+            dependents = runmanager.get_jobs_that_depend(climo.id)
+            self.assertTrue(dependents)
+            for _ in range(2):
+                self.assertFalse(runmanager._screen_inputs(climo))
+                self.assertEqual(climo.status, JobStatus.WAITING_ON_INPUT)
+            self.assertFalse(runmanager._screen_inputs(climo))
+            self.assertEqual(climo.status, JobStatus.FAILED)
+            self.assertTrue(all(x.status == JobStatus.FAILED for x in dependents))
+
+            # in live mode the job keeps waiting for the files to be replaced
+            runmanager.live = True
+            for _ in range(5):
+                self.assertFalse(runmanager._screen_inputs(timeseries))
+            self.assertEqual(timeseries.status, JobStatus.WAITING_ON_INPUT)
+
+
+if __name__ == '__main__':
+    unittest.main()
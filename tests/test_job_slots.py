@@ -0,0 +1,67 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.jobs.job import DEFAULT_MANAGER_ARGS
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.runmanager import job_map
+from processflow.lib.util import print_message
+from tests.utils import write_run_config
+
+
+class TestJobSlots(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        config = write_run_config(self.root, end_year=4)
+        config['diags']['e3sm_diags']['custom_args'] = {'-t': '0-02:00'}
+        config.write()
+        _, self.runmanager = initialize(
+            argv=[config.filename, '--plan', os.path.join(self.root, 'plan.json')],
+            event_list=EventList())
+        self.jobs = [job for case in self.runmanager.cases for job in case['jobs']]
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_no_instance_dict(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        for job_type in job_map:
+            for cls in job_map[job_type].__mro__[:-1]:
+                self.assertIn('__slots__', cls.__dict__, cls.__name__)
+        for job in self.jobs:
+            self.assertFalse(hasattr(job, '__dict__'))
+
+    def test_shared_manager_args(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        climos = [x for x in self.jobs if x.job_type == 'climo']
+        diags = [x for x in self.jobs if x.job_type == 'e3sm_diags']
+        self.assertTrue(all(x._manager_args is DEFAULT_MANAGER_ARGS for x in climos))
+        self.assertTrue(all(x._manager_args is diags[0]._manager_args for x in diags))
+        self.assertEqual(diags[0]._manager_args['slurm'], ('-t 0-02:00', '-N 1'))
+        self.assertEqual(DEFAULT_MANAGER_ARGS['slurm'], ('-t 0-01:00', '-N 1'))
+
+        # submitting adds the output path to the script, not to the shared args
+        self.runmanager.plan_jobs()
+        script = list(diags[0]._planned_files.values())[-1]
+        self.assertIn('#SBATCH -o ', script)
+        self.assertEqual(len(diags[0]._manager_args['slurm']), 2)
+
+    def test_msg_prefix(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        diag = [x for x in self.jobs if x.job_type == 'e3sm_diags'][0]
+        prefix = diag.msg_prefix()
+        self.assertTrue(prefix.startswith('e3sm_diags-0001-0002-'))
+        self.assertTrue(prefix.endswith('-vs-obs'))
+        self.assertIs(diag.msg_prefix(), prefix)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from unittest import mock
+
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.jobstatus import JobStatus
+from processflow.lib.journal import Journal, replay
+from processflow.lib.util import print_message
+from tests.utils import FakeManager, write_run_config
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.config_path = write_run_config(self.root).filename
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def setup_runmanager(self, event_list):
+        _, runmanager = initialize(
+            argv=[self.config_path, '--plan', os.path.join(self.root, 'plan.json')],
+            event_list=event_list)
+        return runmanager
+
+    def test_replay(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'journal.jsonl')
+        journal = Journal(path)
+        journal.write('submit', 'abc', manager_id=7)
+        journal.write('state', 'abc', status='RUNNING')
+        journal.write('state', 'abc', status='COMPLETED')
+        journal.write('state', 'def', status='PENDING')
+        journal.close()
+        # a crash part way through a write leaves a partial line
+        with open(path, 'a') as fp:
+            fp.write('{"id": "def", "kind": "sta')
+
+        history = replay(path)
+        self.assertEqual(history['abc'], {'status': 'COMPLETED', 'manager_id': 7})
+        self.assertEqual(history['def'], {'status': 'PENDING', 'manager_id': None})
+        self.assertEqual(replay(os.path.join(self.root, 'missing.jsonl')), {})
+
+    def test_resume(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        first = self.setup_runmanager(EventList())
+        second = self.setup_runmanager(EventList())
+        first_ids = [job.id for case in first.cases for job in case['jobs']]
+        second_ids = [job.id for case in second.cases for job in case['jobs']]
+        # the same config gives the same ids, and every id is unique
+        self.assertEqual(first_ids, second_ids)
+        self.assertEqual(len(set(first_ids)), len(first_ids))
+
+        jobs = second.cases[0]['jobs']
+        done, running, lost = jobs[0], jobs[1], jobs[2]
+        path = os.path.join(self.root, 'journal.jsonl')
+        journal = Journal(path)
+        journal.write('state', done.id, status='COMPLETED')
+        journal.write('submit', running.id, manager_id=101)
+        journal.write('state', running.id, status='PENDING')
+        journal.write('submit', lost.id, manager_id=102)
+        journal.write('state', lost.id, status='PENDING')
+        journal.close()
+
+        event_list = EventList()
+        runmanager = self.setup_runmanager(event_list)
+        # the resource manager still knows about job 101, but has forgotten job 102
+        runmanager.manager = FakeManager(known=[101])
+        self.assertEqual(runmanager.resume(path), 1)
+        self.assertEqual(runmanager.running_jobs, [{'manager_id': 101, 'job_id': running.id}])
+        job = runmanager.get_job_by_id(running.id)
+        self.assertEqual(job.status, JobStatus.RUNNING)
+        self.assertEqual(job.job_id, 101)
+        self.assertEqual(runmanager.get_job_by_id(lost.id).status, JobStatus.VALID)
+        self.assertIn(done.id, runmanager._journal_completed)
+
+        # the journal alone doesnt complete a job, its output is still checked
+        done_job = runmanager.get_job_by_id(done.id)
+        self.assertEqual(done_job.depends_on, [])
+        done_job.data_ready = True
+        runmanager.max_running_jobs = 10
+        with mock.patch.object(type(done_job), 'validate', return_value=False) as validate, \
+                mock.patch.object(runmanager, '_screen_inputs', return_value=False):
+            runmanager.start_ready_jobs()
+        self.assertTrue(validate.called)
+        self.assertEqual(done_job.status, JobStatus.VALID)
+        self.assertNotIn(done.id, runmanager._journal_completed)
+
+        # state changes from here on are added to the journal
+        runmanager._set_status(job, JobStatus.COMPLETED)
+        runmanager.journal.close()
+        history = replay(path)
+        self.assertEqual(history[running.id]['status'], 'COMPLETED')
+        # every job has its identity recorded
+        self.assertEqual(len(history), len(first_ids))
+
+    def test_resume_finished(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        runmanager = self.setup_runmanager(EventList())
+        jobs = runmanager.cases[0]['jobs']
+        finished, failed = jobs[0], jobs[1]
+        path = os.path.join(self.root, 'journal.jsonl')
+        journal = Journal(path)
+        journal.write('submit', finished.id, manager_id=101)
+        journal.write('state', finished.id, status='RUNNING')
+        journal.write('submit', failed.id, manager_id=102)
+        journal.write('state', failed.id, status='RUNNING')
+        journal.close()
+
+        # both jobs finished while nothing was running, they're picked back up as submitted
+        runmanager = self.setup_runmanager(EventList())
+        runmanager.manager = FakeManager(state='COMPLETED')
+        self.assertEqual(runmanager.resume(path), 2)
+        finished = runmanager.get_job_by_id(finished.id)
+        failed = runmanager.get_job_by_id(failed.id)
+        self.assertEqual(finished.status, JobStatus.SUBMITTED)
+
+        # and the next pass handles them finishing like any other job
+        with mock.patch.object(runmanager, '_postvalidate',
+                               side_effect=lambda job: job is finished), \
+                mock.patch.object(type(finished), 'handle_completion') as handle_completion:
+            runmanager.monitor_running_jobs()
+        self.assertEqual(runmanager.running_jobs, [])
+        self.assertEqual(finished.status, JobStatus.COMPLETED)
+        self.assertTrue(handle_completion.called)
+        self.assertEqual(failed.status, JobStatus.FAILED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.linkcheck import check_links, extract_links
+from processflow.lib.util import print_message
+
+
+def write_page(path, body):
+    with open(path, 'w') as fp:
+        fp.write('<html><body>{}</body></html>'.format(body))
+
+
+class TestLinkCheck(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        os.makedirs(os.path.join(self.root, 'set1'))
+        write_page(
+            os.path.join(self.root, 'index.html'),
+            '<a href="set1.htm">set 1</a><a href="set2.htm">set 2</a><a href="notes.txt">notes</a>')
+        write_page(
+            os.path.join(self.root, 'set1.htm'),
+            '<a href="set1/a.png" data-preview="set1/a_thumb.png">a</a><a href="set1/b.png">b</a>')
+        with open(os.path.join(self.root, 'set1', 'a.png'), 'w') as fp:
+            fp.write('png')
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_extract_links(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        links = extract_links(
+            os.path.join(self.root, 'set1.htm'),
+            attrs=('href', 'data-preview'))
+        self.assertEqual(links, ['set1/a.png', 'set1/a_thumb.png', 'set1/b.png'])
+
+    def test_missing_links_report(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        index = os.path.join(self.root, 'index.html')
+        report = check_links(
+            index_path=index,
+            link_filter=['htm'],
+            follow=['htm'],
+            sublink_filter=['png'])
+        self.assertTrue(report.index_found)
+        self.assertFalse(report.ok)
+        self.assertEqual(report.pages_checked, 2)
+        self.assertEqual(report.missing_hrefs(index), set(['set2.htm']))
+        subpage = os.path.join(self.root, 'set1.htm')
+        self.assertEqual(report.missing_hrefs(subpage), set(['set1/b.png']))
+        self.assertEqual(report.num_missing, 2)
+
+    def test_preview_attributes(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        index = os.path.join(self.root, 'index.html')
+        with open(os.path.join(self.root, 'set1', 'a_thumb.png'), 'w') as fp:
+            fp.write('png')
+        report = check_links(
+            index_path=index,
+            link_filter=['set1.htm'],
+            follow=['htm'],
+            sublink_attrs=('data-preview',))
+        self.assertTrue(report.ok)
+
+    def test_parallel_subpages(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        links = ''
+        for idx in range(40):
+            name = 'page{}.html'.format(idx)
+            write_page(
+                os.path.join(self.root, name),
+                '<a data-preview="set1/a.png">ok</a><a data-preview="missing{}.png">no</a>'.format(idx))
+            links += '<a href="{}">{}</a>'.format(name, idx)
+        index = os.path.join(self.root, 'viewer.html')
+        write_page(index, links)
+        report = check_links(
+            index_path=index,
+            follow=['html'],
+            sublink_attrs=('data-preview',),
+            workers=2)
+        self.assertEqual(report.pages_checked, 41)
+        self.assertEqual(report.num_missing, 40)
+
+    def test_missing_index(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        report = check_links(os.path.join(self.root, 'nope.html'))
+        self.assertFalse(report.index_found)
+        self.assertFalse(report.ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
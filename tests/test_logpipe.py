@@ -0,0 +1,143 @@
+import inspect
+import io
+import json
+import logging
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib import logpipe
+from processflow.lib.logpipe import (BatchedFileHandler, ConsoleThrottle,
+                                     start_logging, stop_logging)
+from processflow.lib.util import print_message
+
+
+class TestLogPipe(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        stop_logging()
+        rmtree(self.root, ignore_errors=True)
+
+    def test_console_throttle(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        stream = io.StringIO()
+        console = ConsoleThrottle(lines_per_second=1000, stream=stream)
+        for _ in range(5):
+            console.line('waiting for queue to shrink')
+        console.line('job finished')
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].endswith(': waiting for queue to shrink'))
+        self.assertTrue(lines[1].endswith(': last message repeated 4 more times'))
+        self.assertTrue(lines[2].endswith(': job finished'))
+
+        stream = io.StringIO()
+        console = ConsoleThrottle(lines_per_second=3, stream=stream)
+        console.log_path = 'processflow.log'
+        for idx in range(10):
+            console.line('file {} is not present'.format(idx))
+        console.flush()
+        lines = stream.getvalue().splitlines()
+        # unless the second rolled over part way through
+        if len(lines) == 4:
+            self.assertTrue(lines[-1].endswith(': 7 messages not shown, see processflow.log'))
+        self.assertLess(len(lines), 10)
+
+        # lines finished by the caller are never held back
+        stream = io.StringIO()
+        console = ConsoleThrottle(lines_per_second=1, stream=stream)
+        console.line('job finished')
+        for _ in range(2):
+            console.line('syncing files', newline=False)
+            stream.write('... complete\n')
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith(': syncing files ... complete'))
+        self.assertTrue(lines[2].endswith(': syncing files ... complete'))
+
+    def test_summary_only_when_logging(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        stream = io.StringIO()
+        stream_before, logpipe.console.stream = logpipe.console.stream, stream
+        try:
+            logpipe.console._suppressed = 5
+            # a process that never started logging has nothing to summarize
+            stop_logging()
+            self.assertEqual(stream.getvalue(), '')
+
+            path = os.path.join(self.root, 'processflow.log')
+            start_logging(path)
+            stop_logging()
+            self.assertTrue(stream.getvalue().strip().endswith(
+                '5 messages not shown, see {}'.format(path)))
+            self.assertIsNone(logpipe.console.log_path)
+
+            # the exit hook only closes the log, it doesnt print
+            stream.truncate(0)
+            stream.seek(0)
+            logpipe.console._suppressed = 2
+            start_logging(path)
+            logpipe._close_pipeline()
+            self.assertIsNone(logpipe._pipeline)
+            self.assertEqual(stream.getvalue(), '')
+        finally:
+            logpipe.console.stream = stream_before
+            logpipe.console._suppressed = 0
+
+    def test_batched_file_handler(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'batched.log')
+        handler = BatchedFileHandler(path, mode='w', capacity=3)
+        logger = logging.getLogger('test_logpipe_batched')
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            logger.warning('one')
+            logger.warning('two')
+            self.assertEqual(os.path.getsize(path), 0)
+            logger.warning('three')
+            self.assertEqual(os.path.getsize(path), len('one\ntwo\nthree\n'))
+            logger.error('errors are written right away')
+            with open(path, 'r') as fp:
+                self.assertEqual(len(fp.readlines()), 4)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+
+    def test_json_pipeline(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'processflow.log')
+        start_logging(path, json_format=True)
+        for idx in range(500):
+            logging.info('message %d', idx, extra={'job': 'climo-0001-0002'})
+        logging.debug('not at the logging level')
+        stop_logging()
+        with open(path, 'r') as fp:
+            records = [json.loads(x) for x in fp]
+        self.assertEqual(len(records), 500)
+        self.assertEqual(records[42]['message'], 'message 42')
+        self.assertEqual(records[42]['level'], 'INFO')
+        self.assertEqual(records[42]['job'], 'climo-0001-0002')
+
+        # a new pipeline replaces the old one
+        start_logging(path)
+        start_logging(path)
+        logging.info('only once')
+        stop_logging()
+        with open(path, 'r') as fp:
+            lines = fp.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].strip().endswith(':INFO: only once'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.logscan import LogScanner
+from processflow.lib.util import print_message
+
+
+class TestLogScanner(unittest.TestCase):
+
+    def setUp(self):
+        self.log_dir = mkdtemp()
+        for idx in range(3):
+            with open(os.path.join(self.log_dir, 'task{}.log'.format(idx)), 'w') as fp:
+                fp.write('running task {}\nfinished\n'.format(idx))
+        with open(os.path.join(self.log_dir, 'notes.txt'), 'w') as fp:
+            fp.write('Error in a file that isnt a log\n')
+
+    def tearDown(self):
+        rmtree(self.log_dir, ignore_errors=True)
+
+    def test_clean_logs(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        scanner = LogScanner()
+        self.assertEqual(scanner.count_files(self.log_dir), 4)
+        self.assertIsNone(scanner.find_error(self.log_dir))
+
+    def test_appended_error(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        scanner = LogScanner()
+        self.assertIsNone(scanner.find_error(self.log_dir))
+        path = os.path.join(self.log_dir, 'task1.log')
+        offset = os.path.getsize(path)
+        self.assertEqual(scanner._files[path].offset, offset)
+
+        with open(path, 'a') as fp:
+            fp.write('Traceback\nValueError: bad things\n')
+        result = scanner.find_error(self.log_dir)
+        self.assertEqual(result, (path, 'ValueError: bad things'))
+        # the error is remembered without re-reading the file
+        self.assertEqual(scanner.find_error(self.log_dir), result)
+
+    def test_replaced_log(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        scanner = LogScanner()
+        path = os.path.join(self.log_dir, 'task0.log')
+        with open(path, 'a') as fp:
+            fp.write('Error: first run\n')
+        self.assertIsNotNone(scanner.find_error(self.log_dir))
+        with open(path, 'w') as fp:
+            fp.write('ok\n')
+        self.assertIsNone(scanner.find_error(self.log_dir))
+
+        # rewritten in place at the same size
+        with open(path, 'w') as fp:
+            fp.write('Fine!\n')
+        self.assertIsNone(scanner.find_error(self.log_dir))
+        info = os.stat(path)
+        with open(path, 'w') as fp:
+            fp.write('Error\n')
+        os.utime(path, ns=(info.st_atime_ns, info.st_mtime_ns + 10 ** 9))
+        self.assertEqual(scanner.find_error(self.log_dir), (path, 'Error'))
+
+    def test_no_logs(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        for idx in range(3):
+            os.remove(os.path.join(self.log_dir, 'task{}.log'.format(idx)))
+        self.assertEqual(
+            LogScanner().find_error(self.log_dir), (self.log_dir, 'no .log files found'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import inspect
+import json
+import os
+import time
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from unittest import mock
+
+from processflow.jobs.climo import Climo
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.util import print_message
+from tests.utils import mock_netcdf, write_run_config
+
+CASE = '20180129.DECKv1b_piControl.ne30_oEC.edison'
+
+
+def write_climos(path, start, end):
+    names = ['{:02d}'.format(x) for x in range(1, 13)] + ['ANN', 'DJF', 'MAM', 'JJA', 'SON']
+    for name in names:
+        file_name = 'piControl_{}_{:04d}01_{:04d}12_climo.nc'.format(name, start, end)
+        mock_netcdf(os.path.join(path, file_name))
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        config = write_run_config(self.root)
+        self.config, _ = initialize(
+            argv=[config.filename, '--plan', os.path.join(self.root, 'plan.json')],
+            event_list=EventList())
+        self.config['global']['plan_only'] = False
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def new_climo(self, start, end):
+        return Climo(
+            short_name='piControl',
+            case=CASE,
+            start=start,
+            end=end,
+            config=self.config)
+
+    def test_manifest(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        climo = self.new_climo(1, 2)
+        self.assertFalse(climo.validate(self.config))
+        self.assertFalse(os.path.exists(climo.manifest_path()))
+
+        for path in climo.output_dirs():
+            write_climos(path, 1, 2)
+        self.assertTrue(climo.validate(self.config))
+        with open(climo.manifest_path(), 'r') as fp:
+            manifest = json.load(fp)
+        self.assertEqual(len(manifest['files']), 34)
+        self.assertEqual(sorted(manifest['dirs']), sorted(climo.output_dirs()))
+
+        # a job from a later run trusts the manifest without running postvalidate,
+        # once the manifest is old enough only the directories are looked at
+        manifest['written'] -= 5 * 10 ** 9
+        with open(climo.manifest_path(), 'w') as fp:
+            json.dump(manifest, fp)
+        restarted = self.new_climo(1, 2)
+        with mock.patch.object(Climo, 'postvalidate', side_effect=AssertionError):
+            self.assertTrue(restarted.validate(self.config))
+
+            # another climo of the same length writing into the shared directories
+            # only means this jobs own files are checked
+            time.sleep(0.05)
+            for path in climo.output_dirs():
+                write_climos(path, 3, 4)
+            self.assertTrue(restarted.validate(self.config))
+
+        # new settings for the job type mean the output has to be checked again
+        self.config['post-processing']['climo']['destination_grid_name'] = 'other_grid'
+        with mock.patch.object(Climo, 'postvalidate', return_value=False) as postvalidate:
+            self.assertFalse(self.new_climo(1, 2).validate(self.config))
+            self.assertEqual(postvalidate.call_count, 1)
+        self.assertFalse(os.path.exists(climo.manifest_path()))
+        for path in climo.output_dirs():
+            write_climos(path, 1, 2)
+        self.assertTrue(restarted.validate(self.config))
+
+        # once one of its files is gone, the full validation runs again
+        os.remove(sorted(manifest['files'])[0])
+        self.assertFalse(restarted.validate(self.config))
+        self.assertFalse(os.path.exists(climo.manifest_path()))
+
+    def test_executed_jobs_fully_validate(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        climo = self.new_climo(1, 2)
+        for path in climo.output_dirs():
+            write_climos(path, 1, 2)
+        self.assertTrue(climo.validate(self.config))
+
+        climo._has_been_executed = True
+        with mock.patch.object(Climo, 'postvalidate', return_value=False) as postvalidate:
+            self.assertFalse(climo.validate(self.config))
+            self.assertEqual(postvalidate.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+from urllib.request import urlopen
+
+from processflow.lib.events import EventList, EventType
+from processflow.lib.metrics import Metrics, start_server
+from processflow.lib.util import print_message
+
+
+class FakeJob(object):
+    job_type = 'climo'
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.registry = Metrics()
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_render(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.registry.inc('processflow_manager_call_errors_total', command='sbatch')
+        self.registry.inc('processflow_manager_call_errors_total', command='sbatch')
+        self.registry.set('processflow_jobs', 3, state='RUNNING', type='a "quoted" type')
+        self.registry.observe('processflow_loop_seconds', 0.02)
+        self.registry.observe('processflow_loop_seconds', 2.0)
+        text = self.registry.render()
+
+        self.assertIn('# TYPE processflow_manager_call_errors_total counter', text)
+        self.assertIn('processflow_manager_call_errors_total{command="sbatch"} 2', text)
+        self.assertIn(
+            'processflow_jobs{state="RUNNING",type="a \\"quoted\\" type"} 3', text)
+        self.assertIn('processflow_loop_seconds_bucket{le="0.01"} 0', text)
+        self.assertIn('processflow_loop_seconds_bucket{le="0.05"} 1', text)
+        self.assertIn('processflow_loop_seconds_bucket{le="5"} 2', text)
+        self.assertIn('processflow_loop_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('processflow_loop_seconds_count 2', text)
+        self.assertIn('processflow_submissions_per_minute 0', text)
+        # nothing is rendered for metrics that were never set
+        self.assertNotIn('processflow_files_present', text)
+
+    def test_collectors_and_events(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        files = {'present': 1}
+
+        def collect(registry):
+            registry.set('processflow_files_present', files['present'])
+        self.registry.register_collector('files', collect)
+
+        def broken(registry):
+            raise ValueError('collector errors dont stop the others')
+        self.registry.register_collector('broken', broken)
+
+        files['present'] = 7
+        # the gauges only change when the main loop collects them
+        self.assertNotIn('processflow_files_present', self.registry.render())
+        self.registry.collect()
+        self.assertIn('processflow_files_present 7', self.registry.render())
+
+        elist = EventList()
+        self.registry.subscribe(elist)
+        self.registry.subscribe(elist)
+        elist.push('submitted', event_type=EventType.SUBMISSION, data=FakeJob())
+        elist.push('output invalid', event_type=EventType.VALIDATION, data=FakeJob())
+        elist.push('a plain message')
+        text = self.registry.render()
+        self.assertIn('processflow_submissions_total{type="climo"} 1', text)
+        self.assertIn('processflow_submissions_per_minute 1', text)
+        self.assertIn(
+            'processflow_validations_total{result="invalid",type="climo"} 1', text)
+
+    def test_unregister(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        # two runs in one process each fill in their own labelled gauges
+        for project in ['first', 'second']:
+            def collect(registry, project=project):
+                registry.clear('processflow_jobs', project=project)
+                registry.set('processflow_jobs', 1, state='VALID', project=project)
+            self.registry.register_collector(('jobs', project), collect)
+        self.registry.collect()
+        text = self.registry.render()
+        self.assertIn('processflow_jobs{project="first",state="VALID"} 1', text)
+        self.assertIn('processflow_jobs{project="second",state="VALID"} 1', text)
+
+        # dropping one leaves the other alone
+        self.registry.unregister_collector(('jobs', 'first'))
+        self.registry.clear('processflow_jobs', project='first')
+        self.registry.unregister_collector(('jobs', 'missing'))
+        self.registry.collect()
+        text = self.registry.render()
+        self.assertNotIn('project="first"', text)
+        self.assertIn('processflow_jobs{project="second",state="VALID"} 1', text)
+
+        elist = EventList()
+        self.registry.subscribe(elist)
+        self.registry.unsubscribe(elist)
+        elist.push('submitted', event_type=EventType.SUBMISSION, data=FakeJob())
+        self.assertNotIn('processflow_submissions_total', self.registry.render())
+
+    def test_server_and_file(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.registry.set('processflow_files_expected', 12)
+        server = start_server(0, registry=self.registry)
+        try:
+            url = 'http://127.0.0.1:{}/metrics'.format(server.server_address[1])
+            body = urlopen(url, timeout=5).read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('processflow_files_expected 12', body)
+
+        path = os.path.join(self.root, 'metrics.prom')
+        self.registry.write(path)
+        with open(path, 'r') as fp:
+            self.assertEqual(fp.read(), self.registry.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import inspect
+import os
+import struct
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.ncheader import HDF5_SIGNATURE, HeaderError, check_file, check_files, read_header
+from processflow.lib.util import print_message
+from tests.utils import mock_netcdf
+
+
+class TestNcHeader(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_classic(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'TS_000101_000212.nc')
+        mock_netcdf(path, variables=['TS', 'PRECT'], time_length=24)
+        header = read_header(path)
+        self.assertEqual(header.file_format, 'CDF-1')
+        self.assertEqual(header.dims, {'time': 24, 'lat': 2, 'lon': 3})
+        self.assertEqual(header.variables['TS'], ('time', 'lat', 'lon'))
+        self.assertEqual(header.expected_size, os.path.getsize(path))
+
+        self.assertIsNone(check_file(path, variables=['TS'], time_length=24))
+        self.assertIn('missing variables FSNT', check_file(path, variables=['FSNT']))
+        self.assertIn('expected 12 time steps, found 24', check_file(path, time_length=12))
+
+    def test_damaged_files(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'whole.nc')
+        mock_netcdf(path, time_length=12)
+        with open(path, 'rb') as fp:
+            data = fp.read()
+
+        truncated = os.path.join(self.root, 'truncated.nc')
+        with open(truncated, 'wb') as fp:
+            fp.write(data[:-1])
+        self.assertIn('file is truncated', check_file(truncated))
+
+        short_header = os.path.join(self.root, 'short_header.nc')
+        with open(short_header, 'wb') as fp:
+            fp.write(data[:30])
+        self.assertIn('header is truncated', check_file(short_header))
+
+        empty = os.path.join(self.root, 'empty.nc')
+        open(empty, 'w').close()
+        self.assertIn('file is empty', check_file(empty))
+        with self.assertRaises(HeaderError):
+            read_header(empty)
+
+        text = os.path.join(self.root, 'text.nc')
+        with open(text, 'w') as fp:
+            fp.write('not netcdf')
+        self.assertIn('not a netCDF file', check_file(text))
+
+        errors = check_files([path, truncated, empty, text])
+        self.assertEqual(sorted(errors), sorted([truncated, empty, text]))
+
+    def test_hdf5(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'netcdf4.nc')
+        # a version 2 superblock with 8 byte offsets, recording a 4096 byte file
+        superblock = HDF5_SIGNATURE + struct.pack('<BBBB', 2, 8, 8, 0)
+        superblock += struct.pack('<QQQQ', 0, 0xFFFFFFFFFFFFFFFF, 4096, 48) + b'\x00' * 4
+        with open(path, 'wb') as fp:
+            fp.write(superblock + b'\x00' * (4096 - len(superblock)))
+        header = read_header(path)
+        self.assertEqual(header.file_format, 'HDF5')
+        self.assertEqual(header.expected_size, 4096)
+        # variables cant be checked without reading past the superblock
+        self.assertIsNone(check_file(path, variables=['TS'], time_length=12))
+
+        with open(path, 'r+b') as fp:
+            fp.truncate(2048)
+        self.assertIn('file is truncated, 2048 of 4096 bytes', check_file(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
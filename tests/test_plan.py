@@ -0,0 +1,76 @@
+import inspect
+import json
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.plan import write_plan
+from processflow.lib.util import print_message
+from tests.utils import write_run_config
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.project_path = os.path.join(self.root, 'project')
+        config = write_run_config(self.root, end_year=4)
+        del config['diags']['amwg']
+        config.write()
+        self.config_path = config.filename
+        self.manifest_path = os.path.join(self.root, 'plan.json')
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def _plan(self, write_scripts=False):
+        event_list = EventList()
+        config, runmanager = initialize(
+            argv=[self.config_path, '--plan', self.manifest_path],
+            event_list=event_list)
+        return write_plan(
+            runmanager=runmanager,
+            config=config,
+            manifest_path=self.manifest_path,
+            event_list=event_list,
+            write_scripts=write_scripts)
+
+    def test_plan_touches_nothing(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self._plan()
+        self.assertFalse(os.path.exists(self.project_path))
+
+        with open(self.manifest_path, 'r') as infile:
+            manifest = json.load(infile)
+        jobs = manifest['jobs']
+        self.assertTrue(jobs)
+        self.assertFalse([x for x in jobs if x['error']])
+
+        climo, = [x for x in jobs if x['job_type'] == 'climo' and x['start_year'] == 1]
+        self.assertEqual(len(climo['inputs']['atm']), 24)
+        self.assertTrue(climo['command'].startswith('ncclimo'))
+
+        diag, = [x for x in jobs if x['job_type'] == 'e3sm_diags' and x['start_year'] == 1]
+        self.assertEqual(diag['depends_on'], [climo['id']])
+        self.assertEqual(diag['inputs'], {'climo_regrid': 'from dependencies'})
+        self.assertEqual(len(diag['files']), 2)
+
+    def test_plan_write_scripts(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        manifest = self._plan(write_scripts=True)
+        for job in manifest['jobs']:
+            for path in job['files']:
+                self.assertTrue(os.path.exists(path))
+        # only the scripts are written, no temp or output directories
+        self.assertEqual(
+            os.listdir(os.path.join(self.project_path, 'output')), ['scripts'])
+
+
+if __name__ == '__main__':
+    unittest.main()
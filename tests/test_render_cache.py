@@ -0,0 +1,64 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib import util
+from processflow.lib.util import atomic_write, get_template_environment, print_message, render
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.template_dir = os.path.join(self.root, 'templates')
+        os.makedirs(self.template_dir)
+        self.template = os.path.join(self.template_dir, 'run.bash')
+        with open(self.template, 'w') as fp:
+            fp.write('{{ cmd }}\n')
+        self.old_cache = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.root, 'cache')
+        util._template_envs.clear()
+
+    def tearDown(self):
+        if self.old_cache is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.old_cache
+        util._template_envs.clear()
+        rmtree(self.root, ignore_errors=True)
+
+    def test_shared_environment(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        env = get_template_environment(self.template_dir)
+        self.assertIs(env, get_template_environment(self.template_dir + os.sep))
+
+        output = os.path.join(self.root, 'out.bash')
+        self.assertTrue(render({'cmd': 'ls'}, self.template, output))
+        cache_dir = os.path.join(self.root, 'cache', 'processflow', 'jinja')
+        self.assertTrue(os.listdir(cache_dir))
+
+        # a new process would load the compiled template from the bytecode cache
+        util._template_envs.clear()
+        self.assertTrue(render({'cmd': 'pwd'}, self.template, output, prefix='#!/bin/bash\n'))
+        with open(output, 'r') as fp:
+            self.assertEqual(fp.read(), '#!/bin/bash\npwd')
+
+    def test_atomic_write(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        path = os.path.join(self.root, 'script')
+        atomic_write(path, 'first')
+        atomic_write(path, 'second')
+        with open(path, 'r') as fp:
+            self.assertEqual(fp.read(), 'second')
+        self.assertEqual(os.stat(path).st_mode & 0o777, util.FILE_MODE)
+        self.assertEqual(sorted(os.listdir(self.root)), ['script', 'templates'])
+        self.assertFalse(render({}, self.template, os.path.join(self.root, 'missing', 'out')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.jobstatus import JobStatus
+from processflow.lib.retry import (RetryEngine, classify, format_walltime, parse_walltime,
+                                   NODE_FAIL, OOM, TIMEOUT, ERROR)
+from processflow.lib.util import print_message
+from tests.utils import FakeManager, write_run_config
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        config = write_run_config(self.root, data_path=os.path.join(self.root, 'data'))
+        config['retry'] = {'backoff': '0', 'e3sm_diags': {'max_retries': '1'}}
+        config.write()
+        self.config_path = config.filename
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def write_output(self, text):
+        path = os.path.join(self.root, 'job.out')
+        with open(path, 'w') as outfile:
+            outfile.write(text)
+        return path
+
+    def test_classify(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.assertEqual(classify('TIMEOUT'), TIMEOUT)
+        self.assertEqual(classify('OUT_OF_MEMORY'), OOM)
+        self.assertEqual(classify('NODE_FAIL'), NODE_FAIL)
+        self.assertEqual(classify('FAILED'), ERROR)
+        self.assertEqual(classify('FAILED', os.path.join(self.root, 'missing.out')), ERROR)
+
+        # a plain FAILED state is classed by the end of the console output
+        path = self.write_output(
+            'starting\nslurmstepd: error: Detected 1 oom-kill event(s) in step 1.batch\n')
+        self.assertEqual(classify('FAILED', path), OOM)
+        path = self.write_output(
+            'slurmstepd: error: *** JOB 12 ON nid0001 CANCELLED AT 2018-01-01 DUE TO TIME LIMIT ***\n')
+        self.assertEqual(classify(None, path), TIMEOUT)
+        path = self.write_output('Traceback\nMemoryError\n')
+        self.assertEqual(classify(None, path), OOM)
+        path = self.write_output('Traceback\nKeyError: TS\n')
+        self.assertEqual(classify(None, path), ERROR)
+
+    def test_walltime(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        self.assertEqual(parse_walltime('30'), 1800)
+        self.assertEqual(parse_walltime('30:15'), 1815)
+        self.assertEqual(parse_walltime('02:00:00'), 7200)
+        self.assertEqual(parse_walltime('1-02'), 93600)
+        self.assertEqual(parse_walltime('0-01:00'), 3600)
+        self.assertEqual(parse_walltime('1-00:00:30'), 86430)
+        self.assertEqual(format_walltime(93630), '1-02:00:30')
+
+    def test_policy(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        engine = RetryEngine({'retry': {
+            'budget': '3',
+            'backoff': '10',
+            'max_backoff': '30',
+            'retry_on': 'timeout',
+            'climo': {'retry_on': ['timeout', 'oom'], 'max_retries': '5'}}})
+        self.assertEqual(engine.default_policy.retry_on, ['timeout'])
+        self.assertEqual(engine.policy('climo').max_retries, 5)
+        self.assertEqual(engine.policy('climo').backoff, 10)
+        self.assertEqual(
+            [engine.policy('timeseries').delay(x) for x in range(1, 5)], [10, 20, 30, 30])
+        with self.assertRaises(ValueError):
+            RetryEngine({'retry': {'retry_on': 'timeout, sunspots'.split(', ')}})
+
+    def test_adjustments(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        config, runmanager = initialize(
+            argv=[self.config_path, '--serial', '--live'],
+            event_list=EventList())
+        self.assertTrue(config)
+        config['retry'] = {'max_retries': '10', 'budget': '6', 'max_walltime': '0-03:00:00'}
+        engine = RetryEngine(config)
+        jobs = [job for case in runmanager.cases for job in case['jobs']]
+
+        # timeouts double the walltime until it hits the maximum
+        job = [x for x in jobs if x.job_type == 'climo'][0]
+        self.assertEqual(job.get_manager_arg('-t'), '0-01:00')
+        retry = engine.failed(job, 'TIMEOUT')
+        self.assertTrue(retry.retry)
+        self.assertEqual(retry.attempt, 1)
+        self.assertEqual(job.get_manager_arg('-t'), '0-02:00:00')
+        self.assertEqual(job.get_manager_arg('-N'), '1')
+        self.assertFalse(engine.ready(job))
+
+        # the next try sets the job up from scratch, its inputs arent added twice
+        job._input_file_paths.append(os.path.join(self.root, 'input.nc'))
+        job._console_output_path = os.path.join(self.root, 'job.out')
+        job._job_id = 101
+        job.prepare_retry()
+        self.assertEqual(job._input_file_paths, [])
+        self.assertIsNone(job.console_output_path)
+        self.assertEqual(job.job_id, 0)
+
+        engine.failed(job, 'TIMEOUT')
+        self.assertEqual(job.get_manager_arg('-t'), '0-03:00:00')
+        retry = engine.failed(job, 'TIMEOUT')
+        self.assertFalse(retry.retry)
+        self.assertIn('maximum', retry.reason)
+
+        # running out of memory asks for the whole node, then fewer workers
+        job = [x for x in jobs if x.job_type == 'e3sm_diags'][0]
+        self.assertEqual(job.workers(config), 24)
+        engine.failed(job, 'OUT_OF_MEMORY')
+        self.assertEqual(job.get_manager_arg('--mem'), '0')
+        engine.failed(job, 'OUT_OF_MEMORY')
+        self.assertEqual(job.workers(config), 12)
+        job.set_custom_args({'--mem': '16G'})
+        engine.failed(job, 'OUT_OF_MEMORY')
+        self.assertEqual(job.get_manager_arg('--mem'), '32G')
+
+        # node failures are resubmitted as they were, until the run is out of retries
+        retry = engine.failed(jobs[0], 'NODE_FAIL')
+        self.assertTrue(retry.retry)
+        self.assertEqual(retry.changes, [])
+        retry = engine.failed(jobs[0], 'NODE_FAIL')
+        self.assertFalse(retry.retry)
+        self.assertIn('all 6', retry.reason)
+        self.assertFalse(engine.failed(jobs[1], 'FAILED').retry)
+
+    def test_dependents_wait(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        config, runmanager = initialize(
+            argv=[self.config_path, '--serial', '--live'],
+            event_list=EventList())
+        self.assertTrue(config)
+        climo = [job for case in runmanager.cases for job in case['jobs']
+                 if job.job_type == 'climo'][0]
+        dependents = runmanager.get_jobs_that_depend(climo.id)
+        self.assertTrue(dependents)
+
+        def fail(state):
+            climo.status = JobStatus.RUNNING
+            climo._input_file_paths.append(os.path.join(self.root, 'input.nc'))
+            runmanager.running_jobs = [{'manager_id': 1, 'job_id': climo.id}]
+            runmanager.manager = FakeManager(state)
+            runmanager.monitor_running_jobs()
+
+        # the job is put back in line and whatever depends on it keeps waiting
+        for _ in range(2):
+            fail('TO')
+            self.assertEqual(climo.status, JobStatus.VALID)
+            self.assertEqual(runmanager.running_jobs, [])
+            self.assertTrue(all(x.status != JobStatus.FAILED for x in dependents))
+            self.assertEqual(runmanager.is_all_done(), -1)
+        self.assertEqual(climo.get_manager_arg('-t'), '0-04:00:00')
+        self.assertEqual(climo._input_file_paths, [])
+
+        # once its out of retries it fails for good
+        fail('TIMEOUT')
+        self.assertEqual(climo.status, JobStatus.FAILED)
+        self.assertTrue(all(x.status == JobStatus.FAILED for x in dependents))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import inspect
+import os
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from configobj import ConfigObj
+
+from processflow.lib.events import EventList
+from processflow.lib.initialize import initialize
+from processflow.lib.simulate import Simulation, run_simulation
+from processflow.lib.util import print_message
+from tests.utils import write_run_config
+
+
+class TestSimulate(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+        self.project_path = os.path.join(self.root, 'project')
+        config = write_run_config(self.root, end_year=6)
+        config['simulation'] = {
+            'trials': '1',
+            'queue_wait': '0',
+            'loop_delay': '10',
+            'durations': {
+                'climo': ['5', '0'],
+                'timeseries': ['5', '0'],
+                'regrid': ['5', '0'],
+                'e3sm_diags': ['30', '0'],
+                'amwg': ['60', '0'],
+            }
+        }
+        config.write()
+        self.config_path = config.filename
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_simulate_touches_nothing(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        event_list = EventList()
+        config, runmanager = initialize(
+            argv=[self.config_path, '--simulate', '-m', '100'],
+            event_list=event_list)
+        self.assertTrue(config['global']['simulate'])
+        results = run_simulation(runmanager, config, event_list)
+        self.assertFalse(os.path.exists(self.project_path))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(len(results[0].blocked), 0)
+
+    def test_makespan_and_critical_path(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        _, runmanager = initialize(
+            argv=[self.config_path, '--simulate', '-m', '100'],
+            event_list=EventList())
+        config = ConfigObj(self.config_path)
+        result = Simulation(runmanager, config).run()[0]
+
+        # every job can start at once, so the run is a two year climo followed
+        # by amwg, submitted on the pass after the climo is seen to finish
+        self.assertLessEqual(abs(result.makespan - (10 * 60 + 10 + 60 * 60)), 10)
+        path = [x.job.job_type for x in result.critical_path()]
+        self.assertEqual(path, ['climo', 'amwg'])
+
+        # with one job at a time the jobs run back to back
+        runmanager.max_running_jobs = 1
+        serial = Simulation(runmanager, config).run()[0]
+        busy = sum(x.finish - x.start for x in serial.timeline.values())
+        self.assertGreaterEqual(serial.makespan, busy)
+        self.assertGreater(serial.utilization, 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import inspect
+import os
+import subprocess
+import sys
+import unittest
+
+from processflow.lib.util import print_message
+
+# modules that --version and --help have no use for
+HEAVY_MODULES = ['jinja2', 'peewee', 'bs4', 'lxml', 'asyncio', 'smtplib']
+
+
+class TestStartup(unittest.TestCase):
+
+    def _imported(self, *args):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = root
+        proc = subprocess.Popen(
+            [sys.executable, '-X', 'importtime', '-m', 'processflow'] + list(args),
+            cwd=root,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        _, err = proc.communicate()
+        self.assertEqual(proc.returncode, 0)
+        modules = set()
+        for line in err.decode('utf-8').splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            modules.add(line.split('|')[-1].strip())
+        return modules
+
+    def test_version_imports(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        modules = self._imported('--version')
+        self.assertIn('processflow.lib.initialize', modules)
+        for name in HEAVY_MODULES:
+            self.assertNotIn(name, modules)
+        self.assertFalse([x for x in modules if x.startswith('processflow.jobs')])
+
+    def test_job_map(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        from processflow.lib.runmanager import job_map
+        from processflow.jobs.climo import Climo
+        self.assertIn('climo', job_map)
+        self.assertIs(job_map['climo'], Climo)
+        self.assertIs(job_map['climo'], job_map['climo'])
+        self.assertEqual(sorted(job_map.keys()), sorted(job_map))
+        with self.assertRaises(KeyError):
+            job_map['not_a_job']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import inspect
+import os
+import time
+import unittest
+
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from configobj import ConfigObj
+
+from processflow.lib.events import EventList, EventType
+from processflow.lib.filemanager import FileManager
+from processflow.lib.util import print_message
+from processflow.lib.watcher import InputWatcher
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.root = mkdtemp()
+
+    def tearDown(self):
+        rmtree(self.root, ignore_errors=True)
+
+    def test_closed_files_are_reported(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        watcher = InputWatcher([self.root], interval=3600)
+        if not watcher.inotify:
+            watcher.close()
+            self.skipTest('inotify is not available')
+        self.assertEqual(watcher.poll(), set())
+
+        # a file thats still being written isnt reported until its closed
+        path = os.path.join(self.root, 'case.cam.h0.0001-01.nc')
+        outfile = open(path, 'w')
+        outfile.write('partial')
+        outfile.flush()
+        self.assertEqual(watcher.poll(), set())
+        # nor is it reported when another file in the same directory is closed
+        other = os.path.join(self.root, 'case.cam.h0.0001-05.nc')
+        open(other, 'w').close()
+        self.assertEqual(watcher.poll(), set([other]))
+        outfile.close()
+        self.assertEqual(watcher.poll(), set([path]))
+        self.assertEqual(watcher.poll(), set())
+
+        # files moved into place and symlinks are reported as soon as they show up
+        staged = os.path.join(mkdtemp(dir=self.root), 'staged.nc')
+        open(staged, 'w').close()
+        watcher.poll()
+        moved = os.path.join(self.root, 'case.cam.h0.0001-02.nc')
+        os.rename(staged, moved)
+        self.assertEqual(watcher.poll(), set([moved]))
+        link = os.path.join(self.root, 'case.cam.h0.0001-03.nc')
+        os.symlink(path, link)
+        self.assertEqual(watcher.poll(), set([link]))
+
+        watcher.unwatch([self.root])
+        open(os.path.join(self.root, 'case.cam.h0.0001-04.nc'), 'w').close()
+        self.assertEqual(watcher.poll(), set())
+        watcher.close()
+
+    def test_rescan(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        missing = os.path.join(self.root, 'not_yet')
+        watcher = InputWatcher([self.root, missing], interval=3600)
+        watcher.close()
+        old = os.path.join(self.root, 'old.nc')
+        open(old, 'w').close()
+        os.utime(old, (time.time() - 7200, time.time() - 7200))
+        growing = os.path.join(self.root, 'growing.nc')
+        with open(growing, 'w') as outfile:
+            outfile.write('partial')
+
+        # files that havent been written to in a while are reported straight away,
+        # ones written since the last rescan wait until they stop changing
+        self.assertEqual(watcher._rescan(), set([old]))
+        with open(growing, 'a') as outfile:
+            outfile.write(' and more')
+        self.assertEqual(watcher._rescan(), set([old]))
+        self.assertEqual(watcher._rescan(), set([old, growing]))
+
+        # directories that dont exist yet are picked up once they do
+        os.makedirs(missing)
+        landed = os.path.join(missing, 'landed.nc')
+        open(landed, 'w').close()
+        watcher._rescan()
+        self.assertIn(landed, watcher._rescan())
+
+        # the rescan only runs once its interval has passed
+        self.assertEqual(watcher.poll(), set())
+        watcher._last_scan = 0
+        self.assertEqual(watcher.poll(), set([old, growing, landed]))
+
+    def test_live_ingest(self):
+        print_message(
+            '\n---- Starting Test: {} ----'.format(inspect.stack()[0][3]), 'ok')
+        config = ConfigObj(os.path.join(
+            os.getcwd(), 'tests', 'test_configs', 'runmanager_valid_many_jobs.cfg'))
+        config['global']['project_path'] = os.path.join(self.root, 'project')
+        config['simulations']['end_year'] = '2'
+        case = [x for x in config['simulations']
+                if x not in ['start_year', 'end_year']][0]
+        config['simulations'][case]['local_path'] = os.path.join(self.root, 'data')
+        config['simulations'][case]['data_types'] = ['atm']
+        atm_path = os.path.join(
+            self.root, 'data', 'atmos', 'native', 'model-output', 'mon', 'ens1', 'v1')
+        os.makedirs(atm_path)
+
+        event_list = EventList()
+        arrivals = list()
+        event_list.subscribe(arrivals.append, [EventType.FILE_ARRIVAL])
+        filemanager = FileManager(
+            event_list=event_list,
+            config=config,
+            database=':memory:')
+        filemanager.populate_file_list()
+        filemanager.file_status_check(report_missing=False)
+        self.assertEqual(filemanager.count_missing(), 24)
+        self.assertEqual(filemanager.missing_dirs(), set([atm_path]))
+
+        def check(landed):
+            filemanager.file_status_check(
+                directories=set(os.path.dirname(x) for x in landed),
+                report_missing=False,
+                ready=landed.__contains__)
+
+        watcher = InputWatcher(filemanager.missing_dirs(), interval=0)
+        for month in range(1, 13):
+            open(os.path.join(atm_path, '{}.cam.h0.0001-{:02d}.nc'.format(case, month)), 'w').close()
+        check(watcher.poll())
+
+        # the first year is complete and can be released, the second is still landing
+        self.assertEqual(filemanager.count_missing(), 12)
+        self.assertEqual(len(arrivals), 1)
+        self.assertEqual(len(arrivals[0].data), 12)
+        self.assertTrue(filemanager.check_data_ready(['atm'], case, 1, 1))
+        self.assertFalse(filemanager.check_data_ready(['atm'], case, 1, 2))
+
+        # only the files reported as landed are marked, not everything else in their directory
+        second_year = [os.path.join(atm_path, '{}.cam.h0.0002-{:02d}.nc'.format(case, month))
+                       for month in range(1, 13)]
+        for path in second_year:
+            open(path, 'w').close()
+        check(set(second_year[:1]))
+        self.assertEqual(filemanager.count_missing(), 11)
+        check(watcher.poll())
+        self.assertTrue(filemanager.all_data_local())
+        self.assertTrue(filemanager.check_data_ready(['atm'], case, 1, 2))
+        self.assertEqual(filemanager.missing_dirs(), set())
+        watcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import os
 import json
+import struct
 from configobj import ConfigObj
 
 from processflow.lib.filemanager import FileStatus
+from processflow.lib.jobinfo import JobInfo
 
 def touch(fname):
 
@@ -14,6 +16,87 @@ def touch(fname):
     with open(fname, 'w') as fp:
         fp.write('\n')
 
+def _nc_name(name):
+    data = name.encode('utf-8')
+    return struct.pack('>I', len(data)) + data + b'\x00' * (-len(data) % 4)
+
+def mock_netcdf(fname, variables=('TS',), time_length=1, lat=2, lon=3):
+    """
+    Write a small classic format netCDF file, every variable is a float
+    on (time, lat, lon) along with a double time variable, all zeros
+    """
+    tail, _ = os.path.split(fname)
+    if tail and not os.path.exists(tail):
+        os.makedirs(tail)
+    dims = [('time', 0), ('lat', lat), ('lon', lon)]
+    # name, type, dimids, size of one record
+    var_list = [('time', 6, [0], 8)] + [(x, 5, [0, 1, 2], 4 * lat * lon) for x in variables]
+
+    header = b'CDF\x01' + struct.pack('>I', time_length)
+    header += struct.pack('>II', 10, len(dims))
+    for name, length in dims:
+        header += _nc_name(name) + struct.pack('>I', length)
+    header += struct.pack('>II', 0, 0)
+    header += struct.pack('>II', 11, len(var_list))
+    var_headers = list()
+    for name, nc_type, dimids, vsize in var_list:
+        var_headers.append(
+            _nc_name(name) + struct.pack('>I', len(dimids)) +
+            b''.join(struct.pack('>I', x) for x in dimids) +
+            struct.pack('>IIII', 0, 0, nc_type, vsize))
+    begin = len(header) + sum(len(x) + 4 for x in var_headers)
+    record_size = 0
+    for var_header, (_, _, _, vsize) in zip(var_headers, var_list):
+        header += var_header + struct.pack('>I', begin + record_size)
+        record_size += vsize
+    with open(fname, 'wb') as fp:
+        fp.write(header)
+        fp.write(b'\x00' * record_size * time_length)
+
+def write_run_config(root, end_year=2, name='run', project='project', data_path=None):
+    """
+    Write the many jobs test config to root/<name>.cfg, without cmor and with its
+    project under root, and with the case reading its data from data_path if its set.
+    Returns the ConfigObj, change it and write it again for anything else
+    """
+    config = ConfigObj(os.path.join(
+        os.getcwd(), 'tests', 'test_configs', 'runmanager_valid_many_jobs.cfg'))
+    config['global']['project_path'] = os.path.join(root, project)
+    config['simulations']['end_year'] = str(end_year)
+    del config['post-processing']['cmor']
+    if data_path is not None:
+        case = [x for x in config['simulations']
+                if x not in ['start_year', 'end_year']][0]
+        config['simulations'][case]['local_path'] = data_path
+    config.filename = os.path.join(root, '{}.cfg'.format(name))
+    config.write()
+    return config
+
+class FakeManager(object):
+    """
+    A resource manager that reports every job in the same state, or has
+    forgotten about every job thats not in known, and counts its lookups
+    """
+
+    def __init__(self, state='R', known=None):
+        self.state = state
+        self.known = known
+        self.calls = list()
+
+    def showjobs(self, manager_ids):
+        self.calls.append(sorted(manager_ids))
+        job_states = dict()
+        for manager_id in manager_ids:
+            if self.known is not None and manager_id not in self.known:
+                job_states[manager_id] = Exception('Invalid job id specified')
+                continue
+            job_states[manager_id] = JobInfo(jobid=manager_id)
+            job_states[manager_id].state = self.state
+        return job_states
+
+    def get_node_number(self):
+        return 4
+
 # generate mock files that match the expected ncclimo output
 def mock_climos(output_path, regrid_path, config, filemanager, case):
     climo_files = list()
@@ -23,11 +106,11 @@ def mock_climos(output_path, regrid_path, config, filemanager, case):
             case=case,
             month=month)
         outpath = os.path.join(output_path, name)
-        touch(outpath)
+        mock_netcdf(outpath)
         climo_files.append(outpath)
 
         outpath = os.path.join(regrid_path, name)
-        touch(outpath)
+        mock_netcdf(outpath)
         regrid_files.append(outpath)
     
     for season in ['ANN_000101_000212', 'DJF_000101_000212', 'JJA_000106_000208', 'MAM_000103_000205', 'SON_000109_000211']:
@@ -36,11 +119,11 @@ def mock_climos(output_path, regrid_path, config, filemanager, case):
             season=season)
         outpath = os.path.join(output_path, name)
 
-        touch(outpath)
+        mock_netcdf(outpath)
         climo_files.append(outpath)
 
         outpath = os.path.join(regrid_path, name)
-        touch(outpath)
+        mock_netcdf(outpath)
         regrid_files.append(outpath)
     
     new_files = list()
@@ -87,10 +170,11 @@ def mock_ts(variables, output_path, regrid_path, start_year, end_year):
             var=var,
             start=start_year,
             end=end_year)
+        time_length = (end_year - start_year + 1) * 12
         file_path = os.path.join(output_path, file_name)
-        touch(file_path)
+        mock_netcdf(file_path, variables=[var], time_length=time_length)
         file_path = os.path.join(regrid_path, file_name)
-        touch(file_path)
+        mock_netcdf(file_path, variables=[var], time_length=time_length)
 
 def mock_atm(start_year, end_year, caseid, path):
 